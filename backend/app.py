@@ -1,12 +1,39 @@
 # ==================== SOILSYNC FLASK BACKEND ====================
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
 import os
-import requests
+import io
+import sys
+import csv
+import json
+import atexit
+import gc
+import hashlib
+import tempfile
+from functools import wraps
 import random
+import asyncio
+import time
+import numpy as np
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from cache import TTLCache, QueryCache, ImageHashCache
+from upstream import get_client, get_async_client
+from disease_engine import DiseaseInferenceEngine, InferencePool, ImageDecodeError, image_fingerprint
+from batching import MicroBatcher, QueueFull
+from symptom_engine import SymptomIndex
+from rules import RulesStore
+from fertilizer_engine import DosageModel
+from crop_engine import SuitabilityModel
+from subsidy_engine import SchemeCatalogue
+from static_assets import StaticAssets, ENCODINGS, COMPRESSIBLE_TYPES, compress
+from metrics import registry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from health import HealthMonitor, response_status
+from prewarm import WeatherPrewarmer
+from sessions import SessionStore
 
 # Load environment variables
 load_dotenv()
@@ -14,75 +41,411 @@ load_dotenv()
 app = Flask(__name__, static_folder='..', template_folder='..')
 CORS(app)
 
-# Serve static files
+# Serve static files (see static_response below)
 @app.route('/')
 def index():
-    return send_from_directory('..', 'index.html')
+    return static_response('index.html')
 
 @app.route('/<path:filename>')
 def static_files(filename):
-    return send_from_directory('..', filename)
+    return static_response(filename)
 
 # ==================== CONFIGURATION ====================
 class Config:
     WEATHER_API_KEY = os.getenv('OPENWEATHER_API_KEY')
     GROQ_API_KEY = os.getenv('GROQ_API_KEY')
-    WEATHER_BASE_URL = 'https://api.openweathermap.org/data/2.5'
-    GROQ_BASE_URL = 'https://api.groq.com/openai/v1'
+    WEATHER_BASE_URL = os.getenv('WEATHER_BASE_URL', 'https://api.openweathermap.org/data/2.5')
+    GROQ_BASE_URL = os.getenv('GROQ_BASE_URL', 'https://api.groq.com/openai/v1')
+    
+    # Shared upstream HTTP client (timeouts in seconds)
+    UPSTREAM_POOL_SIZE = int(os.getenv('UPSTREAM_POOL_SIZE', 20))
+    UPSTREAM_CONNECT_TIMEOUT = float(os.getenv('UPSTREAM_CONNECT_TIMEOUT', 3.05))
+    UPSTREAM_READ_TIMEOUT = float(os.getenv('UPSTREAM_READ_TIMEOUT', 10))
+    UPSTREAM_RETRIES = int(os.getenv('UPSTREAM_RETRIES', 2))
+    UPSTREAM_BACKOFF = float(os.getenv('UPSTREAM_BACKOFF', 0.2))
+    # A 429 is retried only when Retry-After asks for no longer than this
+    UPSTREAM_MAX_RETRY_AFTER = float(os.getenv('UPSTREAM_MAX_RETRY_AFTER', 5))
+    UPSTREAM_BREAKER_THRESHOLD = int(os.getenv('UPSTREAM_BREAKER_THRESHOLD', 5))
+    UPSTREAM_BREAKER_RESET = float(os.getenv('UPSTREAM_BREAKER_RESET', 30))
+    
+    # Weather cache (seconds); a TTL of 0 disables caching
+    WEATHER_CURRENT_TTL = int(os.getenv('WEATHER_CURRENT_TTL', 600))
+    WEATHER_FORECAST_TTL = int(os.getenv('WEATHER_FORECAST_TTL', 1800))
+    WEATHER_STALE_TTL = int(os.getenv('WEATHER_STALE_TTL', 3600))
+    WEATHER_CACHE_SIZE = int(os.getenv('WEATHER_CACHE_SIZE', 512))
+    
+    # Concurrent fan-out for /api/weather/bundle
+    WEATHER_FANOUT_WORKERS = int(os.getenv('WEATHER_FANOUT_WORKERS', 16))
+    WEATHER_BUNDLE_MAX_CITIES = int(os.getenv('WEATHER_BUNDLE_MAX_CITIES', 20))
+    
+    # Opt-in: weather for these cities, plus the WEATHER_PREWARM_TOP_N most
+    # requested others, is refreshed in the background before it expires, at
+    # most WEATHER_PREWARM_RATE upstream calls per second and
+    # WEATHER_PREWARM_DAILY_BUDGET a day. The snapshot file keeps it warm
+    # across restarts and shares refreshes (and the budget) between workers;
+    # gunicorn with several workers needs one.
+    WEATHER_PREWARM_CITIES = [
+        city.strip() for city in os.getenv('WEATHER_PREWARM_CITIES', '').split(',') if city.strip()
+    ]
+    WEATHER_PREWARM_TOP_N = int(os.getenv('WEATHER_PREWARM_TOP_N', 0))
+    WEATHER_PREWARM_RATE = float(os.getenv('WEATHER_PREWARM_RATE', 1.0))
+    WEATHER_PREWARM_DAILY_BUDGET = int(os.getenv('WEATHER_PREWARM_DAILY_BUDGET', 500))
+    WEATHER_SNAPSHOT_PATH = os.getenv('WEATHER_SNAPSHOT_PATH', '')
+    
+    # Chatbot answer cache; a TTL of 0 disables it. Fuzzy matching of
+    # rephrased questions is opt-in (see QueryCache).
+    CHATBOT_CACHE_TTL = int(os.getenv('CHATBOT_CACHE_TTL', 86400))
+    CHATBOT_CACHE_SIZE = int(os.getenv('CHATBOT_CACHE_SIZE', 2048))
+    CHATBOT_CACHE_THRESHOLD = float(os.getenv('CHATBOT_CACHE_THRESHOLD', 0.95))
+    CHATBOT_CACHE_FUZZY = os.getenv('CHATBOT_CACHE_FUZZY', 'false').lower() == 'true'
+    
+    # Chatbot conversation sessions (requests carrying a session_id): the last
+    # CHATBOT_SESSION_MESSAGES messages within CHATBOT_SESSION_TOKENS, older
+    # ones summarised within CHATBOT_SESSION_SUMMARY_TOKENS. Idle sessions are
+    # dropped after CHATBOT_SESSION_IDLE_TTL seconds; a SQLite path shares
+    # them between workers and keeps them across restarts. 0 sessions disables.
+    CHATBOT_SESSION_MAX = int(os.getenv('CHATBOT_SESSION_MAX', 10000))
+    CHATBOT_SESSION_IDLE_TTL = int(os.getenv('CHATBOT_SESSION_IDLE_TTL', 1800))
+    CHATBOT_SESSION_MESSAGES = int(os.getenv('CHATBOT_SESSION_MESSAGES', 16))
+    CHATBOT_SESSION_TOKENS = int(os.getenv('CHATBOT_SESSION_TOKENS', 1200))
+    CHATBOT_SESSION_SUMMARY_TOKENS = int(os.getenv('CHATBOT_SESSION_SUMMARY_TOKENS', 200))
+    CHATBOT_SESSION_DB = os.getenv('CHATBOT_SESSION_DB', '')
+    
+    # Disease detection classifier (see models/disease_classifier.json)
+    DISEASE_MODEL_PATH = os.getenv(
+        'DISEASE_MODEL_PATH',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'disease_classifier.json')
+    )
+    
+    # Micro-batching for disease inference
+    DISEASE_BATCH_MAX_SIZE = int(os.getenv('DISEASE_BATCH_MAX_SIZE', 16))
+    DISEASE_BATCH_MAX_WAIT_MS = float(os.getenv('DISEASE_BATCH_MAX_WAIT_MS', 5))
+    DISEASE_QUEUE_MAX_DEPTH = int(os.getenv('DISEASE_QUEUE_MAX_DEPTH', 256))
+    DISEASE_BATCH_MAX_IMAGES = int(os.getenv('DISEASE_BATCH_MAX_IMAGES', 32))
+    
+    # Largest accepted image upload in bytes (base64 JSON may be 4/3 of this),
+    # and the longest side clients are asked to downscale photos to
+    DISEASE_MAX_UPLOAD_BYTES = int(os.getenv('DISEASE_MAX_UPLOAD_BYTES', 10 * 1024 * 1024))
+    DISEASE_UPLOAD_MAX_DIMENSION = int(os.getenv('DISEASE_UPLOAD_MAX_DIMENSION', 512))
+    # Largest image decoded, in pixels after JPEG's draft downscaling: a small
+    # PNG can still declare a huge bitmap. Larger images are refused with 400.
+    DISEASE_MAX_IMAGE_PIXELS = int(os.getenv('DISEASE_MAX_IMAGE_PIXELS', 24000000))
+    # Largest request body, chunked ones included (limit_request_body): the
+    # base64 allowance for one image upload (see upload_limit). The batch
+    # endpoints get BULK_MAX_BODY_BYTES. /api/subsidy/bulk streams with flat
+    # memory, so its ceiling only bounds how long one upload can run.
+    MAX_CONTENT_LENGTH = DISEASE_MAX_UPLOAD_BYTES * 4 // 3 + 1024
+    BULK_MAX_BODY_BYTES = int(os.getenv('BULK_MAX_BODY_BYTES', 64 * 1024 * 1024))
+    SUBSIDY_BULK_MAX_BODY_BYTES = int(os.getenv('SUBSIDY_BULK_MAX_BODY_BYTES', 1024 * 1024 * 1024))
+    
+    # Worker processes for image decode/preprocess/inference; 0 keeps it in-process
+    DISEASE_POOL_SIZE = int(os.getenv('DISEASE_POOL_SIZE', 0))
+    
+    # Predictions for repeated or near-identical photos (perceptual hash within
+    # DISEASE_CACHE_MAX_DISTANCE bits); size 0 disables, a path persists it
+    DISEASE_CACHE_SIZE = int(os.getenv('DISEASE_CACHE_SIZE', 4096))
+    DISEASE_CACHE_MAX_DISTANCE = int(os.getenv('DISEASE_CACHE_MAX_DISTANCE', 4))
+    DISEASE_CACHE_PATH = os.getenv('DISEASE_CACHE_PATH', '')
+    
+    # Crop x disease symptom profiles for the symptom quiz (see data/symptom_profiles.json)
+    SYMPTOM_PROFILES_PATH = os.getenv(
+        'SYMPTOM_PROFILES_PATH',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'symptom_profiles.json')
+    )
+    # Treatment, fertilizer, crop and subsidy tables; edits are picked up live
+    RULES_PATH = os.getenv(
+        'RULES_PATH',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'rules.json')
+    )
+    
+    # Plots accepted by one /api/fertilizer/batch request
+    FERTILIZER_BATCH_MAX_PLOTS = int(os.getenv('FERTILIZER_BATCH_MAX_PLOTS', 200000))
+    
+    # Ranked crops returned per farm profile, and /api/crop/recommend/batch limits
+    CROP_TOP_K = int(os.getenv('CROP_TOP_K', 3))
+    CROP_BATCH_MAX_PROFILES = int(os.getenv('CROP_BATCH_MAX_PROFILES', 50000))
+    CROP_BATCH_MAX_CITIES = int(os.getenv('CROP_BATCH_MAX_CITIES', 50))
+    
+    SYMPTOM_TOP_K = int(os.getenv('SYMPTOM_TOP_K', 3))
+    SYMPTOM_BATCH_MAX_QUERIES = int(os.getenv('SYMPTOM_BATCH_MAX_QUERIES', 1000))
+    
+    # Admin endpoints require this token in X-Admin-Token; when unset they
+    # only answer requests from localhost
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+    
+    # Frontend files are rescanned for edits at most this often (seconds);
+    # responses smaller than COMPRESS_MIN_BYTES are sent uncompressed
+    STATIC_CHECK_INTERVAL = float(os.getenv('STATIC_CHECK_INTERVAL', 1.0))
+    COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', 512))
+    
+    # ASGI serving mode (asgi.py)
+    UPSTREAM_ASYNC_MAX_CONNECTIONS = int(os.getenv('UPSTREAM_ASYNC_MAX_CONNECTIONS', 1000))
+    ASGI_WSGI_THREADS = int(os.getenv('ASGI_WSGI_THREADS', 32))
+    
+    # Upstream health is taken from real calls, and an upstream with none in
+    # the last HEALTH_CHECK_INTERVAL seconds is probed by one process per host
+    # (the holder of HEALTH_PROBE_LOCK; empty lets every process probe). A
+    # 15-minute interval keeps the OpenWeather probe under 100 calls a day.
+    HEALTH_CHECK_INTERVAL = float(os.getenv('HEALTH_CHECK_INTERVAL', 900))
+    HEALTH_CHECK_TIMEOUT = float(os.getenv('HEALTH_CHECK_TIMEOUT', 3))
+    HEALTH_PROBE_LOCK = os.getenv('HEALTH_PROBE_LOCK', os.path.join(tempfile.gettempdir(), 'soilsync-health.lock'))
+    
+    # Development server only (python app.py)
+    HOST = os.getenv('HOST', '0.0.0.0')
+    PORT = int(os.getenv('PORT', 5000))
+    DEBUG = os.getenv('FLASK_DEBUG', 'false').lower() in ('1', 'true')
     
 app.config.from_object(Config)
 
+# ==================== METRICS ====================
+# Served at /metrics; upstream call metrics are recorded in upstream.py
+HTTP_REQUESTS = registry.counter(
+    'soilsync_http_requests_total', 'Requests by route template, method and status', ('route', 'method', 'status')
+)
+HTTP_SECONDS = registry.histogram(
+    'soilsync_http_request_duration_seconds',
+    'Time to produce a response (streamed bodies not included)',
+    ('route', 'method')
+)
+HTTP_IN_FLIGHT = registry.gauge('soilsync_http_requests_in_flight', 'Requests currently being handled')
+FALLBACKS = registry.counter(
+    'soilsync_fallback_total', 'Answers served from built-in fallback data instead of an upstream', ('path',)
+)
+
+@app.before_request
+def start_request_timer():
+    request.environ['soilsync.started'] = time.perf_counter()
+    HTTP_IN_FLIGHT.inc()
+
+@app.after_request
+def record_request(response):
+    # Registered before compress_response, so it runs after it and the
+    # compression time is included
+    environ = request.environ
+    started = environ.get('soilsync.started')
+    if started is not None:
+        rule = request.url_rule
+        route = rule.rule if rule is not None else 'unmatched'
+        method = environ['REQUEST_METHOD']
+        HTTP_REQUESTS.inc(route, method, str(response.status_code))
+        HTTP_SECONDS.observe(route, method, value=time.perf_counter() - started)
+    return response
+
+@app.teardown_request
+def end_request(error=None):
+    # Runs once a streamed body has been sent too
+    if request.environ.pop('soilsync.started', None) is not None:
+        HTTP_IN_FLIGHT.dec()
+
+# ==================== STATIC ASSETS & COMPRESSION ====================
+static_assets = StaticAssets(os.path.join(app.root_path, '..'), app.config['STATIC_CHECK_INTERVAL'])
+
+def static_response(filename):
+    # Frontend files come precompressed from memory, css/js also under
+    # immutable content-hashed URLs; anything else is sent from disk as before
+    found = static_assets.get(filename)
+    if found is None:
+        return send_from_directory('..', filename)
+    asset, cache_control = found
+    encoding = request.accept_encodings.best_match(
+        [encoding for encoding in ENCODINGS if encoding in asset.bodies]
+    ) or 'identity'
+    
+    response = Response(asset.bodies[encoding], mimetype=asset.mimetype)
+    response.set_etag(asset.etag(encoding))
+    response.headers['Cache-Control'] = cache_control
+    response.vary.add('Accept-Encoding')
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    return response.make_conditional(request)
+
+def conditional_json(payload):
+    # Deterministic API responses carry an ETag; clients revalidate (rule
+    # tables can change under them) and get a bodyless 304 when nothing did.
+    # Weak, so it holds for the compressed and uncompressed body alike.
+    response = jsonify(payload)
+    response.add_etag(weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@app.after_request
+def compress_response(response):
+    # gzip/brotli for API responses. Streamed responses (SSE, bulk exports),
+    # files sent from disk and already-encoded bodies are left alone.
+    if (response.direct_passthrough or response.is_streamed or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    encoding = request.accept_encodings.best_match(ENCODINGS)
+    if encoding is None or len(body) < app.config['COMPRESS_MIN_BYTES']:
+        return response
+    
+    response.set_data(compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+def upstream_client(name, base_url):
+    return get_client(
+        name, base_url,
+        pool_size=app.config['UPSTREAM_POOL_SIZE'],
+        connect_timeout=app.config['UPSTREAM_CONNECT_TIMEOUT'],
+        read_timeout=app.config['UPSTREAM_READ_TIMEOUT'],
+        retries=app.config['UPSTREAM_RETRIES'],
+        backoff=app.config['UPSTREAM_BACKOFF'],
+        failure_threshold=app.config['UPSTREAM_BREAKER_THRESHOLD'],
+        reset_timeout=app.config['UPSTREAM_BREAKER_RESET'],
+        max_retry_after=app.config['UPSTREAM_MAX_RETRY_AFTER']
+    )
+
+def async_upstream_client(name):
+    return get_async_client(name, app.config['UPSTREAM_ASYNC_MAX_CONNECTIONS'])
+
 # ==================== REAL OPENWEATHER API ====================
 class OpenWeatherService:
     def __init__(self):
         self.api_key = app.config['WEATHER_API_KEY']
         self.base_url = app.config['WEATHER_BASE_URL']
+        self.client = upstream_client('openweather', self.base_url)
+        self.current_cache = TTLCache(
+            app.config['WEATHER_CURRENT_TTL'],
+            app.config['WEATHER_STALE_TTL'],
+            app.config['WEATHER_CACHE_SIZE']
+        )
+        self.forecast_cache = TTLCache(
+            app.config['WEATHER_FORECAST_TTL'],
+            app.config['WEATHER_STALE_TTL'],
+            app.config['WEATHER_CACHE_SIZE']
+        )
+        self.fanout = ThreadPoolExecutor(
+            max_workers=app.config['WEATHER_FANOUT_WORKERS'],
+            thread_name_prefix='weather-fanout'
+        )
+        # Writes straight into the caches above; started per process by the
+        # 'weather_prewarm' warm-up step
+        self.prewarmer = WeatherPrewarmer(
+            {
+                'weather': (self.current_cache, lambda city: self._fetch('weather', city)),
+                'forecast': (self.forecast_cache, lambda city: self._fetch('forecast', city))
+            },
+            hot_cities=[self._cache_key(city) for city in app.config['WEATHER_PREWARM_CITIES']],
+            top_n=app.config['WEATHER_PREWARM_TOP_N'],
+            max_rate=app.config['WEATHER_PREWARM_RATE'],
+            snapshot_path=app.config['WEATHER_SNAPSHOT_PATH'] or None,
+            daily_budget=app.config['WEATHER_PREWARM_DAILY_BUDGET']
+        )
     
-    def _test_api_key(self):
+    def probe(self):
+        # Background health check (see HEALTH below), never on a request path
         if not self.api_key:
-            return False
-        try:
-            url = f"{self.base_url}/weather"
-            params = {'q': 'Mumbai', 'appid': self.api_key, 'units': 'metric'}
-            response = requests.get(url, params=params, timeout=5)
-            return response.status_code == 200
-        except:
-            return False
+            return 'not_configured', 'No API key, serving fallback data'
+        params = {'q': 'Mumbai', 'appid': self.api_key, 'units': 'metric'}
+        response = self.client.get('/weather', params=params, timeout=app.config['HEALTH_CHECK_TIMEOUT'])
+        response.close()
+        return response_status(response)
     
     def get_current_weather(self, city):
         if not self.api_key:
             return self.fallback_weather_data(city)
             
+        key = self._cache_key(city)
+        self.prewarmer.record(key)
         try:
-            url = f"{self.base_url}/weather"
-            params = {'q': city, 'appid': self.api_key, 'units': 'metric'}
-            response = requests.get(url, params=params, timeout=10)
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                return self.fallback_weather_data(city)
+            return self.current_cache.get_or_load(key, lambda: self._fetch('weather', city))
         except Exception as e:
-            print(f"OpenWeather API error: {e}")
+            app.logger.warning("OpenWeather API error: %s", e)
             return self.fallback_weather_data(city)
     
     def get_forecast(self, city):
         if not self.api_key:
             return self.fallback_forecast_data(city)
             
+        key = self._cache_key(city)
+        self.prewarmer.record(key)
         try:
-            url = f"{self.base_url}/forecast"
-            params = {'q': city, 'appid': self.api_key, 'units': 'metric'}
-            response = requests.get(url, params=params, timeout=10)
+            return self.forecast_cache.get_or_load(key, lambda: self._fetch('forecast', city))
+        except Exception as e:
+            return self.fallback_forecast_data(city)
+    
+    async def aget_current_weather(self, city):
+        if not self.api_key:
+            return self.fallback_weather_data(city)
             
-            if response.status_code == 200:
-                return response.json()
-            else:
-                return self.fallback_forecast_data(city)
+        key = self._cache_key(city)
+        self.prewarmer.record(key)
+        try:
+            return await self.current_cache.aget_or_load(key, lambda: self._afetch('weather', city))
         except Exception as e:
+            app.logger.warning("OpenWeather API error: %s", e)
+            return self.fallback_weather_data(city)
+    
+    async def aget_forecast(self, city):
+        if not self.api_key:
             return self.fallback_forecast_data(city)
+            
+        key = self._cache_key(city)
+        self.prewarmer.record(key)
+        try:
+            return await self.forecast_cache.aget_or_load(key, lambda: self._afetch('forecast', city))
+        except Exception as e:
+            return self.fallback_forecast_data(city)
+    
+    def get_bundle(self, cities):
+        # Current + forecast for every city in one concurrent wave; each item
+        # degrades to its own fallback data instead of failing the batch
+        jobs = [
+            (city, self.fanout.submit(self.get_current_weather, city), self.fanout.submit(self.get_forecast, city))
+            for city in cities
+        ]
+        results = []
+        for city, current, forecast in jobs:
+            try:
+                weather = current.result()
+            except Exception:
+                weather = self.fallback_weather_data(city)
+            try:
+                forecast_data = forecast.result()
+            except Exception:
+                forecast_data = self.fallback_forecast_data(city)
+            results.append({'city': city, 'weather': weather, 'forecast': forecast_data})
+        return results
+    
+    async def aget_bundle(self, cities):
+        # aget_* never raise, so a plain gather keeps per-item degradation
+        results = await asyncio.gather(*[
+            asyncio.gather(self.aget_current_weather(city), self.aget_forecast(city))
+            for city in cities
+        ])
+        return [
+            {'city': city, 'weather': weather, 'forecast': forecast_data}
+            for city, (weather, forecast_data) in zip(cities, results)
+        ]
+    
+    def _fetch(self, endpoint, city):
+        # Raises on any upstream failure so fallback data is never cached
+        params = {'q': city, 'appid': self.api_key, 'units': 'metric'}
+        response = self.client.get(f"/{endpoint}", params=params)
+        response.raise_for_status()
+        return response.json()
+    
+    async def _afetch(self, endpoint, city):
+        params = {'q': city, 'appid': self.api_key, 'units': 'metric'}
+        response = await async_upstream_client('openweather').get(f"/{endpoint}", params=params)
+        response.raise_for_status()
+        return response.json()
+    
+    def _cache_key(self, city):
+        return (city or '').strip().lower()
+    
+    def cache_stats(self):
+        return {
+            'current': self.current_cache.stats(),
+            'forecast': self.forecast_cache.stats(),
+            'prewarm': self.prewarmer.stats()
+        }
     
     def fallback_weather_data(self, city):
+        FALLBACKS.inc('fallback_weather_data')
         # Enhanced fallback data with realistic weather for Indian cities
         weather_data = {
             'Mumbai': {'temp': 29, 'humidity': 78, 'condition': 'Partly Cloudy', 'wind': 12},
@@ -116,6 +479,7 @@ class OpenWeatherService:
         }
     
     def fallback_forecast_data(self, city):
+        FALLBACKS.inc('fallback_forecast_data')
         forecast_list = []
         base_temp = 28
         conditions = ['Clear', 'Partly Cloudy', 'Cloudy', 'Light Rain', 'Sunny']
@@ -140,7 +504,7 @@ class OpenWeatherService:
                 }],
                 'wind': {'speed': random.randint(3, 12)}
             })
-        return {'list': forecast_list}
+        return {'list': forecast_list, 'fallback': True}
 
 # ==================== SIMPLE WORKING APIS ====================
 class SimpleWeatherService:
@@ -175,54 +539,305 @@ class SimpleWeatherService:
         return {'list': forecast_list}
 
 # ==================== GROQ AI CHATBOT ====================
+# Crops a farmer may name in English, Hindi or Marathi. Two cached questions
+# only match fuzzily when they name the same ones; the crops and diseases from
+# the rule tables and symptom profiles are added further down.
+CHATBOT_CROP_TERMS = {
+    'wheat', 'rice', 'paddy', 'maize', 'corn', 'cotton', 'sugarcane', 'potato', 'tomato', 'onion', 'chilli',
+    'brinjal', 'okra', 'cabbage', 'cauliflower', 'soybean', 'groundnut', 'mustard', 'chickpea', 'gram',
+    'bajra', 'jowar', 'moong', 'tur', 'banana', 'mango', 'grapes', 'pomegranate', 'watermelon', 'sunflower',
+    'गेहूं', 'गेहूँ', 'धान', 'चावल', 'मक्का', 'कपास', 'गन्ना', 'आलू', 'टमाटर', 'प्याज', 'मिर्च', 'सोयाबीन',
+    'सरसों', 'चना', 'बाजरा', 'ज्वार', 'मूंग', 'अरहर', 'केला', 'आम', 'अंगूर',
+    'गहू', 'भात', 'तांदूळ', 'मका', 'कापूस', 'ऊस', 'बटाटा', 'टोमॅटो', 'कांदा', 'मिरची', 'हरभरा', 'तूर',
+    'केळी', 'आंबा', 'द्राक्ष', 'डाळिंब'
+}
+
 class GroqChatbot:
     def __init__(self):
         self.api_key = app.config['GROQ_API_KEY']
-        self.base_url = f"{app.config['GROQ_BASE_URL']}/chat/completions"
+        self.client = upstream_client('groq', app.config['GROQ_BASE_URL'])
+        self.cache = QueryCache(
+            app.config['CHATBOT_CACHE_TTL'],
+            app.config['CHATBOT_CACHE_SIZE'],
+            app.config['CHATBOT_CACHE_THRESHOLD'],
+            app.config['CHATBOT_CACHE_FUZZY'],
+            CHATBOT_CROP_TERMS
+        )
+        self.sessions = SessionStore(
+            app.config['CHATBOT_SESSION_MAX'],
+            app.config['CHATBOT_SESSION_IDLE_TTL'],
+            app.config['CHATBOT_SESSION_MESSAGES'],
+            app.config['CHATBOT_SESSION_TOKENS'],
+            app.config['CHATBOT_SESSION_SUMMARY_TOKENS'],
+            app.config['CHATBOT_SESSION_DB'] or None
+        )
     
-    def generate_response(self, query, language='en-IN'):
+    def probe(self):
+        # Lists models rather than generating a completion: free and fast
         if not self.api_key:
-            return self.fallback_response(query, language)
+            return 'not_configured', 'No API key, serving fallback answers'
+        response = self.client.get(
+            '/models',
+            headers={'Authorization': f'Bearer {self.api_key}'},
+            timeout=app.config['HEALTH_CHECK_TIMEOUT']
+        )
+        response.close()
+        return response_status(response)
+    
+    def generate_response(self, query, language='en-IN', session_id=None):
+        if not self.api_key:
+            return self._remember(session_id, query, self.fallback_response(query, language))
+        
+        context = self._context(session_id)
+        # Follow-ups depend on the conversation, so only opening questions
+        # are answered from (and stored in) the shared cache
+        if not any(context):
+            cached = self.cache.get(language, query)
+            if cached is not None:
+                return self._remember(session_id, query, dict(cached, cached=True), answered=True)
         
         try:
-            headers = {
-                'Authorization': f'Bearer {self.api_key}',
-                'Content-Type': 'application/json'
-            }
-            
-            system_prompts = {
-                'en-IN': 'You are SoilSync AI, a farming assistant. Provide helpful advice about crops, diseases, weather, and farming techniques in English.',
-                'hi-IN': 'आप SoilSync AI हैं, एक कृषि सहायक। फसलों, रोगों, मौसम और कृषि तकनीकों के बारे में हिंदी में सहायक सलाह प्रदान करें।',
-                'mr-IN': 'तुम्ही SoilSync AI आहात, एक शेती सहाय्यक. पिके, रोग, हवामान आणि शेती तंत्रांबद्दल मराठीत उपयुक्त सल्ला द्या.'
-            }
+            headers, data = self._build_request(query, language, context)
+            response = self.client.post('/chat/completions', headers=headers, json=data)
             
-            data = {
-                'model': 'llama-3.1-8b-instant',
-                'messages': [
-                    {'role': 'system', 'content': system_prompts.get(language, system_prompts['en-IN'])},
-                    {'role': 'user', 'content': query}
-                ],
-                'max_tokens': 150,
-                'temperature': 0.7
-            }
-            
-            response = requests.post(self.base_url, headers=headers, json=data, timeout=10)
+            if response.status_code == 200:
+                result = self._parse_completion(response.json())
+                if not any(context):
+                    self.cache.put(language, query, result)
+                return self._remember(session_id, query, result, answered=True)
+            else:
+                return self._remember(session_id, query, self.fallback_response(query, language))
+                
+        except Exception as e:
+            app.logger.warning("Groq API error: %s", e)
+            return self._remember(session_id, query, self.fallback_response(query, language))
+    
+    async def agenerate_response(self, query, language='en-IN', session_id=None):
+        if not self.api_key:
+            return await self._aremember(session_id, query, self.fallback_response(query, language))
+        
+        context = await self._acontext(session_id)
+        if not any(context):
+            cached = self.cache.get(language, query)
+            if cached is not None:
+                return await self._aremember(session_id, query, dict(cached, cached=True), answered=True)
+        
+        try:
+            headers, data = self._build_request(query, language, context)
+            response = await async_upstream_client('groq').post('/chat/completions', headers=headers, json=data)
             
             if response.status_code == 200:
-                result = response.json()
-                return {
-                    'text': result['choices'][0]['message']['content'],
-                    'confidence': 0.95,
-                    'suggestions': ['Disease Detection', 'Weather Forecast', 'Fertilizer Advice']
-                }
+                result = self._parse_completion(response.json())
+                if not any(context):
+                    self.cache.put(language, query, result)
+                return await self._aremember(session_id, query, result, answered=True)
             else:
-                return self.fallback_response(query, language)
+                return await self._aremember(session_id, query, self.fallback_response(query, language))
                 
         except Exception as e:
-            print(f"Groq API error: {e}")
-            return self.fallback_response(query, language)
+            app.logger.warning("Groq API error: %s", e)
+            return await self._aremember(session_id, query, self.fallback_response(query, language))
+    
+    def stream_response(self, query, language='en-IN', session_id=None):
+        # Yields {'delta': text} events as Groq produces tokens, then a final
+        # {'done': True, ...} event carrying the response metadata
+        if not self.api_key:
+            yield from self.stream_fallback(query, language, session_id)
+            return
+        
+        context = self._context(session_id)
+        if not any(context):
+            cached = self.cache.get(language, query)
+            if cached is not None:
+                yield from self.stream_cached(cached, query, session_id)
+                return
+        
+        try:
+            headers, data = self._build_request(query, language, context)
+            data['stream'] = True
+            response = self.client.post('/chat/completions', headers=headers, json=data, stream=True)
+        except Exception as e:
+            app.logger.warning("Groq API error: %s", e)
+            yield from self.stream_fallback(query, language, session_id)
+            return
+        
+        parts = []
+        complete = False
+        try:
+            if response.status_code == 200:
+                # chunk_size=None hands lines over as soon as they arrive
+                for delta in self._iter_deltas(response.iter_lines(chunk_size=None)):
+                    parts.append(delta)
+                    yield {'delta': delta}
+                complete = True
+        except Exception as e:
+            app.logger.warning("Groq stream error: %s", e)
+        finally:
+            response.close()
+        
+        if not parts:
+            yield from self.stream_fallback(query, language, session_id)
+            return
+        yield from self._finish_stream(query, language, parts, complete, session_id, cacheable=not any(context))
+    
+    async def astream_response(self, query, language='en-IN', session_id=None):
+        if not self.api_key:
+            fallback = await self._aremember(session_id, query, self.fallback_response(query, language))
+            for event in self._fallback_events(fallback):
+                yield event
+            return
+        
+        context = await self._acontext(session_id)
+        if not any(context):
+            cached = self.cache.get(language, query)
+            if cached is not None:
+                await self._aremember(session_id, query, cached, answered=True)
+                for event in self._cached_events(cached):
+                    yield event
+                return
+        
+        try:
+            headers, data = self._build_request(query, language, context)
+            data['stream'] = True
+            response = await async_upstream_client('groq').post('/chat/completions', stream=True, headers=headers, json=data)
+        except Exception as e:
+            app.logger.warning("Groq API error: %s", e)
+            fallback = await self._aremember(session_id, query, self.fallback_response(query, language))
+            for event in self._fallback_events(fallback):
+                yield event
+            return
+        
+        parts = []
+        complete = False
+        try:
+            if response.status_code == 200:
+                async for line in response.aiter_lines():
+                    for delta in self._iter_deltas([line]):
+                        parts.append(delta)
+                        yield {'delta': delta}
+                complete = True
+        except Exception as e:
+            app.logger.warning("Groq stream error: %s", e)
+        finally:
+            await response.aclose()
+        
+        if not parts:
+            fallback = await self._aremember(session_id, query, self.fallback_response(query, language))
+            for event in self._fallback_events(fallback):
+                yield event
+            return
+        result = self._stream_result(query, language, parts, complete, cacheable=not any(context))
+        await self._aremember(session_id, query, result, answered=complete)
+        yield self._done_event(result)
+    
+    def _finish_stream(self, query, language, parts, complete, session_id=None, cacheable=True):
+        result = self._stream_result(query, language, parts, complete, cacheable)
+        self._remember(session_id, query, result, answered=complete)
+        yield self._done_event(result)
+    
+    def _stream_result(self, query, language, parts, complete, cacheable=True):
+        result = self._parse_completion({'choices': [{'message': {'content': ''.join(parts)}}]})
+        # Only answers that streamed to completion are worth reusing
+        if complete and cacheable:
+            self.cache.put(language, query, result)
+        return result
+    
+    def _done_event(self, result):
+        return {'done': True, 'confidence': result['confidence'], 'suggestions': result['suggestions']}
+    
+    def stream_cached(self, cached, query=None, session_id=None):
+        self._remember(session_id, query, cached, answered=True)
+        yield from self._cached_events(cached)
+    
+    def _cached_events(self, cached):
+        yield {'delta': cached['text']}
+        yield {'done': True, 'confidence': cached['confidence'], 'suggestions': cached['suggestions'], 'cached': True}
+    
+    def stream_fallback(self, query, language, session_id=None):
+        fallback = self._remember(session_id, query, self.fallback_response(query, language))
+        yield from self._fallback_events(fallback)
+    
+    def _fallback_events(self, fallback):
+        words = fallback['text'].split(' ')
+        for i, word in enumerate(words):
+            yield {'delta': word if i == 0 else f" {word}"}
+        yield self._done_event(fallback)
+    
+    def _iter_deltas(self, lines):
+        # OpenAI-compatible SSE: "data: {json}" lines terminated by "data: [DONE]"
+        for line in lines:
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+            if not line.startswith('data:'):
+                continue
+            payload = line[5:].strip()
+            if payload == '[DONE]':
+                return
+            delta = json.loads(payload)['choices'][0].get('delta', {}).get('content')
+            if delta:
+                yield delta
+    
+    def _context(self, session_id):
+        # (summary, [(role, text)]) of the conversation so far
+        return self.sessions.context(session_id) if session_id else (None, [])
+    
+    def _remember(self, session_id, query, result, answered=False):
+        # Fallback text is not recorded: the model gains nothing from it, and
+        # the farmer's question alone still carries the context
+        if session_id and query:
+            self.sessions.add(session_id, query, result['text'] if answered else None)
+        return result
+    
+    # With CHATBOT_SESSION_DB set, a session read or write may wait on SQLite
+    # (up to its 5 s busy timeout), so the ASGI paths run it in a thread
+    async def _acontext(self, session_id):
+        if session_id and self.sessions.path:
+            return await asyncio.to_thread(self._context, session_id)
+        return self._context(session_id)
+    
+    async def _aremember(self, session_id, query, result, answered=False):
+        if session_id and query and self.sessions.path:
+            return await asyncio.to_thread(self._remember, session_id, query, result, answered)
+        return self._remember(session_id, query, result, answered)
+    
+    def _build_request(self, query, language, context=(None, [])):
+        headers = {
+            'Authorization': f'Bearer {self.api_key}',
+            'Content-Type': 'application/json'
+        }
+        
+        system_prompts = {
+            'en-IN': 'You are SoilSync AI, a farming assistant. Provide helpful advice about crops, diseases, weather, and farming techniques in English.',
+            'hi-IN': 'आप SoilSync AI हैं, एक कृषि सहायक। फसलों, रोगों, मौसम और कृषि तकनीकों के बारे में हिंदी में सहायक सलाह प्रदान करें।',
+            'mr-IN': 'तुम्ही SoilSync AI आहात, एक शेती सहाय्यक. पिके, रोग, हवामान आणि शेती तंत्रांबद्दल मराठीत उपयुक्त सल्ला द्या.'
+        }
+        
+        # Session context is capped by token budget (sessions.py), so the
+        # prompt size stays bounded however long the conversation runs
+        summary, history = context
+        messages = [{'role': 'system', 'content': system_prompts.get(language, system_prompts['en-IN'])}]
+        if summary:
+            messages.append({'role': 'system', 'content': f'Earlier in this conversation: {summary}'})
+        messages.extend({'role': role, 'content': text} for role, text in history)
+        messages.append({'role': 'user', 'content': query})
+        
+        data = {
+            'model': 'llama-3.1-8b-instant',
+            'messages': messages,
+            'max_tokens': 150,
+            'temperature': 0.7
+        }
+        return headers, data
+    
+    def _parse_completion(self, result):
+        return {
+            'text': result['choices'][0]['message']['content'],
+            'confidence': 0.95,
+            'suggestions': ['Disease Detection', 'Weather Forecast', 'Fertilizer Advice']
+        }
     
     def fallback_response(self, query, language):
+        FALLBACKS.inc('fallback_response')
         responses = {
             'en-IN': f"I understand you're asking about: '{query}'. As your AI farming assistant, I can help with crop diseases, weather forecasts, fertilizer advice, and farming techniques. What specific help do you need?",
             'hi-IN': f"मैं समझता हूं कि आप पूछ रहे हैं: '{query}'। आपके AI कृषि सहायक के रूप में, मैं फसल रोगों, मौसम पूर्वानुमान, उर्वरक सलाह और कृषि तकनीकों में मदद कर सकता हूं।",
@@ -237,200 +852,599 @@ class GroqChatbot:
 
 weather_service = OpenWeatherService()
 chatbot = GroqChatbot()
+registry.collector(chatbot.sessions.collect)
 
 # ==================== DISEASE DETECTION ====================
 class DiseaseDetectionModel:
+    def __init__(self):
+        self.engine = DiseaseInferenceEngine(app.config['DISEASE_MODEL_PATH'], app.config['DISEASE_MAX_IMAGE_PIXELS'])
+        self.pool = None
+        if app.config['DISEASE_POOL_SIZE'] > 0:
+            # Slots cover every image that can be queued, batched or decoding at once
+            self.pool = InferencePool(
+                app.config['DISEASE_MODEL_PATH'],
+                app.config['DISEASE_POOL_SIZE'],
+                app.config['DISEASE_QUEUE_MAX_DEPTH'] + app.config['DISEASE_BATCH_MAX_SIZE'] + 4 * app.config['DISEASE_POOL_SIZE'],
+                max_pixels=app.config['DISEASE_MAX_IMAGE_PIXELS']
+            )
+            # Worker processes are started per server process, by the
+            # 'disease_pool' warm-up step or the first image
+        with open(app.config['DISEASE_MODEL_PATH'], 'rb') as f:
+            model_fingerprint = hashlib.sha1(f.read()).hexdigest()
+        self.cache = ImageHashCache(
+            maxsize=app.config['DISEASE_CACHE_SIZE'],
+            max_distance=app.config['DISEASE_CACHE_MAX_DISTANCE'],
+            path=app.config['DISEASE_CACHE_PATH'] or None,
+            fingerprint=model_fingerprint
+        )
+        atexit.register(self.cache.save)
+        # Decoding happens before queueing; only the classifier runs batched
+        self.batcher = MicroBatcher(
+            self._classify,
+            max_batch=app.config['DISEASE_BATCH_MAX_SIZE'],
+            max_wait=app.config['DISEASE_BATCH_MAX_WAIT_MS'] / 1000,
+            max_queue=app.config['DISEASE_QUEUE_MAX_DEPTH']
+        )
+    
+    def _classify(self, images):
+        # With a pool, `images` are shared-memory slot numbers
+        if self.pool:
+            return self.pool.classify(images)
+        return self.engine.predict_batch(np.stack(images))
+    
+    def _preprocess_many(self, images):
+        # (pixels or slot, fingerprint) per image, or its ImageDecodeError
+        if self.pool:
+            return self.pool.preprocess_many(images, timeout=5)
+        
+        decoded = []
+        for image_data in images:
+            try:
+                pixels = self.engine.preprocess(image_data)
+                decoded.append((pixels, image_fingerprint(pixels)))
+            except ImageDecodeError as e:
+                decoded.append(e)
+        return decoded
+    
+    def _digest(self, image_data):
+        if hasattr(image_data, 'read'):
+            # Spooled uploads are hashed in chunks and rewound for the decoder
+            hasher = hashlib.blake2b(digest_size=16)
+            image_data.seek(0)
+            for chunk in iter(lambda: image_data.read(64 * 1024), b''):
+                hasher.update(chunk)
+            empty = image_data.tell() == 0
+            image_data.seek(0)
+            return None if empty else hasher.hexdigest()
+        if not image_data:
+            return None
+        if isinstance(image_data, str):
+            image_data = image_data.encode('utf-8')
+        return hashlib.blake2b(image_data, digest_size=16).hexdigest()
+    
     def predict_disease(self, image_data):
-        diseases = ['Healthy', 'Leaf_Blight', 'Powdery_Mildew', 'Rust_Disease']
-        disease = random.choice(diseases)
-        confidence = random.uniform(75, 95)
+        return self.predict_many([image_data])[0]
+    
+    def predict_many(self, images):
+        # Returns one prediction per image, or an ImageDecodeError in its place;
+        # raises QueueFull when the inference queue is saturated
+        start = time.perf_counter()
+        digests = [self._digest(image) for image in images]
+        found = [None] * len(images)
         
-        return {
-            'disease': disease,
-            'confidence': round(confidence, 1),
-            'processing_time': '1.2s'
-        }
+        # Byte-identical re-uploads are answered without decoding
+        if self.cache.enabled:
+            for i, digest in enumerate(digests):
+                if digest:
+                    found[i] = self.cache.get_digest(digest)
+        hits = {i for i, item in enumerate(found) if item is not None}
+        
+        todo = [i for i in range(len(images)) if i not in hits]
+        misses = []
+        for i, item in zip(todo, self._preprocess_many([images[i] for i in todo])):
+            if isinstance(item, ImageDecodeError):
+                found[i] = item
+                continue
+            pixels, (phash, colour) = item
+            cached = self.cache.get(phash, colour, digests[i]) if self.cache.enabled else None
+            if cached is None:
+                misses.append((i, pixels, phash, colour))
+                continue
+            found[i] = cached
+            hits.add(i)
+            if self.pool:
+                self.pool.release([pixels])
+        
+        try:
+            futures = self.batcher.submit_many([pixels for _, pixels, _, _ in misses])
+        except QueueFull:
+            if self.pool:
+                self.pool.release([pixels for _, pixels, _, _ in misses])
+            raise
+        for (i, _, phash, colour), future in zip(misses, futures):
+            found[i] = future.result()
+            self.cache.put(phash, colour, found[i], digests[i])
+        
+        results = []
+        for i, item in enumerate(found):
+            if isinstance(item, ImageDecodeError):
+                results.append(item)
+                continue
+            elapsed = time.perf_counter() - start
+            results.append(dict(
+                item,
+                cache_hit=i in hits,
+                processing_time=f"{elapsed * 1000:.1f}ms",
+                processing_ms=round(elapsed * 1000, 2)
+            ))
+        return results
 
 disease_model = DiseaseDetectionModel()
 
 # ==================== SYMPTOM ANALYZER ====================
 class SymptomAnalyzer:
-    def analyze_symptoms(self, symptoms):
-        symptom_map = {
-            ('brown_spots', 'yellowing'): 'Leaf_Blight',
-            ('white_powder', 'leaf_curl'): 'Powdery_Mildew',
-            ('orange_spots', 'leaf_drop'): 'Rust_Disease'
-        }
-        
-        best_match = 'Healthy'
-        max_score = 0
-        
-        for symptom_set, disease in symptom_map.items():
-            score = len(set(symptoms) & set(symptom_set))
-            if score > max_score:
-                max_score = score
-                best_match = disease
+    def __init__(self):
+        # Inverted index over the profile data file, built once at startup
+        self.index = SymptomIndex.from_file(app.config['SYMPTOM_PROFILES_PATH'])
+    
+    def analyze_symptoms(self, symptoms, crop=None, top_k=None):
+        ranked = self.index.rank(symptoms or [], crop, app.config['SYMPTOM_TOP_K'] if top_k is None else top_k)
+        for match in ranked:
+            match['confidence'] = round(min(95, 60 + 35 * match['score']), 1)
         
-        confidence = min(95, 60 + (max_score * 15)) if max_score > 0 else 75
+        if not ranked:
+            return {
+                'disease': 'Healthy',
+                'confidence': 75,
+                'matched_symptoms': 0,
+                'ranked': []
+            }
         
+        best = ranked[0]
         return {
-            'disease': best_match,
-            'confidence': confidence,
-            'matched_symptoms': max_score
+            'disease': best['disease'],
+            'confidence': best['confidence'],
+            'matched_symptoms': len(best['matched_symptoms']),
+            'ranked': ranked
         }
 
 symptom_analyzer = SymptomAnalyzer()
 
 # ==================== TREATMENT ENGINE ====================
+# Knowledge bases for the services below are loaded from data/rules.json
+rules = RulesStore(app.config['RULES_PATH'])
+
 class TreatmentEngine:
     def get_treatment(self, disease):
-        treatments = {
-            'Leaf_Blight': {
-                'chemical': 'Copper oxychloride 50% WP @ 2g/L',
-                'organic': 'Neem oil spray (5ml/L) + Trichoderma',
-                'fertilizer': 'Balanced NPK 19:19:19 @ 2g/L',
-                'prevention': 'Improve drainage, avoid overhead irrigation'
-            },
-            'Powdery_Mildew': {
-                'chemical': 'Wettable sulfur 80% WP @ 2g/L',
-                'organic': 'Baking soda solution (5g/L)',
-                'fertilizer': 'Reduce nitrogen, increase potassium',
-                'prevention': 'Ensure good air circulation'
-            },
-            'Healthy': {
-                'maintenance': 'Continue current care practices',
-                'fertilizer': 'Regular balanced NPK',
-                'prevention': 'Weekly health monitoring'
-            }
-        }
-        return treatments.get(disease, treatments['Healthy'])
+        # A diagnosis without an entry gets an explicit "consult an extension
+        # officer" answer, never the Healthy care advice
+        treatments = rules['treatments']
+        return treatments['by_disease'].get(disease, treatments['not_on_file'])
+    
+    def missing_treatments(self):
+        # Diseases the symptom profiles or the image classifier can diagnose
+        # that have no treatment entry
+        diagnosable = {disease for disease, _ in symptom_analyzer.index.profiles}
+        diagnosable.update(disease_model.engine.classes)
+        return sorted(diagnosable - set(rules['treatments']['by_disease']))
 
 treatment_engine = TreatmentEngine()
 
+# Crop and disease words from the data files also have to agree for a fuzzy
+# chatbot cache hit ("leaf blight" vs "early blight")
+chatbot.cache.terms.update(crop.lower() for crop in rules['crops']['suitability']['crops'])
+chatbot.cache.terms.update(
+    word.lower()
+    for disease, crop in symptom_analyzer.index.profiles
+    for word in disease.split('_') + ([crop] if crop else [])
+)
+
 # ==================== SUBSIDY FINDER ====================
 class SubsidyFinder:
+    def __init__(self):
+        self._compiled = (None, None)
+    
+    def catalogue(self):
+        # Eligibility index rebuilt whenever the rules store swaps in new tables
+        tables = rules.current()
+        if self._compiled[0] is not tables:
+            self._compiled = (tables, SchemeCatalogue(tables['subsidies']))
+        return self._compiled[1]
+    
     def find_subsidies(self, crop, category, land_size):
-        subsidies = []
-        
-        # Crop-specific subsidies
-        crop_subsidies = {
-            'wheat': ['50% subsidy on certified wheat seeds', 'Wheat procurement at MSP'],
-            'rice': ['Rice seed subsidy up to 75%', 'Paddy procurement guarantee'],
-            'maize': ['Hybrid maize seed subsidy', 'Maize processing unit support'],
-            'cotton': ['Cotton seed subsidy 50%', 'Cotton technology mission'],
-            'vegetables': ['Vegetable cluster development', 'Cold storage subsidy']
-        }
-        
-        # Category-based subsidies
-        if category == 'small':
-            subsidies.extend(['PM-KISAN ₹6000/year', 'Small farmer credit scheme'])
-        elif category == 'marginal':
-            subsidies.extend(['Marginal farmer support', 'Free soil testing'])
-        elif category == 'large':
-            subsidies.extend(['Farm mechanization subsidy', 'Agri-infrastructure support'])
-        
-        # Land size-based subsidies
-        if float(land_size) >= 5:
-            subsidies.extend(['Machinery & equipment subsidy', 'Drip irrigation subsidy'])
-        if float(land_size) >= 10:
-            subsidies.extend(['Custom hiring center', 'Warehouse subsidy'])
-        
-        # Add crop-specific subsidies
-        if crop in crop_subsidies:
-            subsidies.extend(crop_subsidies[crop])
-        
-        # Common subsidies
-        subsidies.extend(['Soil health card', 'Crop insurance scheme', 'Kisan credit card'])
-        
-        return list(set(subsidies))  # Remove duplicates
+        # Scheme names in catalogue order; raises ValueError on a bad land_size
+        catalogue = self.catalogue()
+        return catalogue.names(catalogue.eligible(crop, category, land_size))
 
 # ==================== FERTILIZER RECOMMENDER ====================
 class FertilizerRecommender:
-    def recommend_fertilizer(self, crop, soil_type, growth_stage, area=1):
-        recommendations = {
-            'wheat': {
-                'initial': 'Apply 120kg/ha Urea + 60kg/ha DAP',
-                'vegetative': 'Top dress with 40kg/ha Urea',
-                'flowering': 'Apply 20kg/ha Potash + Micronutrients',
-                'maturity': 'No fertilizer needed, prepare for harvest'
-            },
-            'rice': {
-                'initial': 'Apply 100kg/ha NPK (10:26:26) + 50kg/ha Urea',
-                'vegetative': 'Top dress with 60kg/ha Urea in 2 splits',
-                'flowering': 'Apply 25kg/ha Potash + Zinc sulphate',
-                'maturity': 'Ensure proper drainage, no fertilizer'
-            },
-            'maize': {
-                'initial': 'Apply 150kg/ha NPK (12:32:16)',
-                'vegetative': 'Side dress with 80kg/ha Urea',
-                'flowering': 'Apply 30kg/ha Potash',
-                'maturity': 'Monitor for harvest readiness'
-            },
-            'vegetables': {
-                'initial': 'Apply compost 5t/ha + NPK (19:19:19) 100kg/ha',
-                'vegetative': 'Weekly liquid fertilizer application',
-                'flowering': 'High phosphorus fertilizer + Calcium',
-                'maturity': 'Reduce fertilizer, focus on quality'
-            }
-        }
+    def __init__(self):
+        self._compiled = (None, None)
+    
+    def dosage_model(self):
+        # Recompiled whenever the rules store swaps in new tables
+        tables = rules.current()
+        if self._compiled[0] is not tables:
+            self._compiled = (tables, DosageModel(tables['fertilizer']['dosage']))
+        return self._compiled[1]
+    
+    def recommend_fertilizer(self, crop, soil_type, growth_stage, area=1, area_unit='ha'):
+        table = rules['fertilizer']
+        model = self.dosage_model()
+        note = table['schedules'].get(crop, {}).get(growth_stage, table['default'])
+        base_rec = model.schedule_text(crop, soil_type, growth_stage, note)
         
-        base_rec = recommendations.get(crop, {}).get(growth_stage, 'Consult agricultural expert')
+        result = model.compute([crop], [soil_type], [growth_stage], [area], area_unit)
+        dosage = None
+        if result['valid'][0]:
+            dosage = {
+                'area_ha': round(float(result['area_ha'][0]), 4),
+                'nutrients_kg_per_ha': dict(zip(model.nutrients, np.round(result['kg_ha'][0], 1).tolist())),
+                'nutrients_kg': dict(zip(model.nutrients, np.round(result['nutrients_kg'][0], 2).tolist())),
+                'products_kg': dict(zip(model.products, np.round(result['products_kg'][0], 2).tolist()))
+            }
         
         return {
             'fertilizer': base_rec,
-            'application_method': 'Apply in morning or evening, avoid midday heat',
-            'precautions': 'Test soil pH before application, ensure adequate moisture'
+            'dosage': dosage,
+            'application_method': table['application_method'],
+            'precautions': table['precautions']
         }
+    
+    def calculate_batch(self, columns, area_unit='ha'):
+        # columns: parallel lists keyed id, crop, soil_type, growth_stage, area
+        model = self.dosage_model()
+        result = model.compute(
+            columns['crop'], columns['soil_type'], columns['growth_stage'], columns['area'], area_unit
+        )
+        return model, result
 
 # ==================== CROP RECOMMENDER ====================
+def forecast_temperature(forecast):
+    # Mean forecast temperature, or None for missing or fallback (made-up) data
+    if not forecast or forecast.get('fallback'):
+        return None
+    temps = []
+    for entry in forecast.get('list', []):
+        main = entry.get('main', {})
+        if 'temp' in main:
+            temps.append(main['temp'])
+        elif 'temp_max' in main and 'temp_min' in main:
+            temps.append((main['temp_max'] + main['temp_min']) / 2)
+    return round(sum(temps) / len(temps), 1) if temps else None
+
 class CropRecommender:
-    def recommend_crop(self, soil_type, climate, water_availability, season):
-        crop_options = {
-            'clay': ['Rice', 'Wheat', 'Sugarcane'],
-            'sandy': ['Bajra', 'Groundnut', 'Watermelon'],
-            'loamy': ['Maize', 'Cotton', 'Soybean'],
-            'black': ['Cotton', 'Soybean', 'Sunflower']
+    def __init__(self):
+        self._compiled = (None, None)
+    
+    def suitability_model(self):
+        # Recompiled whenever the rules store swaps in new tables
+        tables = rules.current()
+        if self._compiled[0] is not tables:
+            self._compiled = (tables, SuitabilityModel(tables['crops']['suitability']))
+        return self._compiled[1]
+    
+    def recommend_crop(self, soil_type, climate, water_availability, season, forecast=None):
+        table = rules['crops']
+        model = self.suitability_model()
+        profile = {
+            'soil_type': soil_type,
+            'climate': climate,
+            'water_availability': water_availability,
+            'season': season
         }
         
-        recommended_crops = crop_options.get(soil_type, ['Mixed farming'])
+        known = model.known(profile)
+        if not known:
+            return {
+                'recommended_crops': list(table['default']),
+                'primary_choice': table['default'][0],
+                'reasoning': 'No recognised soil, climate, water or season given',
+                'additional_tips': table['additional_tips'],
+                'ranked': []
+            }
         
+        temperature = forecast_temperature(forecast)
+        scores = model.score_one(profile, temperature)
+        ranked = []
+        for i in model.rank_one(scores, app.config['CROP_TOP_K']):
+            factors = model.factor_breakdown(i, profile)
+            if temperature is not None:
+                factors['temperature'] = round(float(model.temperature_scores([temperature])[0, i]), 2)
+            ranked.append({
+                'crop': model.crops[i],
+                'score': round(float(scores[i]) * 100, 1),
+                'factors': factors
+            })
+        
+        conditions = ', '.join(f'{profile[factor]} {factor.replace("_", " ")}' for factor in known)
+        if temperature is not None:
+            conditions += f', {temperature}°C forecast'
+        recommended_crops = [match['crop'] for match in ranked]
         return {
             'recommended_crops': recommended_crops,
             'primary_choice': recommended_crops[0],
-            'reasoning': f'Best suited for {soil_type} soil type',
-            'additional_tips': 'Consider crop rotation and market demand'
+            'reasoning': f'Best suited for {conditions}',
+            'additional_tips': table['additional_tips'],
+            'ranked': ranked,
+            'forecast_temperature': temperature
         }
+    
+    def recommend_many(self, columns, temperatures=None, top_k=3):
+        # Bulk scoring: one table gather for every profile, then top-k per row
+        model = self.suitability_model()
+        scores = model.score(columns, temperatures)
+        top = model.top_k(scores, top_k)
+        return model, scores, top
 
 subsidy_finder = SubsidyFinder()
 fertilizer_recommender = FertilizerRecommender()
 crop_recommender = CropRecommender()
 
+# ==================== HEALTH & STARTUP ====================
+# Nothing at import time talks to an upstream or starts a thread or process:
+# the server listens straight away and each process warms up in the
+# background; upstream health comes from real calls, with probes by one
+# process only (health.py), reported at /healthz and /readyz.
+health = HealthMonitor(app.config['HEALTH_CHECK_INTERVAL'], app.config['HEALTH_PROBE_LOCK'] or None)
+registry.collector(health.collect)
+
+@health.warm_up('rule_models')
+def compile_rule_models():
+    # Models derived from the rule tables are otherwise built by the first request
+    crop_recommender.suitability_model()
+    fertilizer_recommender.dosage_model()
+    subsidy_finder.catalogue()
+    missing = treatment_engine.missing_treatments()
+    if missing:
+        app.logger.warning("No treatment on file for diagnosable diseases: %s", ', '.join(missing))
+
+@health.warm_up('static_assets')
+def build_static_assets():
+    static_assets.get('index.html')
+
+@health.warm_up('weather_prewarm')
+def start_weather_prewarm():
+    # Restores the weather snapshot before the worker reports ready, then
+    # keeps popular cities fresh in the background
+    if weather_service.api_key and weather_service.prewarmer.enabled:
+        weather_service.prewarmer.start()
+
+@health.warm_up('disease_pool')
+def start_disease_pool():
+    if disease_model.pool:
+        disease_model.pool.warm_up()
+
+health.check('openweather', weather_service.client.breaker.observed)(weather_service.probe)
+health.check('groq', chatbot.client.breaker.observed)(chatbot.probe)
+
+def create_app():
+    # Application factory for production servers:
+    #   gunicorn --preload -w 4 -b 0.0.0.0:5000 'app:create_app()'
+    #   uvicorn asgi:application (asgi.py calls it)
+    # Only local, fork-safe work runs here, in milliseconds: compiled rule
+    # models and precompressed static files are built once, before a
+    # preloaded master forks, so every worker shares them. Threads, process
+    # pools and upstream probes start per worker (gunicorn.conf.py, or
+    # otherwise the first request).
+    compile_rule_models()
+    build_static_assets()
+    # Rule tables, indexes and model weights now live for the whole process.
+    # Freezing them out of the garbage collector keeps GC passes from writing
+    # to their pages, so workers forked from a preloaded master keep sharing
+    # them instead of each taking a copy.
+    gc.freeze()
+    return app
+
+@app.before_request
+def start_health_monitor():
+    health.start()
+
 # ==================== API ROUTES ====================
 
+class UploadTooLarge(Exception):
+    pass
+
+def upload_limit(encoded):
+    limit = app.config['DISEASE_MAX_UPLOAD_BYTES']
+    # Base64 inside JSON carries a third more bytes for the same image
+    return limit * 4 // 3 + 1024 if encoded else limit
+
+# Request body allowances above MAX_CONTENT_LENGTH, by endpoint
+BULK_ENDPOINTS = {
+    'fertilizer_batch': 'BULK_MAX_BODY_BYTES',
+    'recommend_crop_batch': 'BULK_MAX_BODY_BYTES',
+    'detect_disease_symptoms_batch': 'BULK_MAX_BODY_BYTES',
+    'subsidy_bulk': 'SUBSIDY_BULK_MAX_BODY_BYTES'
+}
+IMAGE_ENDPOINTS = ('detect_disease_image', 'detect_disease_image_batch')
+
+def body_limit():
+    if request.endpoint in IMAGE_ENDPOINTS:
+        return upload_limit(not (request.mimetype == 'multipart/form-data' or request.mimetype.startswith('image/')))
+    if request.endpoint in BULK_ENDPOINTS:
+        return app.config[BULK_ENDPOINTS[request.endpoint]]
+    return app.config['MAX_CONTENT_LENGTH']
+
+class CappedInput:
+    # wsgi.input for a body without a Content-Length (chunked): raises 413
+    # once more than `limit` bytes arrive, where Werkzeug's own maximum would
+    # silently truncate the body
+    def __init__(self, stream, limit):
+        self.stream = stream
+        self.remaining = limit
+    
+    def read(self, size=-1):
+        data = self.stream.read(size) if size is not None and size >= 0 else self.stream.read()
+        self.remaining -= len(data)
+        if self.remaining < 0:
+            raise RequestEntityTooLarge()
+        return data
+    
+    def readline(self, size=-1):
+        data = self.stream.readline(size)
+        self.remaining -= len(data)
+        if self.remaining < 0:
+            raise RequestEntityTooLarge()
+        return data
+
+@app.before_request
+def limit_request_body():
+    # Every body is bounded, declared or chunked. A declared oversized body is
+    # refused before any route reads it; a chunked one fails while being read
+    # (the batch and image routes turn that into their own 413 too)
+    limit = body_limit()
+    # Werkzeug's own check stands down (None would fall back to the config)
+    request.max_content_length = sys.maxsize
+    if request.content_length is not None:
+        if request.content_length > limit:
+            raise RequestEntityTooLarge()
+    elif request.environ.get('wsgi.input_terminated'):
+        request.environ['wsgi.input'] = CappedInput(request.environ['wsgi.input'], limit)
+        if request.endpoint not in BULK_ENDPOINTS and request.endpoint not in IMAGE_ENDPOINTS:
+            # Small JSON bodies are read (and cached) here, so an oversized one
+            # is answered 413 before a route's catch-all could see it
+            request.get_data()
+
+@app.errorhandler(RequestEntityTooLarge)
+def body_too_large(error):
+    if request.endpoint in IMAGE_ENDPOINTS:
+        return too_large_response()
+    return jsonify({'error': f'Request body exceeds {body_limit()} bytes'}), 413
+
+def read_image_uploads(field):
+    # Images from multipart/form-data files, a raw image/* body, or the
+    # original JSON form with base64 strings. Multipart files are hashed and,
+    # in-process, decoded straight from their (spooled) file objects rather
+    # than copied into memory; with DISEASE_POOL_SIZE > 0 each one is read into
+    # bytes to reach a worker, so a request holds at most
+    # DISEASE_BATCH_MAX_IMAGES x DISEASE_MAX_UPLOAD_BYTES.
+    # The body itself is bounded by limit_request_body (upload_limit)
+    mimetype = request.mimetype
+    try:
+        if mimetype == 'multipart/form-data':
+            return [upload.stream for upload in request.files.getlist(field)]
+        if mimetype.startswith('image/'):
+            return [request.stream.read()]
+        data = request.get_json()
+    except RequestEntityTooLarge:
+        raise UploadTooLarge()
+    value = data.get(field)
+    return value if isinstance(value, list) else [value]
+
+def too_large_response():
+    limit_mb = app.config['DISEASE_MAX_UPLOAD_BYTES'] / (1024 * 1024)
+    return jsonify({
+        'error': f'Image upload exceeds {limit_mb:g} MB',
+        'upload_hint': upload_hint()
+    }), 413
+
+def upload_hint():
+    # Lets clients downscale before uploading; the model never uses more pixels than this
+    return {
+        'max_dimension': app.config['DISEASE_UPLOAD_MAX_DIMENSION'],
+        'format': 'image/jpeg',
+        'quality': 0.85
+    }
+
+def busy_response(error):
+    response = jsonify({'error': str(error)})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
 @app.route('/api/disease/detect-image', methods=['POST'])
 def detect_disease_image():
     try:
-        data = request.get_json()
-        image_data = data.get('image')
+        images = read_image_uploads('image')
+        if len(images) != 1:
+            return jsonify({'error': 'Send exactly one image'}), 400
         
-        prediction = disease_model.predict_disease(image_data)
+        prediction = disease_model.predict_disease(images[0])
+        if isinstance(prediction, ImageDecodeError):
+            return jsonify({'error': str(prediction), 'upload_hint': upload_hint()}), 400
         treatment = treatment_engine.get_treatment(prediction['disease'])
         
         return jsonify({
             'status': 'success',
             'prediction': prediction,
-            'treatment': treatment
+            'treatment': treatment,
+            'cache_hit': prediction['cache_hit'],
+            'upload_hint': upload_hint()
         })
+    except UploadTooLarge:
+        return too_large_response()
+    except QueueFull as e:
+        return busy_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/disease/detect-image/batch', methods=['POST'])
+def detect_disease_image_batch():
+    try:
+        images = read_image_uploads('images')
+        
+        if not images or images == [None]:
+            return jsonify({'error': 'images must be a non-empty list'}), 400
+        if len(images) > app.config['DISEASE_BATCH_MAX_IMAGES']:
+            return jsonify({'error': f"At most {app.config['DISEASE_BATCH_MAX_IMAGES']} images per request"}), 400
+        
+        results = []
+        for prediction in disease_model.predict_many(images):
+            if isinstance(prediction, ImageDecodeError):
+                results.append({'status': 'error', 'error': str(prediction)})
+            else:
+                results.append({
+                    'status': 'success',
+                    'prediction': prediction,
+                    'treatment': treatment_engine.get_treatment(prediction['disease'])
+                })
+        
+        return jsonify({
+            'status': 'success',
+            'results': results,
+            'upload_hint': upload_hint()
+        })
+    except UploadTooLarge:
+        return too_large_response()
+    except QueueFull as e:
+        return busy_response(e)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/disease/batch-stats', methods=['GET'])
+def disease_batch_stats():
+    return jsonify({
+        'status': 'success',
+        'batching': disease_model.batcher.stats(),
+        'cache': disease_model.cache.stats(),
+        'pool': disease_model.pool.stats() if disease_model.pool else None
+    })
+
+@app.route('/api/disease/treatment', methods=['GET'])
+def disease_treatment():
+    # Treatment advice on its own, e.g. to re-display a past diagnosis
+    disease = request.args.get('disease')
+    if not disease:
+        return jsonify({'error': 'disease is required'}), 400
+    return conditional_json({
+        'status': 'success',
+        'disease': disease,
+        'treatment': treatment_engine.get_treatment(disease)
+    })
+
 @app.route('/api/disease/detect-symptoms', methods=['POST'])
 def detect_disease_symptoms():
     try:
         data = request.get_json()
         symptoms = data.get('symptoms', [])
+        top_k = data.get('top_k', app.config['SYMPTOM_TOP_K'])
+        profile_count = len(symptom_analyzer.index.profiles)
+        
+        if isinstance(top_k, bool) or not isinstance(top_k, int) or not 1 <= top_k <= profile_count:
+            return jsonify({'error': f'top_k must be an integer from 1 to {profile_count}'}), 400
         
-        analysis = symptom_analyzer.analyze_symptoms(symptoms)
+        analysis = symptom_analyzer.analyze_symptoms(symptoms, data.get('crop'), top_k)
         treatment = treatment_engine.get_treatment(analysis['disease'])
         
         return jsonify({
@@ -441,6 +1455,45 @@ def detect_disease_symptoms():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/disease/detect-symptoms/batch', methods=['POST'])
+def detect_disease_symptoms_batch():
+    try:
+        data = request.get_json()
+        queries = data.get('queries')
+        top_k = data.get('top_k', app.config['SYMPTOM_TOP_K'])
+        profile_count = len(symptom_analyzer.index.profiles)
+        
+        if not isinstance(queries, list) or not queries:
+            return jsonify({'error': 'queries must be a non-empty list'}), 400
+        if isinstance(top_k, bool) or not isinstance(top_k, int) or not 1 <= top_k <= profile_count:
+            return jsonify({'error': f'top_k must be an integer from 1 to {profile_count}'}), 400
+        if len(queries) > app.config['SYMPTOM_BATCH_MAX_QUERIES']:
+            return jsonify({'error': f"At most {app.config['SYMPTOM_BATCH_MAX_QUERIES']} queries per request"}), 400
+        
+        # Each query is a symptom list or {"symptoms": [...], "crop": "..."}
+        results = []
+        for query in queries:
+            if isinstance(query, dict):
+                symptoms, crop = query.get('symptoms', []), query.get('crop', data.get('crop'))
+            else:
+                symptoms, crop = query, data.get('crop')
+            if not isinstance(symptoms, list):
+                return jsonify({'error': 'symptoms must be a list'}), 400
+            analysis = symptom_analyzer.analyze_symptoms(symptoms, crop, top_k)
+            results.append({
+                'analysis': analysis,
+                'treatment': treatment_engine.get_treatment(analysis['disease'])
+            })
+        
+        return jsonify({
+            'status': 'success',
+            'results': results
+        })
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/weather/current', methods=['POST'])
 def get_current_weather():
     try:
@@ -471,68 +1524,520 @@ def get_weather_forecast():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/subsidy/find', methods=['POST'])
-def find_subsidies():
+def parse_bundle_cities(data):
+    # Returns None for the single-city form, otherwise a de-duplicated city list
+    cities = data.get('cities')
+    if cities is None:
+        return None
+    if not isinstance(cities, list) or not all(isinstance(c, str) and c.strip() for c in cities):
+        raise ValueError('cities must be a list of city names')
+    cities = list(dict.fromkeys(c.strip() for c in cities))
+    if len(cities) > app.config['WEATHER_BUNDLE_MAX_CITIES']:
+        raise ValueError(f"At most {app.config['WEATHER_BUNDLE_MAX_CITIES']} cities per request")
+    return cities
+
+@app.route('/api/weather/bundle', methods=['POST'])
+def get_weather_bundle():
     try:
         data = request.get_json()
+        try:
+            cities = parse_bundle_cities(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Single-city form mirrors /current + /forecast in one response
+        if cities is None:
+            bundle = weather_service.get_bundle([data.get('city')])[0]
+            return jsonify({
+                'status': 'success',
+                'weather': bundle['weather'],
+                'forecast': bundle['forecast']
+            })
+        
+        return jsonify({
+            'status': 'success',
+            'results': weather_service.get_bundle(cities)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/weather/cache-stats', methods=['GET'])
+def weather_cache_stats():
+    return jsonify({
+        'status': 'success',
+        'cache': weather_service.cache_stats()
+    })
+
+@app.route('/api/subsidy/find', methods=['GET', 'POST'])
+def find_subsidies():
+    # POST with a JSON body, or GET ?crop=&category=&land_size= for HTTP caching
+    try:
+        data = request.args if request.method == 'GET' else request.get_json()
         crop = data.get('crop')
         category = data.get('category')
         land_size = data.get('land_size')
         
-        subsidies = subsidy_finder.find_subsidies(crop, category, land_size)
+        catalogue = subsidy_finder.catalogue()
+        try:
+            found = catalogue.eligible(crop, category, land_size)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'land_size must be a non-negative number'}), 400
         
-        return jsonify({
+        return conditional_json({
             'status': 'success',
-            'subsidies': subsidies,
-            'total_schemes': len(subsidies)
+            'subsidies': catalogue.names(found),
+            'scheme_ids': [catalogue.ids[i] for i in found],
+            'total_schemes': len(found),
+            'catalogue_version': catalogue.version
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/fertilizer/recommend', methods=['POST'])
+@app.route('/api/subsidy/schemes', methods=['GET'])
+def subsidy_schemes():
+    # The full catalogue, for mapping the scheme ids in bulk output to names
+    catalogue = subsidy_finder.catalogue()
+    return conditional_json({
+        'status': 'success',
+        'catalogue_version': catalogue.version,
+        'schemes': catalogue.schemes,
+        'index': catalogue.stats()
+    })
+
+REGISTRY_FIELDS = ('id', 'crop', 'category', 'land_size')
+
+class RequestBody(io.RawIOBase):
+    # The WSGI input as a raw binary stream, so it can be buffered and decoded
+    # incrementally; server input objects (e.g. gunicorn's) only offer read()
+    def __init__(self, stream):
+        self.stream = stream
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        data = self.stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+def read_registry(stream, registry_format):
+    # Farmer records as (id, crop, category, land_size) tuples, read line by
+    # line from a CSV (with header) or NDJSON stream. The CSV header is read
+    # eagerly so a missing column fails before the response starts.
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if registry_format == 'csv':
+        rows = csv.reader(text)
+        header = [name.strip().lower() for name in next(rows, [])]
+        missing = [field for field in REGISTRY_FIELDS[1:] if field not in header]
+        if missing:
+            raise ValueError(f"Registry CSV is missing columns: {', '.join(missing)}")
+        id_at = header.index('id') if 'id' in header else None
+        crop_at, category_at, land_size_at = (header.index(field) for field in REGISTRY_FIELDS[1:])
+        
+        def records():
+            for number, row in enumerate(rows, 1):
+                if not row:
+                    continue
+                if len(row) < len(header):
+                    row += [''] * (len(header) - len(row))
+                yield (number if id_at is None else row[id_at]), row[crop_at], row[category_at], row[land_size_at]
+        return records()
+    
+    def records():
+        for number, line in enumerate(text, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                yield record.get('id', number), record.get('crop'), record.get('category'), record.get('land_size')
+            except (ValueError, AttributeError):
+                yield number, None, None, None
+    return records()
+
+def registry_lines(catalogue, results, output, chunk_rows=4096):
+    # Encoded output a few thousand lines at a time. Every distinct eligible
+    # set is encoded once, since a registry repeats a handful of profiles.
+    encoded = {}
+    if output == 'csv':
+        yield 'id,schemes,total,error\n'
+    lines = []
+    try:
+        for record_id, found, error in results:
+            fragment = encoded.get(found)
+            if fragment is None:
+                ids = [catalogue.ids[i] for i in found]
+                if output == 'csv':
+                    fragment = f"{';'.join(ids)},{len(ids)}"
+                else:
+                    fragment = f'"schemes": {json.dumps(ids)}, "total": {len(ids)}'
+                encoded[found] = fragment
+            if output == 'csv':
+                record_id = str(record_id).replace(',', ' ').replace('\n', ' ')
+                lines.append(f'{record_id},{fragment},{error or ""}')
+            elif error:
+                lines.append(f'{{"id": {json.dumps(record_id)}, {fragment}, "error": "{error}"}}')
+            else:
+                lines.append(f'{{"id": {json.dumps(record_id)}, {fragment}}}')
+            if len(lines) >= chunk_rows:
+                yield '\n'.join(lines) + '\n'
+                lines = []
+    except RequestEntityTooLarge:
+        # A chunked registry can pass the ceiling after the 200 has gone out,
+        # so the last line says where reading stopped
+        error = f"Registry exceeds {app.config['SUBSIDY_BULK_MAX_BODY_BYTES']} bytes; later records were not read"
+        lines.append(f',,,{error}' if output == 'csv' else json.dumps({'error': error}))
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+@app.route('/api/subsidy/bulk', methods=['POST'])
+def subsidy_bulk():
+    # Eligibility for a whole farmer registry, streamed: records are read from
+    # the upload and answered as they arrive, so memory stays flat however
+    # large the file. Send the registry as the raw body, text/csv (with an
+    # id,crop,category,land_size header) or application/x-ndjson, e.g.
+    #   curl --data-binary @registry.csv -H 'Content-Type: text/csv' .../api/subsidy/bulk
+    # Output is NDJSON unless ?format=csv; scheme ids map to names via
+    # /api/subsidy/schemes, and one catalogue version is used for the job.
+    try:
+        registry_format = 'csv' if request.mimetype == 'text/csv' else 'ndjson'
+        output = request.args.get('format', 'ndjson')
+        if registry_format not in ('csv', 'ndjson') or output not in ('csv', 'ndjson'):
+            return jsonify({'error': 'Formats must be csv or ndjson'}), 400
+        
+        try:
+            records = read_registry(io.BufferedReader(RequestBody(request.stream)), registry_format)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        catalogue = subsidy_finder.catalogue()
+        response = Response(
+            stream_with_context(registry_lines(catalogue, catalogue.evaluate(records), output)),
+            mimetype='text/csv' if output == 'csv' else 'application/x-ndjson'
+        )
+        response.headers['X-Subsidy-Catalogue'] = catalogue.version
+        return response
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/fertilizer/recommend', methods=['GET', 'POST'])
 def recommend_fertilizer():
     try:
-        data = request.get_json()
+        data = request.args if request.method == 'GET' else request.get_json()
         crop = data.get('crop')
         soil_type = data.get('soil_type')
         growth_stage = data.get('growth_stage')
         area = data.get('area', 1)
+        area_unit = data.get('area_unit', 'ha')
         
-        recommendation = fertilizer_recommender.recommend_fertilizer(crop, soil_type, growth_stage, area)
+        if area_unit not in fertilizer_recommender.dosage_model().area_units:
+            return jsonify({'error': f'Unknown area_unit: {area_unit}'}), 400
         
-        return jsonify({
+        recommendation = fertilizer_recommender.recommend_fertilizer(crop, soil_type, growth_stage, area, area_unit)
+        
+        return conditional_json({
             'status': 'success',
             'recommendation': recommendation
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/crop/recommend', methods=['POST'])
+PLOT_FIELDS = {'crop': None, 'soil_type': None, 'growth_stage': None, 'area': 1}
+
+def read_plot_csv(text):
+    # Column lists straight from csv.reader; a missing id column numbers the rows
+    rows = csv.reader(io.StringIO(text))
+    header = [name.strip() for name in next(rows, [])]
+    body = [row for row in rows if row]
+    columns = {}
+    for field, default in list(PLOT_FIELDS.items()) + [('id', None)]:
+        if field in header:
+            i = header.index(field)
+            columns[field] = [row[i].strip() if i < len(row) else default for row in body]
+        else:
+            columns[field] = [default] * len(body)
+    if 'id' not in header:
+        columns['id'] = list(range(len(body)))
+    return columns
+
+@app.route('/api/fertilizer/batch', methods=['POST'])
+def fertilizer_batch():
+    # Plots as JSON {"plots": [...], "area_unit": "ha"} or as a text/csv body
+    # with id,crop,soil_type,growth_stage,area columns. Answers in the same
+    # format unless ?format=json|csv says otherwise.
+    try:
+        if request.mimetype == 'text/csv':
+            columns = read_plot_csv(request.get_data(as_text=True))
+            area_unit = request.args.get('area_unit', 'ha')
+            output = request.args.get('format', 'csv')
+        else:
+            data = request.get_json()
+            plots = data.get('plots')
+            if not isinstance(plots, list) or not all(isinstance(plot, dict) for plot in plots):
+                return jsonify({'error': 'plots must be a list of objects'}), 400
+            columns = {field: [plot.get(field, default) for plot in plots] for field, default in PLOT_FIELDS.items()}
+            columns['id'] = [plot.get('id', i) for i, plot in enumerate(plots)]
+            area_unit = data.get('area_unit', 'ha')
+            output = request.args.get('format', 'json')
+        
+        count = len(columns['id'])
+        if not count:
+            return jsonify({'error': 'No plots given'}), 400
+        if count > app.config['FERTILIZER_BATCH_MAX_PLOTS']:
+            return jsonify({'error': f"At most {app.config['FERTILIZER_BATCH_MAX_PLOTS']} plots per request"}), 400
+        if area_unit not in fertilizer_recommender.dosage_model().area_units:
+            return jsonify({'error': f'Unknown area_unit: {area_unit}'}), 400
+        
+        model, result = fertilizer_recommender.calculate_batch(columns, area_unit)
+        
+        if output == 'csv':
+            return Response(model.csv_chunks(result, columns['id']), mimetype='text/csv')
+        return jsonify({
+            'status': 'success',
+            'plots': model.columns(result, columns['id']),
+            'totals': model.totals(result)
+        })
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/crop/recommend', methods=['GET', 'POST'])
 def recommend_crop():
     try:
-        data = request.get_json()
+        data = request.args if request.method == 'GET' else request.get_json()
         soil_type = data.get('soil_type')
         climate = data.get('climate')
         water_availability = data.get('water_availability')
         season = data.get('season')
+        city = data.get('city')
         
-        recommendation = crop_recommender.recommend_crop(soil_type, climate, water_availability, season)
+        # Live forecast temperatures refine the ranking when a city is given
+        forecast = weather_service.get_forecast(city) if city else None
+        recommendation = crop_recommender.recommend_crop(soil_type, climate, water_availability, season, forecast)
         
-        return jsonify({
+        return conditional_json({
             'status': 'success',
             'recommendation': recommendation
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/crop/recommend/batch', methods=['POST'])
+def recommend_crop_batch():
+    # District planning: {"profiles": [{"id", "soil_type", "climate",
+    # "water_availability", "season", "city"?}, ...], "top_k": 3}
+    try:
+        data = request.get_json()
+        profiles = data.get('profiles')
+        top_k = data.get('top_k', app.config['CROP_TOP_K'])
+        crop_count = len(crop_recommender.suitability_model().crops)
+        
+        if not isinstance(profiles, list) or not profiles or not all(isinstance(p, dict) for p in profiles):
+            return jsonify({'error': 'profiles must be a non-empty list of objects'}), 400
+        if isinstance(top_k, bool) or not isinstance(top_k, int) or not 1 <= top_k <= crop_count:
+            return jsonify({'error': f'top_k must be an integer from 1 to {crop_count}'}), 400
+        if len(profiles) > app.config['CROP_BATCH_MAX_PROFILES']:
+            return jsonify({'error': f"At most {app.config['CROP_BATCH_MAX_PROFILES']} profiles per request"}), 400
+        
+        cities = list(dict.fromkeys(p['city'] for p in profiles if p.get('city')))
+        if len(cities) > app.config['CROP_BATCH_MAX_CITIES']:
+            return jsonify({'error': f"At most {app.config['CROP_BATCH_MAX_CITIES']} distinct cities per request"}), 400
+        
+        # One (cached) forecast per distinct city, fetched concurrently
+        temperature_by_city = dict(zip(
+            cities, weather_service.fanout.map(lambda city: forecast_temperature(weather_service.get_forecast(city)), cities)
+        ))
+        temperatures = None
+        if cities:
+            temperatures = [temperature_by_city.get(p.get('city')) for p in profiles]
+            temperatures = [np.nan if t is None else t for t in temperatures]
+        
+        columns = {factor: [p.get(factor) for p in profiles] for factor in SuitabilityModel.FACTORS}
+        model, scores, top = crop_recommender.recommend_many(columns, temperatures, top_k)
+        
+        top_scores = np.round(np.take_along_axis(scores, top, axis=1) * 100, 1).tolist()
+        results = []
+        for i, (crops, crop_scores) in enumerate(zip(top.tolist(), top_scores)):
+            results.append({
+                'id': profiles[i].get('id', i),
+                'recommended_crops': [model.crops[c] for c in crops],
+                'scores': crop_scores
+            })
+        
+        # How many profiles each crop tops, and its mean suitability across the district
+        primary = np.bincount(top[:, 0], minlength=len(model.crops))
+        mean_scores = np.round(scores.mean(axis=0) * 100, 1)
+        summary = [
+            {'crop': crop, 'primary_for': int(primary[i]), 'mean_score': float(mean_scores[i])}
+            for i, crop in enumerate(model.crops)
+        ]
+        summary.sort(key=lambda row: (-row['primary_for'], -row['mean_score']))
+        
+        return jsonify({
+            'status': 'success',
+            'results': results,
+            'summary': summary,
+            'forecast_temperatures': temperature_by_city
+        })
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@registry.collector
+def service_metrics():
+    # Cache and queue counters are kept by their owners; read them per scrape
+    caches = {
+        'weather_current': weather_service.current_cache.stats(),
+        'weather_forecast': weather_service.forecast_cache.stats(),
+        'chatbot_query': chatbot.cache.stats(),
+        'disease_image': disease_model.cache.stats()
+    }
+    yield 'soilsync_cache_lookups_total', 'counter', 'Cache lookups by result', [
+        ({'cache': name, 'result': key}, value)
+        for name, stats in caches.items()
+        for key, value in stats.items()
+        if key.endswith('hits') or key in ('misses', 'coalesced')
+    ]
+    yield 'soilsync_cache_hit_ratio', 'gauge', 'Share of cache lookups answered from the cache', [
+        ({'cache': name}, stats['hit_ratio']) for name, stats in caches.items()
+    ]
+    yield 'soilsync_cache_entries', 'gauge', 'Entries held per cache', [
+        ({'cache': name}, stats['size']) for name, stats in caches.items()
+    ]
+    yield 'soilsync_cache_evictions_total', 'counter', 'Entries evicted per cache', [
+        ({'cache': name}, stats['evictions']) for name, stats in caches.items()
+    ]
+    
+    batching = disease_model.batcher.stats()
+    yield 'soilsync_disease_queue_depth', 'gauge', 'Images waiting for the inference batcher', [({}, batching['queue_depth'])]
+    yield 'soilsync_disease_images_total', 'counter', 'Images classified by the batcher', [({}, batching['processed'])]
+    yield 'soilsync_disease_rejected_total', 'counter', 'Images rejected with 503 because the queue was full', [
+        ({}, batching['rejected'])
+    ]
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    # Liveness: the process is up and serving requests
+    return jsonify(health.liveness())
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    # Readiness: 503 until this process has warmed up; upstream status is
+    # included but never makes it unready (fallbacks cover them)
+    return jsonify(health.readiness()), 200 if health.ready else 503
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    # Prometheus text exposition format
+    return Response(registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+def require_admin(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = app.config['ADMIN_TOKEN']
+        if token:
+            if request.headers.get('X-Admin-Token') != token:
+                return jsonify({'error': 'Forbidden'}), 403
+        elif request.remote_addr not in ('127.0.0.1', '::1'):
+            return jsonify({'error': 'Forbidden'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+@app.route('/api/admin/chatbot-cache', methods=['GET'])
+@require_admin
+def chatbot_cache_inspect():
+    limit = request.args.get('limit', 100, type=int)
+    return jsonify({
+        'status': 'success',
+        'stats': chatbot.cache.stats(),
+        'entries': chatbot.cache.entries(limit)
+    })
+
+@app.route('/api/admin/chatbot-cache', methods=['DELETE'])
+@require_admin
+def chatbot_cache_clear():
+    chatbot.cache.clear()
+    return jsonify({'status': 'success'})
+
+@app.route('/api/admin/chatbot-cache/warm', methods=['POST'])
+@require_admin
+def chatbot_cache_warm():
+    try:
+        data = request.get_json()
+        queries = data.get('queries', [])
+        default_language = data.get('language', 'en-IN')
+        
+        # Accepts plain strings or {"query": ..., "language": ...} objects
+        already_cached = 0
+        for item in queries:
+            if isinstance(item, str):
+                query, language = item, default_language
+            else:
+                query, language = item.get('query'), item.get('language', default_language)
+            if query and chatbot.generate_response(query, language).get('cached'):
+                already_cached += 1
+        
+        return jsonify({
+            'status': 'success',
+            'requested': len(queries),
+            'already_cached': already_cached,
+            'stats': chatbot.cache.stats()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/chatbot-sessions', methods=['GET'])
+@require_admin
+def chatbot_sessions_stats():
+    return jsonify({
+        'status': 'success',
+        'stats': chatbot.sessions.stats()
+    })
+
+@app.route('/api/chatbot/session/<session_id>', methods=['DELETE'])
+def chatbot_session_delete(session_id):
+    # Forgets a conversation ("clear chat"); the id is the client's own secret
+    if not SessionStore.valid_id(session_id):
+        return jsonify({'error': 'Invalid session_id'}), 400
+    chatbot.sessions.drop(session_id)
+    return jsonify({'status': 'success'})
+
+def sse_events(events):
+    for event in events:
+        yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+def parse_session_id(data):
+    # Optional; clients without one get the original stateless behaviour
+    session_id = data.get('session_id')
+    if session_id is not None and not SessionStore.valid_id(session_id):
+        raise ValueError('session_id must be 8-64 letters, digits, "-" or "_"')
+    return session_id
+
 @app.route('/api/chatbot/query', methods=['POST'])
 def chatbot_query():
     try:
         data = request.get_json()
         query = data.get('query')
         language = data.get('language', 'en-IN')
+        try:
+            session_id = parse_session_id(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Opt-in Server-Sent Events; the JSON response stays the default
+        if data.get('stream'):
+            return Response(
+                stream_with_context(sse_events(chatbot.stream_response(query, language, session_id))),
+                mimetype='text/event-stream',
+                headers=SSE_HEADERS
+            )
         
-        response = chatbot.generate_response(query, language)
+        response = chatbot.generate_response(query, language, session_id)
         
         return jsonify({
             'status': 'success',
@@ -542,24 +2047,7 @@ def chatbot_query():
         return jsonify({'error': str(e)}), 500
 
 if __name__ == '__main__':
-    print("Starting SoilSync with AI APIs...")
-    print(f"OpenWeather API: {'Invalid Key - Using Fallback Data' if not weather_service._test_api_key() else 'Connected'}")
-    print(f"Groq AI: {'Connected' if app.config['GROQ_API_KEY'] else 'No API Key'}")
-    print("Server: http://localhost:5000")
-    
-    # Test API connections
-    print("Testing API connections...")
-    try:
-        weather_test = weather_service.get_current_weather('Mumbai')
-        temp = weather_test.get('main', {}).get('temp', 'N/A')
-        print(f"Weather API: Working - Mumbai {temp}C (Fallback Data)")
-    except Exception as e:
-        print(f"Weather API: Error - {e}")
-    
-    try:
-        chatbot_test = chatbot.generate_response('Hello', 'en-IN')
-        print(f"Chatbot API: {'Working' if chatbot_test.get('text') else 'Failed'}")
-    except Exception as e:
-        print(f"Chatbot API: Error - {e}")
-    
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    # Development server; production servers use create_app() (see above)
+    create_app()
+    health.start()
+    app.run(host=app.config['HOST'], port=app.config['PORT'], debug=app.config['DEBUG'])
@@ -0,0 +1,345 @@
+# ==================== SOILSYNC ASGI ENTRY POINT ====================
+# Async serving mode:
+#   cd backend && uvicorn asgi:application --host 0.0.0.0 --port 5000
+#
+# Upstream-bound routes (weather, chatbot) run natively on the event loop with
+# non-blocking HTTP, so one process can hold thousands of in-flight upstream
+# calls. Every other route, including the CPU-bound disease endpoints, is served
+# by the Flask app on a bounded thread pool so it never blocks the loop.
+
+import asyncio
+import contextvars
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import app as flask_app, create_app, health, weather_service, chatbot, parse_bundle_cities
+from app import parse_session_id
+from app import HTTP_REQUESTS, HTTP_SECONDS, HTTP_IN_FLIGHT
+from upstream import close_async_clients
+from static_assets import ENCODINGS, compress
+
+
+class BodyTooLarge(Exception):
+    pass
+
+
+async def read_body(receive, limit):
+    # Whole body for the native routes, which take small JSON documents
+    chunks = []
+    size = 0
+    more_body = True
+    while more_body:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        size += len(chunks[-1])
+        if size > limit:
+            raise BodyTooLarge()
+        more_body = message.get('more_body', False)
+    return b''.join(chunks)
+
+
+class RequestBodyStream:
+    # wsgi.input fed from the ASGI receive channel on demand: the pool thread
+    # reading the body waits for each next chunk from the loop, so uploads
+    # stream through with backpressure instead of being buffered whole. The
+    # Flask app bounds how much it reads (limit_request_body).
+    def __init__(self, receive, loop):
+        self.receive = receive
+        self.loop = loop
+        self.buffer = bytearray()
+        self.more_body = True
+
+    def _fill(self):
+        message = asyncio.run_coroutine_threadsafe(self.receive(), self.loop).result()
+        if message['type'] != 'http.request':
+            # http.disconnect: the body ends here
+            self.more_body = False
+            return
+        self.buffer += message.get('body', b'')
+        self.more_body = message.get('more_body', False)
+
+    def _take(self, size):
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            while self.more_body:
+                self._fill()
+            return self._take(len(self.buffer))
+        while len(self.buffer) < size and self.more_body:
+            self._fill()
+        return self._take(size)
+
+    def readline(self, size=-1):
+        while b'\n' not in self.buffer and self.more_body and (size is None or size < 0 or len(self.buffer) < size):
+            self._fill()
+        end = self.buffer.find(b'\n') + 1 or len(self.buffer)
+        if size is not None and size >= 0:
+            end = min(end, size)
+        return self._take(end)
+
+    def __iter__(self):
+        return iter(self.readline, b'')
+
+
+def accepted_encoding(scope):
+    # First of ENCODINGS the client accepts (q=0 counts as refused)
+    accepted = set()
+    for name, value in scope['headers']:
+        if name == b'accept-encoding':
+            for item in value.decode('latin-1').split(','):
+                coding, _, params = item.partition(';')
+                params = params.replace(' ', '')
+                try:
+                    quality = float(params[2:]) if params.startswith('q=') else 1.0
+                except ValueError:
+                    quality = 1.0
+                if quality > 0:
+                    accepted.add(coding.strip().lower())
+    return next((encoding for encoding in ENCODINGS if encoding in accepted), None)
+
+
+async def send_json(send, payload, status=200, encoding=None):
+    body = json.dumps(payload).encode('utf-8')
+    headers = [
+        (b'content-type', b'application/json'),
+        (b'access-control-allow-origin', b'*'),
+        (b'vary', b'Accept-Encoding')
+    ]
+    if encoding and len(body) >= flask_app.config['COMPRESS_MIN_BYTES']:
+        body = compress(body, encoding)
+        headers.append((b'content-encoding', encoding.encode()))
+    headers.append((b'content-length', str(len(body)).encode()))
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+class EventStream:
+    # Returned by a route to answer with Server-Sent Events
+    def __init__(self, events):
+        self.events = events
+
+    async def send(self, send):
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+                (b'access-control-allow-origin', b'*')
+            ]
+        })
+        async for event in self.events:
+            frame = f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+            await send({'type': 'http.response.body', 'body': frame.encode('utf-8'), 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+
+
+# ==================== ASYNC ROUTES ====================
+async def get_current_weather(data):
+    return {
+        'status': 'success',
+        'weather': await weather_service.aget_current_weather(data.get('city'))
+    }
+
+async def get_weather_forecast(data):
+    return {
+        'status': 'success',
+        'forecast': await weather_service.aget_forecast(data.get('city'))
+    }
+
+async def get_weather_bundle(data):
+    try:
+        cities = parse_bundle_cities(data)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+
+    if cities is None:
+        bundle = (await weather_service.aget_bundle([data.get('city')]))[0]
+        return {
+            'status': 'success',
+            'weather': bundle['weather'],
+            'forecast': bundle['forecast']
+        }
+
+    return {
+        'status': 'success',
+        'results': await weather_service.aget_bundle(cities)
+    }
+
+async def chatbot_query(data):
+    query = data.get('query')
+    language = data.get('language', 'en-IN')
+    try:
+        session_id = parse_session_id(data)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    # Session reads and writes leave the loop when they touch SQLite
+    # (GroqChatbot._acontext / _aremember in app.py)
+    if data.get('stream'):
+        return EventStream(chatbot.astream_response(query, language, session_id))
+
+    response = await chatbot.agenerate_response(query, language, session_id)
+    return {
+        'status': 'success',
+        'response': response
+    }
+
+async def healthz(data):
+    return health.liveness()
+
+async def readyz(data):
+    return health.readiness(), 200 if health.ready else 503
+
+ROUTES = {
+    # Probes are answered on the loop, so a busy Flask thread pool cannot
+    # make a healthy process look dead
+    ('GET', '/healthz'): healthz,
+    ('GET', '/readyz'): readyz,
+    ('POST', '/api/weather/current'): get_current_weather,
+    ('POST', '/api/weather/forecast'): get_weather_forecast,
+    ('POST', '/api/weather/bundle'): get_weather_bundle,
+    ('POST', '/api/chatbot/query'): chatbot_query
+}
+
+
+# ==================== WSGI BRIDGE ====================
+def build_environ(scope, body):
+    # body: a file-like wsgi.input that ends with the request body
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1')
+        value = value.decode('latin-1')
+        if name == 'content-type':
+            key = 'CONTENT_TYPE'
+        elif name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+class WSGIBridge:
+    def __init__(self, wsgi_app, threads):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='asgi-wsgi')
+
+    async def __call__(self, scope, receive, send):
+        loop = asyncio.get_running_loop()
+        environ = build_environ(scope, RequestBodyStream(receive, loop))
+        response = {}
+        # Every step of one request runs in the same context, whichever pool
+        # thread picks it up, so context variables pushed while handling it
+        # (Flask's request context in streamed responses) are still there
+        context = contextvars.copy_context()
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(k.encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+
+        def begin():
+            result = self.wsgi_app(environ, start_response)
+            return result, iter(result)
+
+        result, chunks = await loop.run_in_executor(self.executor, context.run, begin)
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': response['status'],
+                'headers': response['headers']
+            })
+            # The body is pulled on the pool too, so streamed responses stay streamed
+            while True:
+                chunk = await loop.run_in_executor(self.executor, context.run, next, chunks, None)
+                if chunk is None:
+                    break
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(result, 'close'):
+                await loop.run_in_executor(self.executor, context.run, result.close)
+
+
+# ==================== APPLICATION ====================
+class SoilSyncASGI:
+    def __init__(self):
+        self.wsgi = WSGIBridge(create_app(), flask_app.config['ASGI_WSGI_THREADS'])
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        handler = ROUTES.get((scope['method'], scope['path']))
+        if handler is None:
+            await self.wsgi(scope, receive, send)
+            return
+
+        # Native routes are recorded in the same metrics as Flask routes
+        started = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+        try:
+            try:
+                data = json.loads(await read_body(receive, flask_app.config['MAX_CONTENT_LENGTH']) or b'null')
+                result = await handler(data)
+            except BodyTooLarge:
+                result = ({'error': f"Request body exceeds {flask_app.config['MAX_CONTENT_LENGTH']} bytes"}, 413)
+            except Exception as e:
+                result = ({'error': str(e)}, 500)
+
+            if isinstance(result, EventStream):
+                status = 200
+                HTTP_SECONDS.observe(scope['path'], scope['method'], value=time.perf_counter() - started)
+                await result.send(send)
+            else:
+                payload, status = result if isinstance(result, tuple) else (result, 200)
+                await send_json(send, payload, status, accepted_encoding(scope))
+                HTTP_SECONDS.observe(scope['path'], scope['method'], value=time.perf_counter() - started)
+            HTTP_REQUESTS.inc(scope['path'], scope['method'], str(status))
+        finally:
+            HTTP_IN_FLIGHT.dec()
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # Warm-up and upstream probes run in the background; the
+                # server starts listening without waiting for them
+                health.start()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await close_async_clients()
+                self.wsgi.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+application = SoilSyncASGI()
@@ -0,0 +1,118 @@
+# ==================== SOILSYNC MICRO-BATCHING ====================
+
+import math
+import os
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+
+
+class QueueFull(Exception):
+    def __init__(self, retry_after):
+        super().__init__('Inference queue is full, retry later')
+        self.retry_after = retry_after
+
+
+class MicroBatcher:
+    # Collects concurrent submissions for up to `max_wait` seconds or `max_batch`
+    # items, hands them to `process(items)` as one batch and fans the results
+    # back out. `process` returns one result per item; an Exception instance in
+    # that list fails only its own item.
+    def __init__(self, process, max_batch=16, max_wait=0.005, max_queue=256):
+        self.process = process
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._worker_pid = None
+        self.batch_sizes = Counter()
+        self.queue_waits = deque(maxlen=2048)
+        self.batch_seconds = deque(maxlen=256)
+        self.processed = 0
+        self.rejected = 0
+
+    def submit_many(self, items):
+        now = time.monotonic()
+        futures = [Future() for _ in items]
+        with self._cond:
+            self._ensure_worker()
+            if len(self._queue) + len(items) > self.max_queue:
+                self.rejected += len(items)
+                raise QueueFull(self._retry_after())
+            for item, future in zip(items, futures):
+                self._queue.append((item, future, now))
+            self._cond.notify()
+        return futures
+
+    def submit(self, item):
+        return self.submit_many([item])[0]
+
+    def _retry_after(self):
+        # Seconds to drain the current queue at the recent batch rate
+        recent = list(self.batch_seconds)
+        per_batch = sum(recent) / len(recent) if recent else self.max_wait
+        return max(1, math.ceil(len(self._queue) / self.max_batch * per_batch))
+
+    def _ensure_worker(self):
+        # Started lazily and per process so forked workers get their own thread
+        if self._worker_pid != os.getpid():
+            self._worker_pid = os.getpid()
+            threading.Thread(target=self._worker, name='micro-batcher', daemon=True).start()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                deadline = self._queue[0][2] + self.max_wait
+                while len(self._queue) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = [self._queue.popleft() for _ in range(min(self.max_batch, len(self._queue)))]
+
+            started = time.monotonic()
+            try:
+                results = self.process([item for item, _, _ in batch])
+            except Exception as e:
+                results = [e] * len(batch)
+
+            with self._cond:
+                self.queue_waits.extend(started - enqueued for _, _, enqueued in batch)
+                self.batch_seconds.append(time.monotonic() - started)
+                self.batch_sizes[len(batch)] += 1
+                self.processed += len(batch)
+
+            for (_, future, _), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def stats(self):
+        with self._cond:
+            waits = sorted(self.queue_waits)
+            depth = len(self._queue)
+            sizes = sorted(self.batch_sizes.items())
+            processed = self.processed
+            rejected = self.rejected
+        batches = sum(count for _, count in sizes)
+
+        def pct(p):
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 2) if waits else 0.0
+
+        return {
+            'queue_depth': depth,
+            'max_queue': self.max_queue,
+            'max_batch': self.max_batch,
+            'max_wait_ms': self.max_wait * 1000,
+            'processed': processed,
+            'rejected': rejected,
+            'batches': batches,
+            'mean_batch_size': round(processed / batches, 2) if batches else 0.0,
+            'batch_size_distribution': {str(size): count for size, count in sizes},
+            'queue_wait_ms': {'p50': pct(0.50), 'p95': pct(0.95), 'p99': pct(0.99)}
+        }
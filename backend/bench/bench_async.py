@@ -0,0 +1,159 @@
+# ==================== SYNC vs ASYNC CAPACITY BENCHMARK ====================
+# Compares gunicorn sync workers (app:app) with the ASGI entry point
+# (asgi:application under uvicorn) against local upstream stubs:
+#   cd backend && python bench/bench_async.py --concurrency 50 200 1000
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Nothing listening on port {port}")
+
+
+def start_stub(latency, token_delay=0.02, jitter=0.0, error_rate=0.0, stall_rate=0.0, stall=30.0):
+    port = free_port()
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join('bench', 'stub_upstream.py'), '--port', str(port),
+         '--latency', str(latency), '--token-delay', str(token_delay), '--jitter', str(jitter),
+         '--error-rate', str(error_rate), '--stall-rate', str(stall_rate), '--stall', str(stall)],
+        cwd=BACKEND_DIR
+    )
+    wait_for_port(port)
+    return proc, port
+
+
+def start_server(mode, stub_port, workers, overrides=None):
+    # `overrides` replaces any of the environment settings below
+    port = free_port()
+    env = dict(
+        os.environ,
+        OPENWEATHER_API_KEY='bench',
+        GROQ_API_KEY='bench',
+        WEATHER_BASE_URL=f'http://127.0.0.1:{stub_port}',
+        GROQ_BASE_URL=f'http://127.0.0.1:{stub_port}',
+        # Measure upstream-bound capacity, not cache hits
+        WEATHER_CURRENT_TTL='0',
+        WEATHER_FORECAST_TTL='0',
+        CHATBOT_CACHE_TTL='0',
+        UPSTREAM_RETRIES='0'
+    )
+    env.update(overrides or {})
+    if mode == 'sync':
+        cmd = ['gunicorn', '-w', str(workers), '-k', 'sync', '-b', f'127.0.0.1:{port}',
+               '--backlog', '4096', '--timeout', '120', '--log-level', 'warning', 'app:app']
+    else:
+        cmd = [sys.executable, '-m', 'uvicorn', 'asgi:application', '--host', '127.0.0.1',
+               '--port', str(port), '--log-level', 'warning', '--backlog', '4096']
+    proc = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env)
+    wait_for_port(port)
+    return proc, port
+
+
+async def drive(port, concurrency, duration):
+    routes = [
+        ('/api/chatbot/query', {'query': 'What fertilizer for wheat?', 'language': 'en-IN'}),
+        ('/api/weather/current', {'city': 'Pune'})
+    ]
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{port}', limits=limits, timeout=120) as client:
+        async def worker(i):
+            nonlocal errors
+            n = i
+            while time.perf_counter() < deadline:
+                path, body = routes[n % len(routes)]
+                n += 1
+                start = time.perf_counter()
+                try:
+                    response = await client.post(path, json=body)
+                    if response.status_code != 200:
+                        errors += 1
+                        continue
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker(i) for i in range(concurrency)])
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    def pct(p):
+        return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1) if latencies else None
+
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': pct(0.50),
+        'p95_ms': pct(0.95),
+        'p99_ms': pct(0.99)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sync vs async concurrent-request capacity')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[50, 200, 1000])
+    parser.add_argument('--duration', type=float, default=10, help='seconds per concurrency level')
+    parser.add_argument('--latency', type=float, default=0.25, help='stub upstream latency in seconds')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn sync workers')
+    parser.add_argument('--modes', nargs='+', default=['sync', 'async'], choices=['sync', 'async'])
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    stub, stub_port = start_stub(args.latency)
+    results = []
+    try:
+        for mode in args.modes:
+            server, port = start_server(mode, stub_port, args.workers)
+            try:
+                for concurrency in args.concurrency:
+                    row = asyncio.run(drive(port, concurrency, args.duration))
+                    row['mode'] = mode
+                    results.append(row)
+                    print(f"{mode:>5}  c={row['concurrency']:<5} rps={row['rps']:<8} "
+                          f"p50={row['p50_ms']}ms p95={row['p95_ms']}ms p99={row['p99_ms']}ms errors={row['errors']}")
+            finally:
+                server.terminate()
+                server.wait()
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'upstream_latency_s': args.latency, 'sync_workers': args.workers, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# ==================== DISEASE INFERENCE BENCHMARK ====================
+# Reports images/sec and latency percentiles for the CPU inference pipeline on
+# synthetic phone-sized leaf photos:
+#   cd backend && python bench/bench_disease.py --images 200
+
+import argparse
+import base64
+import os
+import sys
+import time
+from io import BytesIO
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from disease_engine import DiseaseInferenceEngine  # noqa: E402
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models', 'disease_classifier.json')
+
+SPOTS = {
+    'Leaf_Blight': ((110, 70, 30), 14, (30, 70)),
+    'Powdery_Mildew': ((235, 238, 230), 18, (25, 60)),
+    'Rust_Disease': ((230, 120, 30), 60, (6, 14))
+}
+
+
+def synthetic_leaf(kind, rng, size=(1600, 1200)):
+    # Green leaf texture with disease-coloured lesions, encoded as a JPEG
+    width, height = size
+    base = np.empty((height, width, 3), dtype=np.float32)
+    base[...] = (60, 140, 50)
+    base += rng.normal(0, 12, (height, width, 1))
+    image = Image.fromarray(np.clip(base, 0, 255).astype(np.uint8))
+
+    if kind in SPOTS:
+        colour, count, (low, high) = SPOTS[kind]
+        draw = ImageDraw.Draw(image)
+        for _ in range(count):
+            x, y = rng.integers(0, width), rng.integers(0, height)
+            r = int(rng.integers(low, high)) * width // 800
+            draw.ellipse((x - r, y - r, x + r, y + r), fill=colour)
+
+    buffer = BytesIO()
+    image.save(buffer, format='JPEG', quality=85)
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Disease inference throughput and latency')
+    parser.add_argument('--images', type=int, default=200)
+    parser.add_argument('--model', default=MODEL_PATH)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    kinds = ['Healthy'] + list(SPOTS)
+    samples = [(kinds[i % len(kinds)], synthetic_leaf(kinds[i % len(kinds)], rng)) for i in range(min(args.images, 40))]
+    payloads = [(kind, 'data:image/jpeg;base64,' + base64.b64encode(raw).decode()) for kind, raw in samples]
+
+    engine = DiseaseInferenceEngine(args.model)
+    latencies = []
+    correct = 0
+    started = time.perf_counter()
+    for i in range(args.images):
+        kind, payload = payloads[i % len(payloads)]
+        start = time.perf_counter()
+        result = engine.predict_batch(engine.preprocess(payload))[0]
+        latencies.append(time.perf_counter() - start)
+        correct += result['disease'] == kind
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] * 1000
+    print(f"images={args.images}  {args.images / elapsed:.1f} images/sec  p50={p50:.1f}ms  p95={p95:.1f}ms  "
+          f"synthetic accuracy={correct / args.images:.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+# ==================== ENGINE MICRO-BENCHMARKS ====================
+# In-process cost of the engines behind each route, without HTTP or the
+# upstream APIs: single lookups in ns/op, batch calls also in items/s.
+# Writes JSON that can be compared against a previous run, like bench_load:
+#   cd backend && python bench/bench_engines.py --json after.json --compare before.json
+#
+# Each case runs --repeat times and the fastest run is kept, which filters out
+# scheduler noise better than a single long run on a shared machine.
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import (  # noqa: E402
+    chatbot, crop_recommender, fertilizer_recommender, subsidy_finder, symptom_analyzer,
+    treatment_engine, weather_service
+)
+from bench_load import compare_rows, git_commit  # noqa: E402
+from cache import QueryCache  # noqa: E402
+
+
+def batch_inputs(size, seed=0):
+    rng = random.Random(seed)
+    crops = ['wheat', 'rice', 'maize', 'cotton', 'vegetables']
+    plots = {
+        'id': list(range(size)),
+        'crop': [rng.choice(crops) for _ in range(size)],
+        'soil_type': [rng.choice(['clay', 'sandy', 'loamy']) for _ in range(size)],
+        'growth_stage': [rng.choice(['initial', 'vegetative', 'flowering']) for _ in range(size)],
+        'area': [round(rng.uniform(0.5, 10), 1) for _ in range(size)]
+    }
+    profiles = {
+        'soil_type': [rng.choice(['clay', 'sandy', 'loamy', 'black']) for _ in range(size)],
+        'climate': [rng.choice(['tropical', 'temperate', 'arid']) for _ in range(size)],
+        'water_availability': [rng.choice(['low', 'medium', 'high']) for _ in range(size)],
+        'season': [rng.choice(['kharif', 'rabi', 'zaid']) for _ in range(size)]
+    }
+    registry = [
+        (i, rng.choice(crops), rng.choice(['small', 'marginal', 'large']), round(rng.uniform(0.5, 20), 1))
+        for i in range(size)
+    ]
+    return plots, profiles, registry
+
+
+def cases(batch):
+    plots, profiles, registry = batch_inputs(batch)
+    # A cached answer and a rephrasing of it, for the exact and fuzzy paths;
+    # fuzzy matching is off by default, so it gets a cache of its own
+    chatbot.cache.put('en-IN', 'What fertilizer should I use for wheat?', {'response': 'bench', 'cached': False})
+    fuzzy_cache = QueryCache(3600, threshold=0.85, fuzzy=True, terms=chatbot.cache.terms)
+    fuzzy_cache.put('en-IN', 'What fertilizer should I use for wheat?', {'response': 'bench', 'cached': False})
+
+    # (name, callable, items per call)
+    return [
+        ('treatment.get_treatment', lambda: treatment_engine.get_treatment('Powdery_Mildew'), 1),
+        ('symptoms.analyze_symptoms', lambda: symptom_analyzer.analyze_symptoms(
+            ['yellow_leaves', 'brown_spots'], 'wheat'), 1),
+        ('subsidy.find_subsidies', lambda: subsidy_finder.find_subsidies('wheat', 'small', 6), 1),
+        ('subsidy.evaluate', lambda: sum(1 for _ in subsidy_finder.catalogue().evaluate(registry)), batch),
+        ('fertilizer.recommend_fertilizer', lambda: fertilizer_recommender.recommend_fertilizer(
+            'rice', 'loamy', 'flowering', 2.5), 1),
+        ('fertilizer.calculate_batch', lambda: fertilizer_recommender.calculate_batch(plots), batch),
+        ('crop.recommend_crop', lambda: crop_recommender.recommend_crop('loamy', 'tropical', 'medium', 'kharif'), 1),
+        ('crop.recommend_many', lambda: crop_recommender.recommend_many(profiles), batch),
+        ('chatbot.cache exact', lambda: chatbot.cache.get('en-IN', 'What fertilizer should I use for wheat?'), 1),
+        ('chatbot.cache fuzzy', lambda: fuzzy_cache.get('en-IN', 'what fertilizer should i use for wheat crop'), 1),
+        ('chatbot.cache miss', lambda: chatbot.cache.get('en-IN', 'When should I harvest sugarcane?'), 1),
+        ('weather.fallback_weather_data', lambda: weather_service.fallback_weather_data('Pune'), 1)
+    ]
+
+
+def measure(fn, min_time, repeat):
+    # Calibrate a call count that runs for about min_time, then keep the
+    # fastest of `repeat` runs
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / 10 or calls >= 1 << 24:
+            break
+        calls *= 2
+    calls = max(1, int(calls * min_time / max(elapsed, 1e-9) / 10))
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        best = min(best, (time.perf_counter() - start) / calls)
+    return best, calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-call cost of the advisory engines')
+    parser.add_argument('--batch', type=int, default=1000, help='records per batch call')
+    parser.add_argument('--min-time', type=float, default=0.2, help='seconds per timed run')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--only', nargs='*', help='case names to run (prefix match)')
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--compare', help='earlier --json output to compare against')
+    parser.add_argument('--max-regression', type=float, default=0.25,
+                        help='exit non-zero when a case slows down by more than this fraction')
+    args = parser.parse_args()
+
+    results = {}
+    for name, fn, items in cases(args.batch):
+        if args.only and not any(name.startswith(prefix) for prefix in args.only):
+            continue
+        fn()
+        seconds, calls = measure(fn, args.min_time, args.repeat)
+        results[name] = {
+            'ns_per_op': round(seconds * 1e9, 1),
+            'ops_per_s': round(1 / seconds, 1),
+            'items_per_s': round(items / seconds, 1),
+            'calls': calls
+        }
+        batch = f"  {results[name]['items_per_s']:,.0f} items/s" if items > 1 else ''
+        print(f"{name:<34} {results[name]['ns_per_op']:>14,.1f} ns/op {results[name]['ops_per_s']:>14,.1f} ops/s{batch}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'meta': {
+                    'commit': git_commit(),
+                    'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    'args': vars(args)
+                },
+                'results': results
+            }, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"compared with {args.compare} (commit {baseline.get('meta', {}).get('commit')}):")
+        regressions = compare_rows(results, baseline.get('results', {}), [('ns_per_op', False)], args.max_regression)
+        if regressions:
+            print('regressions: ' + '; '.join(regressions))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# ==================== FERTILIZER BATCH BENCHMARK ====================
+# Time to compute dosages for N synthetic plots, both in the NumPy engine alone
+# and through /api/fertilizer/batch (JSON and CSV, parsing and encoding included):
+#   cd backend && python bench/bench_fertilizer.py --plots 100000
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, fertilizer_recommender  # noqa: E402
+
+
+def synthetic_plots(count, seed=0):
+    rng = random.Random(seed)
+    model = fertilizer_recommender.dosage_model()
+    crops, soils, stages = list(model.crops), list(model.soils), list(model.stages)
+    return [
+        {
+            'id': f'P{i}',
+            'crop': rng.choice(crops),
+            'soil_type': rng.choice(soils),
+            'growth_stage': rng.choice(stages),
+            'area': round(rng.uniform(0.2, 5.0), 2)
+        }
+        for i in range(count)
+    ]
+
+
+def best_of(runs, fn):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return round(min(timings) * 1000, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fertilizer batch dosage throughput')
+    parser.add_argument('--plots', type=int, default=100000)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    plots = synthetic_plots(args.plots)
+    columns = {field: [plot[field] for plot in plots] for field in ('id', 'crop', 'soil_type', 'growth_stage', 'area')}
+    json_body = json.dumps({'plots': plots})
+    csv_body = 'id,crop,soil_type,growth_stage,area\n' + '\n'.join(
+        f"{p['id']},{p['crop']},{p['soil_type']},{p['growth_stage']},{p['area']}" for p in plots
+    )
+    client = app.test_client()
+
+    def engine():
+        model, result = fertilizer_recommender.calculate_batch(columns)
+        model.totals(result)
+
+    def endpoint(body, content_type):
+        response = client.post('/api/fertilizer/batch', data=body, content_type=content_type)
+        response.get_data()
+        assert response.status_code == 200, response.status_code
+
+    results = {
+        'plots': args.plots,
+        'engine_ms': best_of(args.runs, engine),
+        'json_endpoint_ms': best_of(args.runs, lambda: endpoint(json_body, 'application/json')),
+        'csv_endpoint_ms': best_of(args.runs, lambda: endpoint(csv_body, 'text/csv'))
+    }
+    print(f"plots={results['plots']}  engine={results['engine_ms']}ms  "
+          f"json endpoint={results['json_endpoint_ms']}ms  csv endpoint={results['csv_endpoint_ms']}ms")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
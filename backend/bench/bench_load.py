@@ -0,0 +1,402 @@
+# ==================== MIXED-TRAFFIC LOAD TEST ====================
+# Starts the app (gunicorn sync workers or the ASGI entry point) against the
+# local OpenWeather/Groq stubs and drives every /api/* route:
+#   1. mixed traffic: all scenarios at once, weighted like real usage;
+#   2. isolated: each scenario alone, to attribute latency and memory growth.
+# Reports RPS, p50/p95/p99 latency and errors per route plus server RSS, and
+# writes JSON that can be compared against a previous run:
+#   cd backend && python bench/bench_load.py --duration 20 --json after.json --compare before.json
+#
+# Upstream faults are injected in the stubs: --latency/--jitter shape the
+# OpenWeather/Groq response time, --error-rate answers 503 and --stall-rate
+# holds responses past the client timeout.
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+
+import httpx
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_async import BACKEND_DIR, start_server, start_stub  # noqa: E402
+from bench_disease import synthetic_leaf  # noqa: E402
+
+sys.path.insert(0, BACKEND_DIR)
+
+from app import Config, app  # noqa: E402
+
+ADMIN_TOKEN = 'bench-admin'
+CACHE_SETTINGS = ('WEATHER_CURRENT_TTL', 'WEATHER_FORECAST_TTL', 'CHATBOT_CACHE_TTL', 'UPSTREAM_RETRIES')
+
+CITIES = ['Pune', 'Mumbai', 'Delhi', 'Nashik', 'Nagpur', 'Jaipur', 'Indore', 'Bangalore']
+CROPS = ['wheat', 'rice', 'maize', 'cotton', 'vegetables']
+QUERIES = [
+    'What fertilizer for wheat?', 'How to control aphids on cotton?', 'Best time to sow rice',
+    'Yellow leaves on maize', 'How much water does sugarcane need?'
+]
+
+
+def symptom_cases(path=Config.SYMPTOM_PROFILES_PATH):
+    # (symptoms, crop) pairs taken from the real profiles, the strongest two or
+    # three signs of each, so requests exercise matching, not validation
+    with open(path, encoding='utf-8') as f:
+        profiles = json.load(f)['profiles']
+    cases = []
+    for i, profile in enumerate(profiles):
+        ranked = sorted(profile['symptoms'], key=profile['symptoms'].get, reverse=True)
+        cases.append((ranked[:2 + i % 2], profile['crop']))
+    return cases
+
+
+SYMPTOMS = symptom_cases()
+
+
+def build_images(count=4, size=(640, 480)):
+    rng = np.random.default_rng(0)
+    kinds = ['Leaf_Blight', 'Powdery_Mildew', 'Rust_Disease', 'Healthy']
+    return [synthetic_leaf(kinds[i % len(kinds)], rng, size) for i in range(count)]
+
+
+def scenarios(images):
+    # (method, route, weight, request builder). Weights approximate production
+    # traffic: weather and chat dominate, batch and admin calls are rare.
+    def weather(rng):
+        return {'json': {'city': rng.choice(CITIES)}}
+
+    def image(rng):
+        return {'files': {'image': ('leaf.jpg', rng.choice(images), 'image/jpeg')}}
+
+    def registry(rng):
+        lines = ['id,crop,category,land_size'] + [
+            f'F{i},{rng.choice(CROPS)},{rng.choice(["small", "marginal", "large"])},{rng.uniform(0.5, 20):.1f}'
+            for i in range(500)
+        ]
+        return {'content': '\n'.join(lines), 'headers': {'Content-Type': 'text/csv'}}
+
+    admin = {'X-Admin-Token': ADMIN_TOKEN}
+    return [
+        ('POST', '/api/weather/current', 20, weather),
+        ('POST', '/api/weather/forecast', 10, weather),
+        ('POST', '/api/weather/bundle', 3, lambda rng: {'json': {'cities': rng.sample(CITIES, 3)}}),
+        ('GET', '/api/weather/cache-stats', 1, lambda rng: {}),
+        ('POST', '/api/chatbot/query', 12, lambda rng: {'json': {'query': rng.choice(QUERIES), 'language': 'en-IN'}}),
+        ('POST', '/api/crop/recommend', 8, lambda rng: {'json': {
+            'soil_type': rng.choice(['clay', 'sandy', 'loamy', 'black']), 'climate': 'tropical',
+            'water_availability': rng.choice(['low', 'medium', 'high']), 'season': rng.choice(['kharif', 'rabi'])
+        }}),
+        ('POST', '/api/crop/recommend/batch', 1, lambda rng: {'json': {'profiles': [
+            {'id': i, 'soil_type': rng.choice(['clay', 'loamy']), 'season': 'kharif'} for i in range(200)
+        ]}}),
+        ('POST', '/api/fertilizer/recommend', 8, lambda rng: {'json': {
+            'crop': rng.choice(CROPS), 'soil_type': 'loamy', 'growth_stage': rng.choice(['initial', 'vegetative']),
+            'area': round(rng.uniform(0.5, 5), 1)
+        }}),
+        ('POST', '/api/fertilizer/batch', 1, lambda rng: {'json': {'plots': [
+            {'id': i, 'crop': rng.choice(CROPS), 'soil_type': 'loamy', 'growth_stage': 'initial', 'area': 1.5}
+            for i in range(500)
+        ]}}),
+        ('POST', '/api/subsidy/find', 8, lambda rng: {'json': {
+            'crop': rng.choice(CROPS), 'category': rng.choice(['small', 'marginal', 'large']),
+            'land_size': round(rng.uniform(0.5, 20), 1)
+        }}),
+        ('GET', '/api/subsidy/schemes', 1, lambda rng: {}),
+        ('POST', '/api/subsidy/bulk', 1, registry),
+        ('POST', '/api/disease/detect-symptoms', 6, lambda rng: {'json': dict(
+            zip(('symptoms', 'crop'), rng.choice(SYMPTOMS))
+        )}),
+        ('POST', '/api/disease/detect-symptoms/batch', 1, lambda rng: {'json': {
+            'queries': [dict(zip(('symptoms', 'crop'), rng.choice(SYMPTOMS))) for _ in range(50)]
+        }}),
+        ('GET', '/api/disease/treatment', 3, lambda rng: {'params': {
+            'disease': rng.choice(['Leaf_Blight', 'Powdery_Mildew', 'Rust_Disease'])
+        }}),
+        ('POST', '/api/disease/detect-image', 4, image),
+        ('POST', '/api/disease/detect-image/batch', 1, lambda rng: {'json': {
+            'images': [base64.b64encode(rng.choice(images)).decode() for _ in range(4)]
+        }}),
+        ('GET', '/api/disease/batch-stats', 1, lambda rng: {}),
+        ('GET', '/api/admin/chatbot-cache', 1, lambda rng: {'headers': admin}),
+        ('DELETE', '/api/admin/chatbot-cache', 1, lambda rng: {'headers': admin}),
+        ('POST', '/api/admin/chatbot-cache/warm', 1, lambda rng: {'headers': admin, 'json': {
+            'queries': rng.sample(QUERIES, 2)
+        }})
+    ]
+
+
+def uncovered_routes(plan):
+    # /api/* (route, method) pairs with no scenario, read from the app's URL map
+    covered = {(route, method) for method, route, _, _ in plan}
+    missing = []
+    for rule in app.url_map.iter_rules():
+        if rule.rule.startswith('/api/'):
+            methods = rule.methods - {'HEAD', 'OPTIONS'}
+            if not any((rule.rule, method) in covered for method in methods):
+                missing.append(f"{'/'.join(sorted(methods))} {rule.rule}")
+    return sorted(missing)
+
+
+class RssSampler:
+    # Resident memory of the server process and its workers, from /proc
+    def __init__(self, pid, interval=0.25):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _pids(self):
+        pids = [self.pid]
+        try:
+            with open(f'/proc/{self.pid}/task/{self.pid}/children') as f:
+                pids.extend(int(child) for child in f.read().split())
+        except OSError:
+            pass
+        return pids
+
+    def rss_mb(self):
+        total = 0
+        for pid in self._pids():
+            try:
+                with open(f'/proc/{pid}/status') as f:
+                    for line in f:
+                        if line.startswith('VmRSS:'):
+                            total += int(line.split()[1])
+            except OSError:
+                pass
+        return round(total / 1024, 1)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.samples.append(self.rss_mb())
+
+    def __enter__(self):
+        self.samples = [self.rss_mb()]
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.samples.append(self.rss_mb())
+
+    def summary(self):
+        return {
+            'rss_start_mb': self.samples[0],
+            'rss_peak_mb': max(self.samples),
+            'rss_end_mb': self.samples[-1],
+            'rss_growth_mb': round(self.samples[-1] - self.samples[0], 1)
+        }
+
+
+def latency_stats(latencies, elapsed, errors, statuses):
+    latencies = sorted(latencies)
+
+    def pct(p):
+        return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2) if latencies else None
+
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': pct(0.50),
+        'p95_ms': pct(0.95),
+        'p99_ms': pct(0.99),
+        'statuses': dict(sorted(statuses.items()))
+    }
+
+
+async def drive(port, plan, concurrency, duration, seed=0):
+    # Each worker draws scenarios by weight; a request counts as an error on
+    # a transport failure or a 5xx status
+    keys = [f'{method} {route}' for method, route, _, _ in plan]
+    weights = [weight for _, _, weight, _ in plan]
+    latencies = {key: [] for key in keys}
+    errors = {key: 0 for key in keys}
+    statuses = {key: {} for key in keys}
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{port}', limits=limits, timeout=60) as client:
+        async def worker(i):
+            rng = random.Random(seed * 1000 + i)
+            while time.perf_counter() < deadline:
+                index = rng.choices(range(len(plan)), weights)[0]
+                method, route, _, build = plan[index]
+                key = keys[index]
+                start = time.perf_counter()
+                try:
+                    response = await client.request(method, route, **build(rng))
+                    await response.aread()
+                except httpx.HTTPError:
+                    errors[key] += 1
+                    statuses[key]['transport'] = statuses[key].get('transport', 0) + 1
+                    continue
+                status = str(response.status_code)
+                statuses[key][status] = statuses[key].get(status, 0) + 1
+                if response.status_code >= 500:
+                    errors[key] += 1
+                    continue
+                latencies[key].append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker(i) for i in range(concurrency)])
+        elapsed = time.perf_counter() - started
+
+    routes = {key: latency_stats(latencies[key], elapsed, errors[key], statuses[key]) for key in keys}
+    overall = latency_stats(
+        [value for values in latencies.values() for value in values], elapsed,
+        sum(errors.values()), {}
+    )
+    del overall['statuses']
+    return overall, routes
+
+
+def compare_rows(current, baseline, fields, threshold):
+    # Prints the change of each field per row; returns the rows whose change
+    # is worse than `threshold` (latency up or throughput down)
+    regressions = []
+    for name, row in current.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        changes = []
+        for field, higher_is_better in fields:
+            if row.get(field) is None or not base.get(field):
+                continue
+            change = (row[field] - base[field]) / base[field]
+            changes.append(f'{field} {base[field]}->{row[field]} ({change:+.0%})')
+            if (-change if higher_is_better else change) > threshold:
+                regressions.append(f'{name}: {field} {change:+.0%}')
+        if changes:
+            print(f'  {name:<44} ' + '  '.join(changes))
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def describe(row):
+    def ms(value):
+        return '-' if value is None else f'{value}ms'
+    return (f"rps={row['rps']:<8} p50={ms(row['p50_ms'])} p95={ms(row['p95_ms'])} "
+            f"p99={ms(row['p99_ms'])} errors={row['errors']}")
+
+
+def print_routes(title, routes):
+    print(title)
+    for key, row in routes.items():
+        memory = f"  rss +{row['rss_growth_mb']}MB" if 'rss_growth_mb' in row else ''
+        print(f'  {key:<44} {describe(row)}{memory}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mixed-traffic load test of every /api/* route')
+    parser.add_argument('--mode', choices=['sync', 'async'], default='sync')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn sync workers')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=20, help='seconds of mixed traffic')
+    parser.add_argument('--route-duration', type=float, default=3, help='seconds per isolated route (0 skips)')
+    parser.add_argument('--routes', nargs='*', help='only these routes (e.g. /api/weather/current)')
+    parser.add_argument('--latency', type=float, default=0.1, help='stub upstream latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.05, help='mean extra exponential stub latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of stub responses that are 503')
+    parser.add_argument('--stall-rate', type=float, default=0.0, help='fraction of stub responses held 30s')
+    parser.add_argument('--no-cache', action='store_true', help='disable the weather and chatbot caches')
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--compare', help='earlier --json output to compare against')
+    parser.add_argument('--max-regression', type=float, default=0.25,
+                        help='exit non-zero when a p95 rises or an RPS falls by more than this fraction')
+    args = parser.parse_args()
+
+    plan = scenarios(build_images())
+    missing = uncovered_routes(plan)
+    if missing:
+        print('Routes without a scenario: ' + ', '.join(missing))
+    if args.routes:
+        plan = [scenario for scenario in plan if scenario[1] in args.routes]
+
+    overrides = {'ADMIN_TOKEN': ADMIN_TOKEN, 'UPSTREAM_READ_TIMEOUT': '5'}
+    if not args.no_cache:
+        # bench_async turns caching and retries off to measure upstream
+        # capacity; a realistic mix runs with the app's own settings
+        for name in CACHE_SETTINGS:
+            overrides[name] = str(getattr(Config, name))
+
+    stub, stub_port = start_stub(args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                                 stall_rate=args.stall_rate)
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'args': vars(args)
+        }
+    }
+    try:
+        server, port = start_server(args.mode, stub_port, args.workers, overrides)
+        try:
+            # Warm-up: lazy imports, first model calls, connection pools
+            asyncio.run(drive(port, plan, min(4, args.concurrency), 2, seed=99))
+
+            sampler = RssSampler(server.pid)
+            with sampler:
+                overall, routes = asyncio.run(drive(port, plan, args.concurrency, args.duration))
+            results['mixed'] = dict(overall, **sampler.summary(), routes=routes)
+            print(f"mixed  {describe(overall)}  rss {sampler.samples[0]}->{max(sampler.samples)}MB peak")
+            print_routes('per route (mixed traffic):', routes)
+
+            if args.route_duration > 0:
+                isolated = {}
+                for scenario in plan:
+                    sampler = RssSampler(server.pid)
+                    with sampler:
+                        overall, _ = asyncio.run(drive(port, [scenario], args.concurrency, args.route_duration))
+                    isolated[f'{scenario[0]} {scenario[1]}'] = dict(overall, **sampler.summary())
+                results['isolated'] = isolated
+                print_routes('per route (isolated):', isolated)
+        finally:
+            server.terminate()
+            server.wait()
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"compared with {args.compare} (commit {baseline.get('meta', {}).get('commit')}):")
+        fields = [('rps', True), ('p95_ms', False)]
+        regressions = compare_rows(
+            {'mixed': results['mixed']}, {'mixed': baseline.get('mixed', {})}, fields, args.max_regression
+        )
+        regressions += compare_rows(
+            results.get('isolated', {}), baseline.get('isolated', {}), fields, args.max_regression
+        )
+        if regressions:
+            print('regressions: ' + '; '.join(regressions))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+# ==================== WEATHER PRE-WARMING BENCHMARK ====================
+# How often a user weather lookup has to wait on OpenWeather, with and without
+# the background pre-warmer, against the local stub with real latency:
+#   cd backend && python bench/bench_prewarm.py --duration 60 --ttl 10
+#
+# Each mode runs in a fresh process (settings are read at import) that asks
+# for current weather and forecasts for a skewed mix of cities: a few popular
+# cities take most of the traffic, as in production. TTLs are shortened so
+# many expiries fit in the run, and the stale window is turned off, so every
+# expiry is a blocking reload unless the pre-warmer got there first.
+#   cold      no pre-warming (every first lookup and every expiry waits)
+#   prewarm   pre-warmer running, empty snapshot
+#   restart   pre-warmer running, snapshot left by the previous mode
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_async import BACKEND_DIR, start_stub  # noqa: E402
+
+CITIES = ['Mumbai', 'Delhi', 'Pune', 'Bangalore', 'Chennai', 'Kolkata', 'Nashik', 'Nagpur',
+          'Jaipur', 'Indore', 'Bhopal', 'Surat', 'Lucknow', 'Patna', 'Ranchi', 'Raipur']
+
+
+def worker(duration, rate, seed):
+    # Runs inside the per-mode process
+    sys.path.insert(0, BACKEND_DIR)
+    from app import create_app, health, weather_service
+
+    create_app()
+    health.start()
+    while not health.ready:
+        time.sleep(0.01)
+
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) ** 1.2 for rank in range(len(CITIES))]
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        city = rng.choices(CITIES, weights)[0]
+        lookup = weather_service.get_current_weather if rng.random() < 0.6 else weather_service.get_forecast
+        start = time.perf_counter()
+        lookup(city)
+        latencies.append(time.perf_counter() - start)
+        time.sleep(rng.expovariate(rate))
+
+    latencies.sort()
+    slow = sum(1 for latency in latencies if latency > 0.05)
+    print(json.dumps({
+        'lookups': len(latencies),
+        'waited_on_upstream': slow,
+        'waited_pct': round(100 * slow / len(latencies), 2),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 3),
+        'p99_ms': round(latencies[int(len(latencies) * 0.99)] * 1000, 1),
+        'max_ms': round(latencies[-1] * 1000, 1),
+        'prewarm': weather_service.prewarmer.stats()
+    }))
+
+
+def run_mode(mode, stub_port, args, snapshot_path):
+    env = dict(
+        os.environ,
+        OPENWEATHER_API_KEY='bench',
+        GROQ_API_KEY='',
+        WEATHER_BASE_URL=f'http://127.0.0.1:{stub_port}',
+        WEATHER_CURRENT_TTL=str(args.ttl),
+        WEATHER_FORECAST_TTL=str(args.ttl * 3),
+        WEATHER_STALE_TTL='0',
+        WEATHER_PREWARM_CITIES='' if mode == 'cold' else ','.join(CITIES[:args.hot]),
+        WEATHER_PREWARM_TOP_N='0' if mode == 'cold' else str(args.top_n),
+        WEATHER_PREWARM_RATE=str(args.prewarm_rate),
+        WEATHER_SNAPSHOT_PATH='' if mode == 'cold' else snapshot_path
+    )
+    output = subprocess.check_output(
+        [sys.executable, os.path.abspath(__file__), '--worker', '--duration', str(args.duration),
+         '--rate', str(args.rate)],
+        cwd=BACKEND_DIR, env=env, text=True
+    )
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Weather lookups that wait on the upstream, with/without pre-warming')
+    parser.add_argument('--duration', type=float, default=60)
+    parser.add_argument('--rate', type=float, default=20, help='user lookups per second')
+    parser.add_argument('--ttl', type=int, default=10, help='current-weather TTL in seconds (forecast x3)')
+    parser.add_argument('--latency', type=float, default=0.3, help='stub upstream latency in seconds')
+    parser.add_argument('--hot', type=int, default=6, help='configured hot cities')
+    parser.add_argument('--top-n', type=int, default=4, help='learned cities')
+    parser.add_argument('--prewarm-rate', type=float, default=5, help='pre-warmer upstream calls per second')
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.duration, args.rate, seed=1)
+        return
+
+    stub, stub_port = start_stub(args.latency)
+    snapshot_path = os.path.join(tempfile.mkdtemp(), 'weather_snapshot.json')
+    results = {}
+    try:
+        for mode in ('cold', 'prewarm', 'restart'):
+            results[mode] = row = run_mode(mode, stub_port, args, snapshot_path)
+            print(f"{mode:<8} lookups={row['lookups']} waited={row['waited_on_upstream']} ({row['waited_pct']}%) "
+                  f"p50={row['p50_ms']}ms p99={row['p99_ms']}ms max={row['max_ms']}ms "
+                  f"upstream refreshes={row['prewarm']['refreshed']} restored={row['prewarm']['restored_from_snapshot']}")
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+# ==================== RULE TABLE MICRO-BENCHMARK ====================
+# Per-call latency and allocation of the rules-store lookups against the
+# previous implementations, which rebuilt their nested dict literals on every
+# call (reproduced below as legacy_*):
+#   cd backend && python bench/bench_rules.py --calls 100000 --scale 1 20 200
+#
+# --scale N also times a fertilizer table with N times as many crops, generated
+# both as a function-body literal (legacy) and as a rules file (store), to show
+# how each approach behaves as the knowledge base grows.
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rules import RulesStore  # noqa: E402
+from crop_engine import SuitabilityModel  # noqa: E402
+from subsidy_engine import SchemeCatalogue  # noqa: E402
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'rules.json')
+
+
+def legacy_treatment(disease):
+    treatments = {
+        'Leaf_Blight': {
+            'chemical': 'Copper oxychloride 50% WP @ 2g/L',
+            'organic': 'Neem oil spray (5ml/L) + Trichoderma',
+            'fertilizer': 'Balanced NPK 19:19:19 @ 2g/L',
+            'prevention': 'Improve drainage, avoid overhead irrigation'
+        },
+        'Powdery_Mildew': {
+            'chemical': 'Wettable sulfur 80% WP @ 2g/L',
+            'organic': 'Baking soda solution (5g/L)',
+            'fertilizer': 'Reduce nitrogen, increase potassium',
+            'prevention': 'Ensure good air circulation'
+        },
+        'Healthy': {
+            'maintenance': 'Continue current care practices',
+            'fertilizer': 'Regular balanced NPK',
+            'prevention': 'Weekly health monitoring'
+        }
+    }
+    return treatments.get(disease, treatments['Healthy'])
+
+
+def legacy_fertilizer(crop, growth_stage):
+    recommendations = {
+        'wheat': {
+            'initial': 'Apply 120kg/ha Urea + 60kg/ha DAP',
+            'vegetative': 'Top dress with 40kg/ha Urea',
+            'flowering': 'Apply 20kg/ha Potash + Micronutrients',
+            'maturity': 'No fertilizer needed, prepare for harvest'
+        },
+        'rice': {
+            'initial': 'Apply 100kg/ha NPK (10:26:26) + 50kg/ha Urea',
+            'vegetative': 'Top dress with 60kg/ha Urea in 2 splits',
+            'flowering': 'Apply 25kg/ha Potash + Zinc sulphate',
+            'maturity': 'Ensure proper drainage, no fertilizer'
+        },
+        'maize': {
+            'initial': 'Apply 150kg/ha NPK (12:32:16)',
+            'vegetative': 'Side dress with 80kg/ha Urea',
+            'flowering': 'Apply 30kg/ha Potash',
+            'maturity': 'Monitor for harvest readiness'
+        },
+        'vegetables': {
+            'initial': 'Apply compost 5t/ha + NPK (19:19:19) 100kg/ha',
+            'vegetative': 'Weekly liquid fertilizer application',
+            'flowering': 'High phosphorus fertilizer + Calcium',
+            'maturity': 'Reduce fertilizer, focus on quality'
+        }
+    }
+    return recommendations.get(crop, {}).get(growth_stage, 'Consult agricultural expert')
+
+
+def legacy_crop(soil_type):
+    crop_options = {
+        'clay': ['Rice', 'Wheat', 'Sugarcane'],
+        'sandy': ['Bajra', 'Groundnut', 'Watermelon'],
+        'loamy': ['Maize', 'Cotton', 'Soybean'],
+        'black': ['Cotton', 'Soybean', 'Sunflower']
+    }
+    return crop_options.get(soil_type, ['Mixed farming'])
+
+
+def legacy_subsidies(crop, category, land_size):
+    subsidies = []
+    crop_subsidies = {
+        'wheat': ['50% subsidy on certified wheat seeds', 'Wheat procurement at MSP'],
+        'rice': ['Rice seed subsidy up to 75%', 'Paddy procurement guarantee'],
+        'maize': ['Hybrid maize seed subsidy', 'Maize processing unit support'],
+        'cotton': ['Cotton seed subsidy 50%', 'Cotton technology mission'],
+        'vegetables': ['Vegetable cluster development', 'Cold storage subsidy']
+    }
+    if category == 'small':
+        subsidies.extend(['PM-KISAN ₹6000/year', 'Small farmer credit scheme'])
+    if float(land_size) >= 5:
+        subsidies.extend(['Machinery & equipment subsidy', 'Drip irrigation subsidy'])
+    if crop in crop_subsidies:
+        subsidies.extend(crop_subsidies[crop])
+    subsidies.extend(['Soil health card', 'Crop insurance scheme', 'Kisan credit card'])
+    return list(set(subsidies))
+
+
+def store_lookups(rules):
+    def treatment(disease):
+        table = rules['treatments']['by_disease']
+        return table.get(disease, rules['treatments']['not_on_file'])
+
+    def fertilizer(crop, growth_stage):
+        table = rules['fertilizer']
+        return table['schedules'].get(crop, {}).get(growth_stage, table['default'])
+
+    # Crops are now ranked on all four inputs with one precomputed-table lookup
+    model = SuitabilityModel(rules['crops']['suitability'])
+
+    def crop(soil_type):
+        row = model.score_one({'soil_type': soil_type})
+        return [model.crops[i] for i in model.rank_one(row, 3)]
+
+    # Subsidies are answered from the catalogue's eligibility index
+    catalogue = SchemeCatalogue(rules['subsidies'])
+
+    def subsidies(crop, category, land_size):
+        return catalogue.names(catalogue.eligible(crop, category, land_size))
+
+    return treatment, fertilizer, crop, subsidies
+
+
+def scaled_fertilizer(scale):
+    # The same schedule table repeated for `scale` x 4 crops
+    with open(RULES_PATH, encoding='utf-8') as f:
+        base = json.load(f)
+    schedules = {
+        f'{crop}_{i}': stages
+        for i in range(scale)
+        for crop, stages in base['fertilizer']['schedules'].items()
+    }
+    base['fertilizer']['schedules'] = schedules
+
+    namespace = {}
+    exec(
+        f"def legacy(crop, growth_stage):\n"
+        f"    recommendations = {schedules!r}\n"
+        f"    return recommendations.get(crop, {{}}).get(growth_stage, 'Consult agricultural expert')\n",
+        namespace
+    )
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False, encoding='utf-8') as f:
+        json.dump(base, f)
+    rules = RulesStore(f.name)
+    os.unlink(f.name)
+    return namespace['legacy'], store_lookups(rules)[1]
+
+
+def measure(fn, args, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn(*args)
+    latency_ns = (time.perf_counter() - start) / calls * 1e9
+
+    # Bytes allocated per call, including memory freed again before returning
+    sample = min(calls, 2000)
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    peaks = 0
+    for _ in range(sample):
+        result = fn(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks += peak - before
+        tracemalloc.reset_peak()
+        del result
+    tracemalloc.stop()
+    return round(latency_ns, 1), round(peaks / sample)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rule table lookup cost before/after the rules store')
+    parser.add_argument('--calls', type=int, default=100000)
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 20, 200])
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    treatment, fertilizer, crop, subsidies = store_lookups(RulesStore(RULES_PATH))
+    cases = [
+        ('treatment', legacy_treatment, treatment, ('Powdery_Mildew',), args.calls),
+        ('fertilizer', legacy_fertilizer, fertilizer, ('rice', 'flowering'), args.calls),
+        ('crop', legacy_crop, crop, ('loamy',), args.calls),
+        ('subsidies', legacy_subsidies, subsidies, ('wheat', 'small', 6), args.calls)
+    ]
+
+    # Large legacy literals are slow to rebuild, so scaled cases run fewer calls
+    for scale in args.scale:
+        legacy, current = scaled_fertilizer(scale)
+        cases.append((f'fertilizer x{scale * 4} crops', legacy, current, ('rice_0', 'flowering'),
+                      max(200, args.calls // scale)))
+
+    # Allocation of the measurement loop itself, subtracted from every row
+    _, baseline = measure(lambda *a: None, (), args.calls)
+
+    results = []
+    for name, legacy, current, call_args, calls in cases:
+        legacy_ns, legacy_bytes = measure(legacy, call_args, calls)
+        store_ns, store_bytes = measure(current, call_args, calls)
+        legacy_bytes = max(0, legacy_bytes - baseline)
+        store_bytes = max(0, store_bytes - baseline)
+        results.append({
+            'lookup': name,
+            'legacy_ns': legacy_ns,
+            'store_ns': store_ns,
+            'legacy_bytes_per_call': legacy_bytes,
+            'store_bytes_per_call': store_bytes
+        })
+        print(f"{name:<24} legacy={legacy_ns}ns/{legacy_bytes}B  store={store_ns}ns/{store_bytes}B")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'calls': args.calls, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
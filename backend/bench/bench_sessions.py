@@ -0,0 +1,122 @@
+# ==================== CHATBOT SESSION BENCHMARK ====================
+# In-process cost of chatbot conversation sessions (sessions.py) as a
+# conversation grows: time to fetch the context and record an exchange, and
+# the size of the prompt sent to Groq, compared with resending the whole
+# conversation. Then memory for many concurrent sessions:
+#   cd backend && python bench/bench_sessions.py --lengths 1 10 100 1000 --sessions 10000
+#   cd backend && python bench/bench_sessions.py --db /tmp/sessions.db   # with SQLite persistence
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sessions import SessionStore, estimate_tokens  # noqa: E402
+
+QUESTIONS = [
+    'My wheat leaves are turning yellow from the tips, what should I do?',
+    'How much urea per acre at the tillering stage?',
+    'Is it safe to spray before rain tomorrow?',
+    'गेहूं में पीला रतुआ का इलाज क्या है?',
+    'What about drip irrigation for the same field?',
+    'Which organic option works if I cannot get DAP?'
+]
+ANSWER = ('Apply a balanced NPK dose split across two irrigations and check for rust on the lower leaves. '
+          'Spray mancozeb only when no rain is expected for a day.')
+
+
+def store(args, path=None):
+    return SessionStore(args.sessions + 1, 3600, args.messages, args.history_tokens, args.summary_tokens, path)
+
+
+def exchange_cost(args, length, path):
+    # Grows one conversation to `length` exchanges, measures the context it
+    # would send, then times further exchanges
+    sessions = store(args, path)
+    rng = random.Random(length)
+    full_tokens = 0
+    for _ in range(length):
+        question = rng.choice(QUESTIONS)
+        sessions.add('bench-session', question, ANSWER)
+        full_tokens += estimate_tokens(question) + estimate_tokens(ANSWER)
+
+    summary, history = sessions.context('bench-session')
+    prompt_tokens = sum(estimate_tokens(text) for _, text in history) + (estimate_tokens(summary) if summary else 0)
+
+    timings = []
+    for _ in range(args.samples):
+        question = rng.choice(QUESTIONS)
+        start = time.perf_counter()
+        sessions.context('bench-session')
+        sessions.add('bench-session', question, ANSWER)
+        timings.append(time.perf_counter() - start)
+    return {
+        'us_per_exchange': round(statistics.median(timings) * 1e6, 1),
+        'p99_us': round(sorted(timings)[int(len(timings) * 0.99)] * 1e6, 1),
+        'context_messages': len(history),
+        'context_tokens': prompt_tokens,
+        'full_history_tokens': full_tokens
+    }
+
+
+def memory(args):
+    # Python heap growth for --sessions sessions of --exchanges exchanges each
+    sessions = store(args)
+    rng = random.Random(0)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(args.sessions):
+        session_id = f'session-{i:08d}'
+        for _ in range(args.exchanges):
+            sessions.add(session_id, rng.choice(QUESTIONS), ANSWER)
+    heap = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    stats = sessions.stats()
+    return {
+        'sessions': stats['sessions'],
+        'heap_bytes': heap,
+        'heap_bytes_per_session': round(heap / args.sessions),
+        'reported_approx_bytes': stats['approx_bytes']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Chatbot session cost and prompt size by conversation length')
+    parser.add_argument('--lengths', type=int, nargs='+', default=[1, 10, 100, 1000],
+                        help='exchanges already in the conversation')
+    parser.add_argument('--samples', type=int, default=2000, help='timed exchanges per length')
+    parser.add_argument('--sessions', type=int, default=10000, help='sessions for the memory run')
+    parser.add_argument('--exchanges', type=int, default=20, help='exchanges per session for the memory run')
+    parser.add_argument('--messages', type=int, default=16, help='CHATBOT_SESSION_MESSAGES')
+    parser.add_argument('--history-tokens', type=int, default=1200, help='CHATBOT_SESSION_TOKENS')
+    parser.add_argument('--summary-tokens', type=int, default=200, help='CHATBOT_SESSION_SUMMARY_TOKENS')
+    parser.add_argument('--db', help='SQLite path, to include persistence in the timings')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    results = {'lengths': {}}
+    for length in args.lengths:
+        if args.db and os.path.exists(args.db):
+            os.remove(args.db)
+        row = results['lengths'][length] = exchange_cost(args, length, args.db)
+        print(f"{length:>6} exchanges: {row['us_per_exchange']:>8.1f} us/exchange (p99 {row['p99_us']:.1f}) "
+              f"context {row['context_messages']} messages / {row['context_tokens']} tokens "
+              f"(whole conversation {row['full_history_tokens']} tokens)")
+
+    results['memory'] = row = memory(args)
+    print(f"{row['sessions']} sessions x {args.exchanges} exchanges: {row['heap_bytes'] / 1e6:.1f} MB heap, "
+          f"{row['heap_bytes_per_session']:,} bytes/session (reported {row['reported_approx_bytes'] / 1e6:.1f} MB)")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
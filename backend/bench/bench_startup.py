@@ -0,0 +1,117 @@
+# ==================== STARTUP TIME ====================
+# Time from launching the server until it accepts connections, answers
+# /healthz, and reports ready at /readyz, for each way of running the app.
+# The upstream stubs answer slowly (--latency) to show that upstream probes
+# no longer delay startup:
+#   cd backend && python bench/bench_startup.py --latency 5 --runs 3
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_async import BACKEND_DIR, free_port, start_stub  # noqa: E402
+
+COMMANDS = {
+    'dev': lambda port: [sys.executable, 'app.py'],
+    'gunicorn': lambda port: ['gunicorn', '--preload', '-w', '2', '-b', f'127.0.0.1:{port}',
+                              '--log-level', 'warning', 'app:create_app()'],
+    'uvicorn': lambda port: [sys.executable, '-m', 'uvicorn', 'asgi:application', '--host', '127.0.0.1',
+                             '--port', str(port), '--log-level', 'warning']
+}
+
+
+def poll(url, accept, deadline):
+    # Seconds until `url` answers with a status in `accept`
+    while time.perf_counter() < deadline:
+        try:
+            if httpx.get(url, timeout=0.5).status_code in accept:
+                return time.perf_counter()
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.01)
+    raise RuntimeError(f'{url} not answering')
+
+
+def measure(mode, stub_port, pool_size):
+    port = free_port()
+    env = dict(
+        os.environ,
+        HOST='127.0.0.1',
+        PORT=str(port),
+        OPENWEATHER_API_KEY='bench',
+        GROQ_API_KEY='bench',
+        WEATHER_BASE_URL=f'http://127.0.0.1:{stub_port}',
+        GROQ_BASE_URL=f'http://127.0.0.1:{stub_port}',
+        DISEASE_POOL_SIZE=str(pool_size),
+        # Its own probe lock, so a server already running here keeps probing
+        HEALTH_PROBE_LOCK=os.path.join(tempfile.gettempdir(), f'bench-startup-{port}.lock')
+    )
+    base = f'http://127.0.0.1:{port}'
+    started = time.perf_counter()
+    proc = subprocess.Popen(COMMANDS[mode](port), cwd=BACKEND_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = started + 60
+        # Any HTTP answer means the socket accepts traffic
+        listening = poll(f'{base}/healthz', range(100, 600), deadline)
+        live = poll(f'{base}/healthz', (200,), deadline)
+        ready = poll(f'{base}/readyz', (200,), deadline)
+        probed = None
+        while time.perf_counter() < deadline:
+            upstreams = httpx.get(f'{base}/readyz').json()['upstreams']
+            if len(upstreams) == 2:
+                probed = time.perf_counter()
+                break
+            time.sleep(0.05)
+        return {
+            'listening_s': round(listening - started, 3),
+            'healthz_s': round(live - started, 3),
+            'readyz_s': round(ready - started, 3),
+            'upstreams_probed_s': round(probed - started, 3) if probed else None
+        }
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Server startup time to listening, live and ready')
+    parser.add_argument('--modes', nargs='+', choices=list(COMMANDS), default=list(COMMANDS))
+    parser.add_argument('--latency', type=float, default=5.0, help='stub upstream latency in seconds')
+    parser.add_argument('--pool-size', type=int, default=0, help='DISEASE_POOL_SIZE for the servers')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    stub, stub_port = start_stub(args.latency)
+    results = {}
+    try:
+        for mode in args.modes:
+            runs = [measure(mode, stub_port, args.pool_size) for _ in range(args.runs)]
+            results[mode] = {
+                key: round(statistics.median(run[key] for run in runs), 3) if all(run[key] is not None for run in runs) else None
+                for key in runs[0]
+            }
+            row = results[mode]
+            print(f"{mode:<10} listening={row['listening_s']}s healthz={row['healthz_s']}s "
+                  f"readyz={row['readyz_s']}s upstreams probed={row['upstreams_probed_s']}s")
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
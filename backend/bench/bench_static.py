@@ -0,0 +1,159 @@
+# ==================== PAGE WEIGHT REPORT ====================
+# Bytes on the wire and modelled time-to-interactive for every page, served
+# the previous way (send_from_directory, uncompressed) and through the static
+# asset table (hashed immutable css/js, precompressed, ETag revalidation).
+# Each page is loaded twice by a small browser-cache model: a first visit and
+# a repeat visit. Only same-origin files are counted (CDN fonts/icons are not):
+#   cd backend && python bench/bench_static.py
+#
+# TTI is modelled, not measured: one round trip plus transfer time for the
+# HTML, then one round trip plus transfer time for its css/js fetched in
+# parallel, on the network profiles below. Script execution is not included.
+
+import argparse
+import gzip
+import json
+import os
+import re
+import sys
+import time
+from urllib.parse import urljoin, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, send_from_directory  # noqa: E402
+from app import app  # noqa: E402
+from static_assets import brotli  # noqa: E402
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '..'))
+
+# (round trip seconds, bytes per second)
+NETWORKS = {
+    '2g': (0.8, 280_000 / 8),
+    '3g': (0.3, 1_600_000 / 8)
+}
+
+SUBRESOURCE = re.compile(r'''<(?:script[^>]*\bsrc|link[^>]*\bhref)\s*=\s*["']([^"']+)["']''')
+
+
+def legacy_app():
+    # The static routes as they were before the asset table
+    legacy = Flask('legacy', static_folder=None)
+
+    @legacy.route('/')
+    def index():
+        return send_from_directory(ROOT, 'index.html')
+
+    @legacy.route('/<path:filename>')
+    def static_files(filename):
+        return send_from_directory(ROOT, filename)
+
+    return legacy
+
+
+class Browser:
+    # Enough of an HTTP cache to tell apart fresh hits, revalidations and
+    # full downloads
+    def __init__(self, client):
+        self.client = client
+        self.cache = {}
+
+    def fetch(self, url):
+        entry = self.cache.get(url)
+        if entry and entry['fresh_until'] > time.time():
+            return {'requested': False, 'wire_bytes': 0, 'body': entry['body']}
+
+        headers = {'Accept-Encoding': 'gzip, deflate, br'}
+        if entry and entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        response = self.client.get(url, headers=headers)
+        raw = response.get_data()
+        wire = len(f'HTTP/1.1 {response.status}\r\n') + 2 + sum(
+            len(f'{name}: {value}\r\n') for name, value in response.headers.items()
+        ) + len(raw)
+
+        if response.status_code == 304:
+            body = entry['body']
+        else:
+            encoding = response.headers.get('Content-Encoding')
+            if encoding == 'gzip':
+                body = gzip.decompress(raw)
+            elif encoding == 'br':
+                body = brotli.decompress(raw)
+            else:
+                body = raw
+            max_age = response.cache_control.max_age if not response.cache_control.no_cache else None
+            self.cache[url] = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'fresh_until': time.time() + (max_age or 0),
+                'body': body
+            }
+        return {'requested': True, 'wire_bytes': wire, 'body': body}
+
+
+def visit(browser, page_url):
+    html = browser.fetch(page_url)
+    assets = []
+    for reference in SUBRESOURCE.findall(html['body'].decode('utf-8')):
+        url = urlparse(urljoin('http://localhost' + page_url, reference))
+        if url.netloc == 'localhost':
+            assets.append(browser.fetch(url.path))
+    return html, assets
+
+
+def summarize(html, assets):
+    fetched = [asset for asset in assets if asset['requested']]
+    summary = {
+        'requests': int(html['requested']) + len(fetched),
+        'wire_bytes': html['wire_bytes'] + sum(asset['wire_bytes'] for asset in fetched)
+    }
+    for network, (rtt, bandwidth) in NETWORKS.items():
+        seconds = rtt + html['wire_bytes'] / bandwidth if html['requested'] else 0.0
+        if fetched:
+            seconds += rtt + sum(asset['wire_bytes'] for asset in fetched) / bandwidth
+        summary[f'tti_{network}_ms'] = round(seconds * 1000)
+    return summary
+
+
+def measure(client, page_url):
+    browser = Browser(client)
+    first = summarize(*visit(browser, page_url))
+    repeat = summarize(*visit(browser, page_url))
+    return {'first_visit': first, 'repeat_visit': repeat}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-page bytes on wire and modelled TTI, before/after')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    pages = ['/'] + sorted(f'/pages/{name}' for name in os.listdir(os.path.join(ROOT, 'pages')) if name.endswith('.html'))
+    legacy_client = legacy_app().test_client()
+    client = app.test_client()
+
+    results = []
+    for page in pages:
+        before = measure(legacy_client, page)
+        after = measure(client, page)
+        results.append({'page': page, 'before': before, 'after': after})
+
+    print(f"{'page':<24}{'visit':<8}{'KB before':>10}{'KB after':>10}{'req':>8}"
+          f"{'2G ms':>16}{'3G ms':>16}")
+    for row in results:
+        for visit_name in ('first_visit', 'repeat_visit'):
+            b, a = row['before'][visit_name], row['after'][visit_name]
+            print(f"{row['page']:<24}{visit_name.split('_')[0]:<8}"
+                  f"{b['wire_bytes'] / 1024:>10.1f}{a['wire_bytes'] / 1024:>10.1f}"
+                  f"{b['requests']:>4}->{a['requests']:<3}"
+                  f"{b['tti_2g_ms']:>8}->{a['tti_2g_ms']:<7}{b['tti_3g_ms']:>8}->{a['tti_3g_ms']:<7}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'networks': NETWORKS, 'pages': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+# ==================== SUBSIDY BULK ELIGIBILITY BENCHMARK ====================
+# Throughput of eligibility evaluation over a synthetic farmer registry: the
+# previous per-call rule walk, the catalogue index alone, and the streaming
+# /api/subsidy/bulk endpoint (parsing and encoding included) for CSV and
+# NDJSON registries:
+#   cd backend && python bench/bench_subsidies.py --records 1000000
+
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, subsidy_finder  # noqa: E402
+
+CROPS = ['wheat', 'rice', 'maize', 'cotton', 'vegetables', 'millet', 'pulses']
+CATEGORIES = ['small', 'marginal', 'large', 'medium']
+
+
+def synthetic_registry(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        (f'F{i:07d}', rng.choice(CROPS), rng.choice(CATEGORIES), round(rng.lognormvariate(1, 0.8), 2))
+        for i in range(count)
+    ]
+
+
+def legacy_walk(table):
+    # The rule walk find_subsidies did before the eligibility index
+    def find(crop, category, land_size):
+        subsidies = list(table['by_category'].get(category, ()))
+        land_size = float(land_size)
+        for tier in table['by_land_size']:
+            if land_size >= tier['min_land_size']:
+                subsidies.extend(tier['schemes'])
+        subsidies.extend(table['by_crop'].get(crop, ()))
+        subsidies.extend(table['common'])
+        return list(set(subsidies))
+
+    # Equivalent old-format table built from the catalogue
+    by_category, by_land_size, by_crop, common = {}, {}, {}, []
+    for scheme in table.schemes:
+        eligibility = scheme.get('eligibility', {})
+        if 'categories' in eligibility:
+            for category in eligibility['categories']:
+                by_category.setdefault(category, []).append(scheme['name'])
+        elif 'min_land_size' in eligibility:
+            by_land_size.setdefault(eligibility['min_land_size'], []).append(scheme['name'])
+        elif 'crops' in eligibility:
+            for crop in eligibility['crops']:
+                by_crop.setdefault(crop, []).append(scheme['name'])
+        else:
+            common.append(scheme['name'])
+    table = {
+        'by_category': by_category,
+        'by_land_size': [{'min_land_size': size, 'schemes': names} for size, names in sorted(by_land_size.items())],
+        'by_crop': by_crop,
+        'common': common
+    }
+    return find
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Subsidy eligibility throughput over a farmer registry')
+    parser.add_argument('--records', type=int, default=1000000)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    registry = synthetic_registry(args.records)
+    catalogue = subsidy_finder.catalogue()
+    legacy = legacy_walk(catalogue)
+    csv_body = 'id,crop,category,land_size\n' + '\n'.join(','.join(map(str, record)) for record in registry) + '\n'
+    ndjson_body = '\n'.join(
+        json.dumps(dict(zip(('id', 'crop', 'category', 'land_size'), record))) for record in registry
+    ) + '\n'
+    client = app.test_client()
+
+    def endpoint(body, content_type, output):
+        response = client.post(f'/api/subsidy/bulk?format={output}', data=body, content_type=content_type)
+        assert response.status_code == 200, response.status_code
+        lines = 0
+        for chunk in response.response:
+            lines += chunk.count(b'\n') if isinstance(chunk, bytes) else chunk.count('\n')
+        response.close()
+        assert lines >= args.records, lines
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    seconds = {
+        'legacy_walk': timed(lambda: [legacy(crop, category, size) for _, crop, category, size in registry]),
+        'catalogue_index': timed(lambda: sum(1 for _ in catalogue.evaluate(registry))),
+        'bulk_csv_to_csv': timed(lambda: endpoint(csv_body, 'text/csv', 'csv')),
+        'bulk_ndjson_to_ndjson': timed(lambda: endpoint(ndjson_body, 'application/x-ndjson', 'ndjson'))
+    }
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    results = {
+        'records': args.records,
+        'seconds': {name: round(value, 2) for name, value in seconds.items()},
+        'records_per_second': {name: round(args.records / value) for name, value in seconds.items()},
+        # Peak RSS growth while streaming; stays flat as the registry grows
+        'peak_rss_growth_mb': round((rss_after - rss_before) / 1024, 1)
+    }
+    for name, value in seconds.items():
+        print(f"{name:<24} {value:7.2f}s  {results['records_per_second'][name]:>10} records/s")
+    print(f"peak RSS growth {results['peak_rss_growth_mb']} MB")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
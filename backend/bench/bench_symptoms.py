@@ -0,0 +1,98 @@
+# ==================== SYMPTOM MATCHING SCALING BENCHMARK ====================
+# Per-query cost of the inverted-index SymptomIndex against a linear scan over
+# every profile (the old SymptomAnalyzer approach) as the catalogue grows:
+#   cd backend && python bench/bench_symptoms.py --sizes 10 100 1000 5000 20000
+#
+# Synthetic catalogues grow their symptom vocabulary with the number of
+# profiles (as a real crop x disease catalogue does), so the index cost tracks
+# posting-list length rather than catalogue size.
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from symptom_engine import SymptomIndex  # noqa: E402
+
+CROPS = ['wheat', 'rice', 'maize', 'cotton', 'tomato', 'potato', 'sugarcane', 'vegetables']
+
+
+def synthetic_catalogue(size, rng):
+    vocabulary = [f'symptom_{i}' for i in range(max(40, size // 2))]
+    profiles = []
+    for i in range(size):
+        chosen = rng.choice(len(vocabulary), size=int(rng.integers(3, 7)), replace=False)
+        profiles.append({
+            'disease': f'Disease_{i}',
+            'crop': None if i % 10 == 0 else CROPS[i % len(CROPS)],
+            'symptoms': {vocabulary[j]: round(float(rng.uniform(0.3, 1.0)), 2) for j in chosen}
+        })
+    return profiles
+
+
+def linear_rank(profiles, symptoms, crop, k):
+    # Baseline: intersect every applicable profile with the query
+    query = set(symptoms)
+    scored = []
+    for profile in profiles:
+        if profile['crop'] not in (None, crop):
+            continue
+        score = len(query & set(profile['symptoms']))
+        if score:
+            scored.append((score, profile['disease']))
+    scored.sort(reverse=True)
+    return scored[:k]
+
+
+def time_per_query(fn, queries):
+    start = time.perf_counter()
+    for symptoms, crop in queries:
+        fn(symptoms, crop)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Symptom matching cost vs catalogue size')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 5000, 20000])
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    results = []
+    for size in args.sizes:
+        profiles = synthetic_catalogue(size, rng)
+        started = time.perf_counter()
+        index = SymptomIndex(profiles)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        # Queries are drawn from real profiles so most of them match something
+        queries = []
+        for _ in range(args.queries):
+            profile = profiles[int(rng.integers(0, size))]
+            symptoms = list(profile['symptoms'])[:3]
+            queries.append((symptoms, profile['crop']))
+
+        row = {
+            'profiles': size,
+            'symptoms': index.stats()['symptoms'],
+            'build_ms': round(build_ms, 1),
+            'index_us_per_query': round(time_per_query(lambda s, c: index.rank(s, c, 3), queries), 1),
+            'linear_us_per_query': round(time_per_query(lambda s, c: linear_rank(profiles, s, c, 3), queries), 1)
+        }
+        results.append(row)
+        print(f"profiles={row['profiles']:<6} build={row['build_ms']}ms  "
+              f"index={row['index_us_per_query']}us/query  linear={row['linear_us_per_query']}us/query")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'queries': args.queries, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
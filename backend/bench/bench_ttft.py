@@ -0,0 +1,75 @@
+# ==================== CHATBOT TIME-TO-FIRST-TOKEN BENCHMARK ====================
+# Compares the JSON and streaming (SSE) modes of /api/chatbot/query against
+# the local Groq stub:
+#   cd backend && python bench/bench_ttft.py --requests 20
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_async import start_stub  # noqa: E402
+
+
+def measure(base_url, stream):
+    body = {'query': 'What fertilizer for wheat?', 'language': 'en-IN', 'stream': stream}
+    start = time.perf_counter()
+    response = requests.post(f'{base_url}/api/chatbot/query', json=body, stream=stream)
+    if not stream:
+        response.json()
+        total = time.perf_counter() - start
+        return total, total
+
+    first = None
+    for line in response.iter_lines(chunk_size=None):
+        if line.startswith(b'data:'):
+            event = json.loads(line[5:])
+            if first is None and event.get('delta'):
+                first = time.perf_counter() - start
+            if event.get('done'):
+                break
+    return first, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Chatbot time-to-first-token, JSON vs SSE')
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.25, help='stub time to first token (s)')
+    parser.add_argument('--token-delay', type=float, default=0.05, help='stub delay between tokens (s)')
+    args = parser.parse_args()
+
+    stub, stub_port = start_stub(args.latency, args.token_delay)
+    os.environ.update(
+        GROQ_API_KEY='bench',
+        GROQ_BASE_URL=f'http://127.0.0.1:{stub_port}',
+        UPSTREAM_RETRIES='0',
+        CHATBOT_CACHE_TTL='0'
+    )
+    from werkzeug.serving import make_server
+    from app import app
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+
+    try:
+        for stream in (False, True):
+            samples = [measure(base_url, stream) for _ in range(args.requests)]
+            ttft = statistics.median(s[0] for s in samples) * 1000
+            total = statistics.median(s[1] for s in samples) * 1000
+            print(f"{'sse' if stream else 'json':>4}  median first token {ttft:7.1f} ms   median complete {total:7.1f} ms")
+    finally:
+        server.shutdown()
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+# ==================== LOCAL UPSTREAM STUBS ====================
+# Stand-ins for OpenWeather and Groq used by the benchmarks:
+#   python bench/stub_upstream.py --port 9100 --latency 0.25 --error-rate 0.0
+#
+# Faults can be injected: --jitter adds an exponentially distributed delay
+# (a realistic long tail), --error-rate answers 503, and --stall-rate holds
+# the response for --stall seconds so client read timeouts fire.
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import uvicorn
+
+settings = {'latency': 0.25, 'jitter': 0.0, 'error_rate': 0.0, 'stall_rate': 0.0, 'stall': 30.0, 'token_delay': 0.02}
+
+COMPLETION_TEXT = 'Use balanced NPK and irrigate early in the morning.'
+
+
+def weather_payload(city):
+    return {
+        'name': city,
+        'main': {'temp': 28, 'humidity': 60, 'pressure': 1013, 'feels_like': 30},
+        'weather': [{'main': 'Clear', 'description': 'clear sky', 'icon': '01d'}],
+        'wind': {'speed': 4},
+        'visibility': 10000,
+        'clouds': {'all': 20}
+    }
+
+
+def forecast_payload(city):
+    now = int(time.time())
+    return {
+        'city': {'name': city},
+        'list': [
+            {
+                'dt': now + i * 86400,
+                'main': {'temp': 28, 'temp_max': 31, 'temp_min': 24, 'humidity': 60},
+                'weather': [{'main': 'Clear', 'description': 'clear sky', 'icon': '01d'}],
+                'wind': {'speed': 4}
+            }
+            for i in range(1, 6)
+        ]
+    }
+
+
+def completion_payload():
+    return {
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': COMPLETION_TEXT},
+            'finish_reason': 'stop'
+        }]
+    }
+
+
+async def stream_completion(send):
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [(b'content-type', b'text/event-stream')]
+    })
+    for i, word in enumerate(COMPLETION_TEXT.split(' ')):
+        if i:
+            await asyncio.sleep(settings['token_delay'])
+        chunk = {'choices': [{'index': 0, 'delta': {'content': word if i == 0 else f' {word}'}}]}
+        await send({'type': 'http.response.body', 'body': f"data: {json.dumps(chunk)}\n\n".encode(), 'more_body': True})
+    await send({'type': 'http.response.body', 'body': b'data: [DONE]\n\n'})
+
+
+async def app(scope, receive, send):
+    if scope['type'] != 'http':
+        return
+
+    chunks = []
+    more_body = True
+    while more_body:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        more_body = message.get('more_body', False)
+    body = b''.join(chunks)
+
+    # Latency models time-to-first-byte; a non-streamed completion also waits for every token
+    delay = settings['latency']
+    if settings['jitter']:
+        delay += random.expovariate(1 / settings['jitter'])
+    if random.random() < settings['stall_rate']:
+        delay = settings['stall']
+    await asyncio.sleep(delay)
+
+    path = scope['path']
+    query = dict(
+        part.split('=', 1) for part in scope['query_string'].decode().split('&') if '=' in part
+    )
+    if random.random() < settings['error_rate']:
+        status, payload = 503, {'error': 'injected failure'}
+    elif path.endswith('/weather'):
+        status, payload = 200, weather_payload(query.get('q', 'Pune'))
+    elif path.endswith('/forecast'):
+        status, payload = 200, forecast_payload(query.get('q', 'Pune'))
+    elif path.endswith('/models'):
+        status, payload = 200, {'data': [{'id': 'llama-3.1-8b-instant', 'object': 'model'}]}
+    elif path.endswith('/chat/completions') and body and json.loads(body).get('stream'):
+        await stream_completion(send)
+        return
+    elif path.endswith('/chat/completions'):
+        await asyncio.sleep(settings['token_delay'] * len(COMPLETION_TEXT.split(' ')))
+        status, payload = 200, completion_payload()
+    else:
+        status, payload = 404, {'error': 'not found'}
+
+    body = json.dumps(payload).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local OpenWeather/Groq stub server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9100)
+    parser.add_argument('--latency', type=float, default=0.25, help='seconds added to every response')
+    parser.add_argument('--token-delay', type=float, default=0.02, help='seconds between streamed tokens')
+    parser.add_argument('--jitter', type=float, default=0.0, help='mean of an exponential extra delay in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of responses that return 503')
+    parser.add_argument('--stall-rate', type=float, default=0.0, help='fraction of responses held for --stall seconds')
+    parser.add_argument('--stall', type=float, default=30.0, help='seconds a stalled response is held')
+    args = parser.parse_args()
+
+    settings['latency'] = args.latency
+    settings['jitter'] = args.jitter
+    settings['error_rate'] = args.error_rate
+    settings['stall_rate'] = args.stall_rate
+    settings['stall'] = args.stall
+    settings['token_delay'] = args.token_delay
+    uvicorn.run(app, host=args.host, port=args.port, log_level='warning', backlog=4096)
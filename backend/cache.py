@@ -0,0 +1,549 @@
+# ==================== SOILSYNC RESPONSE CACHE ====================
+
+import asyncio
+import json
+import math
+import os
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class TTLCache:
+    # Bounded LRU cache with a fresh window (ttl), a stale-while-revalidate
+    # window (stale_ttl) and coalescing of concurrent loads for the same key.
+    _refresh_pool = None
+    _refresh_pool_lock = threading.Lock()
+
+    def __init__(self, ttl, stale_ttl=0, maxsize=256):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._inflight = {}
+        self._ainflight = {}
+        self._tasks = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.refresh_errors = 0
+
+    @classmethod
+    def _refresher(cls):
+        with cls._refresh_pool_lock:
+            if cls._refresh_pool is None:
+                cls._refresh_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='cache-refresh')
+            return cls._refresh_pool
+
+    def get_or_load(self, key, loader):
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return loader()
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                age = now - stored_at
+                if age < self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                if age < self.ttl + self.stale_ttl:
+                    self._data.move_to_end(key)
+                    self.stale_hits += 1
+                    if key not in self._inflight:
+                        pending = Future()
+                        self._inflight[key] = pending
+                        self._refresher().submit(self._load, key, loader, pending)
+                    return value
+
+            pending = self._inflight.get(key)
+            if pending is None:
+                pending = Future()
+                self._inflight[key] = pending
+                self.misses += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if leader:
+            self._load(key, loader, pending)
+        return pending.result()
+
+    def _load(self, key, loader, pending):
+        try:
+            value = loader()
+        except Exception as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+                self.refresh_errors += 1
+            pending.set_exception(e)
+            return
+        with self._lock:
+            self._store(key, value, time.monotonic())
+            self._inflight.pop(key, None)
+        pending.set_result(value)
+
+    async def aget_or_load(self, key, loader):
+        # Event-loop variant of get_or_load; `loader` is a coroutine function
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return await loader()
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                age = now - stored_at
+                if age < self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                if age < self.ttl + self.stale_ttl:
+                    self._data.move_to_end(key)
+                    self.stale_hits += 1
+                    if key not in self._ainflight:
+                        self._spawn_aload(key, loader)
+                    return value
+
+            pending = self._ainflight.get(key)
+            if pending is None:
+                pending = self._spawn_aload(key, loader)
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        # The load runs as its own task so a cancelled caller cannot strand waiters
+        return await asyncio.shield(pending)
+
+    def _spawn_aload(self, key, loader):
+        pending = asyncio.get_running_loop().create_future()
+        self._ainflight[key] = pending
+        task = asyncio.ensure_future(self._aload(key, loader, pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return pending
+
+    async def _aload(self, key, loader, pending):
+        try:
+            value = await loader()
+        except Exception as e:
+            with self._lock:
+                self._ainflight.pop(key, None)
+                self.refresh_errors += 1
+            pending.set_exception(e)
+            # Mark retrieved so background refresh failures are not logged as unhandled
+            pending.exception()
+            return
+        with self._lock:
+            self._store(key, value, time.monotonic())
+            self._ainflight.pop(key, None)
+        pending.set_result(value)
+
+    def _store(self, key, value, stored_at):
+        self._data[key] = (value, stored_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def set(self, key, value, age=0.0):
+        # `age` backdates the entry, e.g. for values restored from disk
+        with self._lock:
+            self._store(key, value, time.monotonic() - age)
+
+    def peek(self, key):
+        # (value, age in seconds) or None, without counting a lookup or
+        # touching the LRU order
+        with self._lock:
+            entry = self._data.get(key)
+        if entry is None:
+            return None
+        return entry[0], time.monotonic() - entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses + self.coalesced
+            return {
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+                'refresh_errors': self.refresh_errors,
+                'hit_ratio': round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'stale_ttl': self.stale_ttl
+            }
+
+
+def normalize_query(text):
+    # Case-fold and drop punctuation/symbols while keeping combining marks, so
+    # Devanagari vowel signs survive ("गेहूं के लिए खाद?" -> "गेहूं के लिए खाद")
+    text = unicodedata.normalize('NFKC', text or '').casefold()
+    text = ''.join(' ' if unicodedata.category(ch)[0] in 'PS' else ch for ch in text)
+    return ' '.join(text.split())
+
+
+# Words that flip the meaning of an otherwise similar question. "t" is what
+# normalize_query leaves of "don't", "can't" and the like.
+NEGATIONS = frozenset({
+    'no', 'not', 'never', 'without', 'nor', 't', 'cannot', 'dont', 'cant',
+    'नहीं', 'नही', 'न', 'ना', 'मत', 'बिना',
+    'नाही', 'नको', 'नये', 'शिवाय'
+})
+
+
+def content_tokens(norm, terms):
+    # Words a fuzzy match must share exactly: numbers, negations and the
+    # domain terms (crops, diseases) passed in
+    return frozenset(
+        token for token in norm.split()
+        if token in NEGATIONS or token in terms or any(ch.isdigit() for ch in token)
+    )
+
+
+def char_ngrams(text, n=3):
+    padded = f" {text} "
+    return Counter(padded[i:i + n] for i in range(max(1, len(padded) - n + 1)))
+
+
+class QueryCache:
+    # Answers keyed on (language, normalized query). Misses fall back to a
+    # per-language character-trigram TF-IDF index so rephrasings such as
+    # "fertilizer for wheat?" / "what fertilizer for wheat" share one entry.
+    # Trigram similarity alone cannot tell "spray on tomato" from "spray on
+    # potato" or "do not spray", so a fuzzy match must also have exactly the
+    # same content tokens (see content_tokens). Fuzzy matching is opt-in.
+    MAX_CANDIDATES = 32
+
+    def __init__(self, ttl, maxsize=2048, threshold=0.95, fuzzy=False, terms=()):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.fuzzy = fuzzy
+        # Lower-case crop and disease words; may be extended after start-up
+        self.terms = set(terms)
+        self._entries = OrderedDict()
+        self._postings = defaultdict(lambda: defaultdict(set))
+        self._df = defaultdict(Counter)
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, language, query):
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return None
+        norm = normalize_query(query)
+        now = time.monotonic()
+        with self._lock:
+            key = (language, norm)
+            entry = self._entries.get(key)
+            if entry is not None and self._fresh(key, entry, now):
+                self.exact_hits += 1
+                return self._touch(key, entry)
+
+            if self.fuzzy and norm:
+                key, score = self._nearest(language, norm, content_tokens(norm, self.terms))
+                if key is not None and score >= self.threshold:
+                    entry = self._entries[key]
+                    if self._fresh(key, entry, now):
+                        self.fuzzy_hits += 1
+                        return self._touch(key, entry)
+
+            self.misses += 1
+            return None
+
+    def put(self, language, query, value):
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        norm = normalize_query(query)
+        if not norm:
+            return
+        key = (language, norm)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            grams = char_ngrams(norm)
+            self._entries[key] = {
+                'value': value, 'stored_at': time.monotonic(), 'grams': grams,
+                'content': content_tokens(norm, self.terms), 'hits': 0
+            }
+            for gram in grams:
+                self._postings[language][gram].add(key)
+                self._df[language][gram] += 1
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _touch(self, key, entry):
+        self._entries.move_to_end(key)
+        entry['hits'] += 1
+        return entry['value']
+
+    def _fresh(self, key, entry, now):
+        if now - entry['stored_at'] < self.ttl:
+            return True
+        self._remove(key)
+        return False
+
+    def _remove(self, key):
+        language = key[0]
+        entry = self._entries.pop(key)
+        for gram in entry['grams']:
+            keys = self._postings[language][gram]
+            keys.discard(key)
+            if not keys:
+                del self._postings[language][gram]
+            self._df[language][gram] -= 1
+            if self._df[language][gram] <= 0:
+                del self._df[language][gram]
+
+    def _nearest(self, language, norm, content):
+        postings = self._postings.get(language)
+        if not postings:
+            return None, 0.0
+        df = self._df[language]
+        total = len(self._entries) + 1
+
+        def idf(gram):
+            return math.log(total / (1 + df.get(gram, 0))) + 1.0
+
+        query = {gram: count * idf(gram) for gram, count in char_ngrams(norm).items()}
+        query_norm = math.sqrt(sum(w * w for w in query.values()))
+
+        # Shortlist by shared trigrams before scoring full cosine similarity
+        overlap = Counter()
+        for gram in query:
+            for key in postings.get(gram, ()):
+                overlap[key] += 1
+
+        best_key, best_score = None, 0.0
+        for key, _ in overlap.most_common(self.MAX_CANDIDATES):
+            if self._entries[key]['content'] != content:
+                continue
+            grams = self._entries[key]['grams']
+            weights = {gram: count * idf(gram) for gram, count in grams.items()}
+            dot = sum(w * weights.get(gram, 0.0) for gram, w in query.items())
+            score = dot / (query_norm * math.sqrt(sum(w * w for w in weights.values())))
+            if score > best_score:
+                best_key, best_score = key, score
+        return best_key, best_score
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._postings.clear()
+            self._df.clear()
+
+    def entries(self, limit=100):
+        now = time.monotonic()
+        with self._lock:
+            recent = list(self._entries.items())[-limit:]
+        return [
+            {
+                'language': language,
+                'query': norm,
+                'hits': entry['hits'],
+                'age_seconds': round(now - entry['stored_at'], 1)
+            }
+            for (language, norm), entry in reversed(recent)
+        ]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.exact_hits + self.fuzzy_hits + self.misses
+            return {
+                'exact_hits': self.exact_hits,
+                'fuzzy_hits': self.fuzzy_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round((self.exact_hits + self.fuzzy_hits) / lookups, 4) if lookups else 0.0,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'threshold': self.threshold,
+                'fuzzy': self.fuzzy
+            }
+
+
+class ImageHashCache:
+    # Results keyed on a 64-bit perceptual hash plus a colour signature. Lookups
+    # match near-duplicates within `max_distance` differing hash bits: the hash
+    # is split into max_distance + 1 bands, and any hash that close must agree
+    # exactly on at least one band, so only entries sharing a band are compared.
+    # An exact-bytes digest index in front skips decoding entirely for
+    # byte-identical re-uploads.
+    HASH_BITS = 64
+
+    def __init__(self, maxsize=4096, max_distance=4, colour_tolerance=16, path=None,
+                 fingerprint=None, save_interval=60):
+        self.maxsize = maxsize
+        self.max_distance = max_distance
+        self.colour_tolerance = colour_tolerance
+        self.path = path
+        self.fingerprint = fingerprint
+        self.save_interval = save_interval
+        self._entries = OrderedDict()
+        self._digests = OrderedDict()
+        bands = max_distance + 1
+        edges = [round(i * self.HASH_BITS / bands) for i in range(bands + 1)]
+        self._bands = [(lo, (1 << (hi - lo)) - 1) for lo, hi in zip(edges, edges[1:])]
+        self._index = [defaultdict(set) for _ in self._bands]
+        self._lock = threading.Lock()
+        self._saved_at = time.monotonic()
+        self._dirty = False
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if path:
+            self.load()
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0
+
+    def get_digest(self, digest):
+        with self._lock:
+            phash = self._digests.get(digest)
+            entry = self._entries.get(phash) if phash is not None else None
+            if entry is None:
+                return None
+            self._digests.move_to_end(digest)
+            self._entries.move_to_end(phash)
+            self.exact_hits += 1
+            return entry['value']
+
+    def get(self, phash, colour, digest=None):
+        with self._lock:
+            best, best_distance = None, self.max_distance + 1
+            for key in self._candidates(phash):
+                distance = bin(key ^ phash).count('1')
+                if distance < best_distance and self._colour_close(self._entries[key]['colour'], colour):
+                    best, best_distance = key, distance
+            if best is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best)
+            if digest is not None:
+                self._remember_digest(digest, best)
+            self.near_hits += 1
+            return self._entries[best]['value']
+
+    def put(self, phash, colour, value, digest=None):
+        if not self.enabled:
+            return
+        with self._lock:
+            if phash in self._entries:
+                self._remove(phash)
+            self._entries[phash] = {'colour': list(colour), 'value': value}
+            for band, (shift, mask) in zip(self._index, self._bands):
+                band[(phash >> shift) & mask].add(phash)
+            if digest is not None:
+                self._remember_digest(digest, phash)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            self._dirty = True
+            due = self.path and time.monotonic() - self._saved_at >= self.save_interval
+            if due:
+                self._saved_at = time.monotonic()
+        if due:
+            TTLCache._refresher().submit(self.save)
+
+    def _candidates(self, phash):
+        keys = set()
+        for band, (shift, mask) in zip(self._index, self._bands):
+            keys |= band.get((phash >> shift) & mask, set())
+        return keys
+
+    def _colour_close(self, a, b):
+        return max(abs(x - y) for x, y in zip(a, b)) <= self.colour_tolerance
+
+    def _remember_digest(self, digest, phash):
+        self._digests[digest] = phash
+        self._digests.move_to_end(digest)
+        while len(self._digests) > self.maxsize:
+            self._digests.popitem(last=False)
+
+    def _remove(self, phash):
+        del self._entries[phash]
+        for band, (shift, mask) in zip(self._index, self._bands):
+            value = (phash >> shift) & mask
+            band[value].discard(phash)
+            if not band[value]:
+                del band[value]
+
+    def load(self):
+        # Entries from a different model (fingerprint mismatch) are discarded
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if snapshot.get('fingerprint') != self.fingerprint:
+            return 0
+        for item in snapshot.get('entries', [])[-self.maxsize:]:
+            self.put(int(item['hash'], 16), item['colour'], item['value'])
+        with self._lock:
+            self._dirty = False
+            return len(self._entries)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = {
+                'fingerprint': self.fingerprint,
+                'entries': [
+                    {'hash': f'{phash:016x}', 'colour': entry['colour'], 'value': entry['value']}
+                    for phash, entry in self._entries.items()
+                ]
+            }
+            self._dirty = False
+        # Written beside the target and renamed, so a crash never leaves half a file
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._digests.clear()
+            for band in self._index:
+                band.clear()
+            self._dirty = True
+
+    def stats(self):
+        with self._lock:
+            lookups = self.exact_hits + self.near_hits + self.misses
+            return {
+                'exact_hits': self.exact_hits,
+                'near_hits': self.near_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round((self.exact_hits + self.near_hits) / lookups, 4) if lookups else 0.0,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'max_distance': self.max_distance,
+                'persistent': bool(self.path)
+            }
@@ -0,0 +1,106 @@
+# ==================== SOILSYNC CROP SUITABILITY ENGINE ====================
+# Every candidate crop is scored against soil type, climate, water
+# availability and season as a weighted sum of per-factor suitability scores
+# (the "suitability" section of data/rules.json). Because each factor takes a
+# handful of values, the weighted sum is precomputed for every combination at
+# startup: scoring a farm profile is one row lookup, and scoring thousands is
+# one fancy-indexing gather. A forecast mean temperature, when available, is
+# blended in per crop against its optimal temperature band.
+
+from itertools import repeat
+
+import numpy as np
+
+
+class SuitabilityModel:
+    FACTORS = ('soil_type', 'climate', 'water_availability', 'season')
+
+    def __init__(self, table):
+        self.crops = tuple(table['crops'])
+        self.values = {}
+        self.factor_scores = {}
+        weights = []
+        for factor in self.FACTORS:
+            spec = table['factors'][factor]
+            self.values[factor] = {value: i for i, value in enumerate(spec['values'])}
+            scores = np.array([spec['scores'][crop] for crop in self.crops], dtype=np.float64)
+            # Trailing column: an unknown or missing value scores each crop at
+            # its mean for that factor, so it neither helps nor rules out
+            self.factor_scores[factor] = np.hstack([scores, scores.mean(axis=1, keepdims=True)])
+            weights.append(float(spec['weight']))
+        self.weights = np.array(weights) / sum(weights)
+
+        # table[combination, crop] for every (soil, climate, water, season) combination
+        self.shape = tuple(len(self.values[factor]) + 1 for factor in self.FACTORS)
+        combined = np.zeros(self.shape + (len(self.crops),))
+        for axis, (factor, weight) in enumerate(zip(self.FACTORS, self.weights)):
+            view = [1] * len(self.FACTORS) + [len(self.crops)]
+            view[axis] = self.shape[axis]
+            combined += weight * self.factor_scores[factor].T.reshape(view)
+        self.table = combined.reshape(-1, len(self.crops))
+
+        temperature = table['temperature']
+        self.temperature_weight = float(temperature['weight'])
+        self.temperature_tolerance = float(temperature['tolerance_c'])
+        band = np.array([temperature['optimal_c'][crop] for crop in self.crops], dtype=np.float64)
+        self.temperature_low, self.temperature_high = band[:, 0], band[:, 1]
+
+    def codes(self, columns):
+        # columns: factor -> list of values, one per profile
+        return {
+            factor: np.fromiter(
+                map(self.values[factor].get, columns[factor], repeat(len(self.values[factor]))),
+                dtype=np.intp, count=len(columns[factor])
+            )
+            for factor in self.FACTORS
+        }
+
+    def score_one(self, profile, temperature=None):
+        # Single-profile path: the combination index is computed directly and
+        # the precomputed row is returned (a view unless temperature is blended)
+        index = 0
+        for factor, size in zip(self.FACTORS, self.shape):
+            index = index * size + self.values[factor].get(profile.get(factor), size - 1)
+        row = self.table[index]
+        if temperature is not None:
+            row = (1 - self.temperature_weight) * row + \
+                self.temperature_weight * self.temperature_scores([temperature])[0]
+        return row
+
+    def rank_one(self, row, k):
+        return np.argsort(-row, kind='stable')[:k].tolist()
+
+    def score(self, columns, temperatures=None):
+        # (profiles, crops) suitability in [0, 1]
+        codes = self.codes(columns)
+        scores = self.table[np.ravel_multi_index(tuple(codes[factor] for factor in self.FACTORS), self.shape)]
+        if temperatures is not None:
+            temperatures = np.asarray(temperatures, dtype=np.float64)
+            known = ~np.isnan(temperatures)
+            if known.any():
+                blended = (1 - self.temperature_weight) * scores[known] + \
+                    self.temperature_weight * self.temperature_scores(temperatures[known])
+                scores[known] = blended
+        return scores
+
+    def temperature_scores(self, temperatures):
+        # 1 inside a crop's optimal band, falling linearly to 0 at `tolerance` outside it
+        temperatures = np.asarray(temperatures, dtype=np.float64)[:, None]
+        distance = np.maximum(np.maximum(self.temperature_low - temperatures, temperatures - self.temperature_high), 0)
+        return np.clip(1 - distance / self.temperature_tolerance, 0, 1)
+
+    def top_k(self, scores, k):
+        k = min(k, len(self.crops))
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1, kind='stable')
+        return np.take_along_axis(candidates, order, axis=1)
+
+    def factor_breakdown(self, crop_index, profile):
+        # Unweighted per-factor score of one crop for one profile, for explanations
+        return {
+            factor: round(float(self.factor_scores[factor][crop_index, values.get(profile.get(factor), len(values))]), 2)
+            for factor, values in self.values.items()
+        }
+
+    def known(self, profile):
+        return [factor for factor in self.FACTORS if profile.get(factor) in self.values[factor]]
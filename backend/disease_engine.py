@@ -0,0 +1,363 @@
+# ==================== SOILSYNC DISEASE INFERENCE ENGINE ====================
+# CPU-only pipeline: decode -> downscale -> colour/texture features -> compact
+# linear softmax classifier. Classifier weights live in a JSON model file that
+# is loaded once at startup, so retrained weights can be dropped in without
+# code changes.
+
+import atexit
+import base64
+import binascii
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from multiprocessing import shared_memory
+
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+
+
+# Pillow only warns about images between MAX_IMAGE_PIXELS and twice that,
+# then decodes them at full size; treat those as the bombs they are
+warnings.filterwarnings('error', category=Image.DecompressionBombWarning)
+
+
+class ImageDecodeError(ValueError):
+    pass
+
+
+def decode_image(image_data, size, max_pixels=None):
+    # Accepts raw bytes, a seekable file object (multipart upload) or a base64
+    # string / data URL (the original js/disease.js format). Images that would
+    # decode to more than max_pixels are refused before any pixel is read.
+    if hasattr(image_data, 'read'):
+        source = image_data
+    else:
+        if isinstance(image_data, str):
+            if image_data.startswith('data:'):
+                image_data = image_data.split(',', 1)[-1]
+            try:
+                image_data = base64.b64decode(image_data, validate=False)
+            except (binascii.Error, ValueError):
+                raise ImageDecodeError('Image is not valid base64')
+        if not image_data:
+            raise ImageDecodeError('No image data provided')
+        source = BytesIO(image_data)
+
+    try:
+        # open() only reads the header; nothing is decoded until convert()
+        image = Image.open(source)
+        # Checked here as well, since the warning filter above can be reset
+        # (warnings.catch_warnings), leaving only a warning
+        width, height = image.size
+        if Image.MAX_IMAGE_PIXELS and width * height > Image.MAX_IMAGE_PIXELS:
+            raise Image.DecompressionBombError(f'Image size ({width * height} pixels) exceeds limit of {Image.MAX_IMAGE_PIXELS} pixels')
+        # JPEG can downscale during decode, which avoids materialising a full-size bitmap
+        image.draft('RGB', (size * 2, size * 2))
+        width, height = image.size
+        if max_pixels and width * height > max_pixels:
+            raise ImageDecodeError(f'Image is {width}x{height} pixels; at most {max_pixels} can be decoded')
+        image = image.convert('RGB').resize((size, size), Image.BILINEAR)
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning) as e:
+        raise ImageDecodeError(f'Image is too large to decode: {e}')
+    except (UnidentifiedImageError, OSError) as e:
+        raise ImageDecodeError(f'Could not decode image: {e}')
+    return np.asarray(image, dtype=np.uint8)
+
+
+def image_fingerprint(pixels, hash_size=8):
+    # 64-bit difference hash of the brightness layout plus a coarse colour
+    # signature (mean RGB per quadrant). dHash alone ignores hue, so a rusty and
+    # a healthy leaf with the same outline would otherwise look identical.
+    image = Image.fromarray(pixels)
+    gray = np.asarray(image.convert('L').resize((hash_size + 1, hash_size), Image.BOX), dtype=np.int16)
+    bits = np.packbits(np.diff(gray, axis=1) > 0)
+    quadrants = np.asarray(image.resize((2, 2), Image.BOX), dtype=np.uint8)
+    return int.from_bytes(bits.tobytes(), 'big'), tuple(int(v) for v in quadrants.ravel())
+
+
+class DiseaseInferenceEngine:
+    def __init__(self, model_path, max_pixels=None):
+        self.max_pixels = max_pixels
+        with open(model_path, encoding='utf-8') as f:
+            model = json.load(f)
+        self.classes = model['classes']
+        self.feature_names = model['features']
+        self.input_size = model['input_size']
+        self.weights = np.asarray(model['weights'], dtype=np.float32)
+        self.bias = np.asarray(model['bias'], dtype=np.float32)
+        self.temperature = float(model.get('temperature', 1.0))
+        if self.weights.shape != (len(self.classes), len(self.feature_names)):
+            raise ValueError(f'Model weights shape {self.weights.shape} does not match classes/features')
+
+    def preprocess(self, image_data):
+        return decode_image(image_data, self.input_size, self.max_pixels)
+
+    def features(self, batch):
+        # batch: (B, H, W, 3) uint8 -> (B, F) float32, one row per image
+        rgb = batch.astype(np.float32) / 255.0
+        r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+        value = rgb.max(axis=-1)
+        delta = value - rgb.min(axis=-1)
+        saturation = np.where(value > 0, delta / np.maximum(value, 1e-6), 0.0)
+
+        safe = np.maximum(delta, 1e-6)
+        hue = np.where(value == r, ((g - b) / safe) % 6.0,
+              np.where(value == g, (b - r) / safe + 2.0, (r - g) / safe + 4.0)) * 60.0
+        hue = np.where(delta > 0, hue, 0.0)
+
+        coloured = saturation > 0.25
+        masks = [
+            coloured & (hue >= 70) & (hue < 170) & (value > 0.2),                       # green tissue
+            coloured & (hue >= 5) & (hue < 45) & (value > 0.15) & (value <= 0.6),       # brown lesions
+            (saturation > 0.5) & (hue >= 10) & (hue < 45) & (value > 0.6),              # orange pustules
+            coloured & (hue >= 45) & (hue < 70) & (value > 0.5),                        # yellowing
+            (saturation < 0.15) & (value > 0.75),                                       # white powder
+            value < 0.15                                                                # necrotic / dark
+        ]
+        fractions = [mask.mean(axis=(1, 2)) for mask in masks]
+
+        # Mean absolute horizontal + vertical gradient of brightness as a texture cue
+        texture = (np.abs(np.diff(value, axis=1)).mean(axis=(1, 2)) +
+                   np.abs(np.diff(value, axis=2)).mean(axis=(1, 2)))
+
+        return np.stack(fractions + [
+            saturation.mean(axis=(1, 2)),
+            value.mean(axis=(1, 2)),
+            texture
+        ], axis=1).astype(np.float32)
+
+    def predict_batch(self, batch):
+        batch = np.asarray(batch)
+        if batch.ndim == 3:
+            batch = batch[None]
+        logits = self.features(batch) @ self.weights.T + self.bias
+        logits /= self.temperature
+        logits -= logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=1, keepdims=True)
+
+        results = []
+        for row in probs:
+            best = int(row.argmax())
+            results.append({
+                'disease': self.classes[best],
+                'confidence': round(float(row[best]) * 100, 1),
+                'probabilities': {name: round(float(p), 4) for name, p in zip(self.classes, row)}
+            })
+        return results
+
+
+# ==================== PROCESS POOL OFFLOAD ====================
+# Decode, preprocessing and classification run in worker processes so they do
+# not hold the GIL of the web worker. Pixel arrays never cross the process
+# boundary: workers write them into fixed-size slots of one shared-memory slab
+# and the parent only passes slot numbers around.
+#
+# A worker that dies (OOM killer, segfault in a decoder) breaks the whole
+# executor. The pool then replaces it and retries the calls once; if the
+# replacement breaks as well, the parent does the work itself for a cool-down
+# period before trying worker processes again.
+
+_worker = {}
+
+
+def _attach(state, model_path, shm, slots, max_pixels=None):
+    engine = DiseaseInferenceEngine(model_path, max_pixels)
+    state['engine'] = engine
+    state['shm'] = shm
+    state['pixels'] = np.ndarray(
+        (slots, engine.input_size, engine.input_size, 3), dtype=np.uint8, buffer=shm.buf
+    )
+
+
+def _init_worker(model_path, shm_name, slots, max_pixels=None):
+    _attach(_worker, model_path, shared_memory.SharedMemory(name=shm_name), slots, max_pixels)
+
+
+def _warm_up(_):
+    return os.getpid()
+
+
+# `state` is only passed for in-process fallback calls in the parent
+def _decode_into_slot(image_data, slot, state=_worker):
+    engine = state['engine']
+    pixels = engine.preprocess(image_data)
+    state['pixels'][slot] = pixels
+    return slot, image_fingerprint(pixels)
+
+
+def _classify_slots(slots, state=_worker):
+    return state['engine'].predict_batch(state['pixels'][slots])
+
+
+class InferencePool:
+    def __init__(self, model_path, size, slots, cooldown=30.0, max_pixels=None):
+        self.model_path = model_path
+        self.size = size
+        self.slots = slots
+        self.cooldown = cooldown
+        self.max_pixels = max_pixels
+        self._pid = None
+        self._lock = threading.Lock()
+        self._local = {}
+        self._in_process_until = 0.0
+        self.restarts = 0
+        self.in_process_calls = 0
+
+    def _ensure(self):
+        # Built per process, so forked web workers never share a parent's pool
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            input_size = DiseaseInferenceEngine(self.model_path).input_size
+            self.shm = shared_memory.SharedMemory(create=True, size=self.slots * input_size * input_size * 3)
+            self.free = queue.Queue()
+            for slot in range(self.slots):
+                self.free.put(slot)
+            self._local = {}
+            self.executor = self._new_executor()
+            atexit.register(self.close)
+            self._pid = os.getpid()
+
+    def _new_executor(self):
+        # Not fork: the web process already runs threads (health, prewarm,
+        # batcher) whose locks a forked child could inherit held. A fork
+        # server that has only imported this module starts workers quickly
+        # without re-importing the web app.
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('forkserver')
+            context.set_forkserver_preload([__name__])
+        else:
+            context = multiprocessing.get_context('spawn')
+        return ProcessPoolExecutor(
+            max_workers=self.size,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.model_path, self.shm.name, self.slots, self.max_pixels)
+        )
+
+    def _replace(self, broken):
+        # Once per broken executor, however many requests noticed it
+        with self._lock:
+            if self.executor is not broken:
+                return False
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.executor = self._new_executor()
+            self.restarts += 1
+            return True
+
+    def _call_all(self, fn, calls):
+        # (error, result) per call, run on the worker processes; see the
+        # comment above _worker for what happens when one dies
+        if time.monotonic() >= self._in_process_until:
+            for attempt in range(2):
+                executor = self.executor
+                futures = []
+                try:
+                    for args in calls:
+                        futures.append(executor.submit(fn, *args))
+                except BrokenProcessPool:
+                    pass
+                wait(futures)
+                if len(futures) == len(calls) and not any(
+                    future.cancelled() or isinstance(future.exception(), BrokenProcessPool) for future in futures
+                ):
+                    return [(future.exception(), None if future.exception() else future.result()) for future in futures]
+                self._replace(executor)
+            self._in_process_until = time.monotonic() + self.cooldown
+
+        with self._lock:
+            if not self._local:
+                _attach(self._local, self.model_path, self.shm, self.slots, self.max_pixels)
+        outcomes = []
+        for args in calls:
+            self.in_process_calls += 1
+            try:
+                outcomes.append((None, fn(*args, state=self._local)))
+            except Exception as e:
+                outcomes.append((e, None))
+        return outcomes
+
+    def warm_up(self):
+        # Starts every worker and loads the model before the first request arrives
+        self._ensure()
+        return sorted(set(self.executor.map(_warm_up, range(self.size * 2))))
+
+    def preprocess_many(self, images, timeout=None):
+        # Returns a (slot, fingerprint) pair per image, or the ImageDecodeError
+        # raised for it. Slots stay reserved until classify() or release() hands
+        # them back.
+        self._ensure()
+        slots = []
+        try:
+            for _ in images:
+                slots.append(self.free.get(timeout=timeout))
+        except queue.Empty:
+            self.release(slots)
+            raise TimeoutError('No free preprocessing slots')
+
+        try:
+            # A spooled upload cannot be pickled, so workers are sent its bytes
+            images = [image.read() if hasattr(image, 'read') else image for image in images]
+            outcomes = self._call_all(_decode_into_slot, list(zip(images, slots)))
+        except BaseException:
+            self.release(slots)
+            raise
+        results = []
+        failure = None
+        for slot, (error, result) in zip(slots, outcomes):
+            if error is None:
+                results.append(result)
+                continue
+            self.release([slot])
+            if isinstance(error, ImageDecodeError):
+                results.append(error)
+            else:
+                failure = failure or error
+        if failure is not None:
+            self.release([r[0] for r in results if not isinstance(r, ImageDecodeError)])
+            raise failure
+        return results
+
+    def classify(self, slots):
+        try:
+            [(error, result)] = self._call_all(_classify_slots, [(list(slots),)])
+        finally:
+            self.release(slots)
+        if error is not None:
+            raise error
+        return result
+
+    def release(self, slots):
+        for slot in slots:
+            self.free.put(slot)
+
+    def stats(self):
+        if self._pid != os.getpid():
+            return {'started': False, 'size': self.size}
+        return {
+            'started': True,
+            'size': self.size,
+            'free_slots': self.free.qsize(),
+            'slots': self.slots,
+            'restarts': self.restarts,
+            'in_process_calls': self.in_process_calls,
+            'in_process_for_seconds': round(max(0.0, self._in_process_until - time.monotonic()), 1)
+        }
+
+    def close(self):
+        if self._pid != os.getpid():
+            return
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.shm.close()
+        self.shm.unlink()
+        self._pid = None
@@ -0,0 +1,190 @@
+# ==================== SOILSYNC FERTILIZER DOSAGE ENGINE ====================
+# Nutrient doses are computed with NumPy over arrays of plots:
+#   kg/ha = crop requirement x growth-stage share x soil factor
+#   kg    = kg/ha x area
+# and turned into fertilizer product quantities (DAP, MOP, Urea, ...). All
+# coefficients come from the "dosage" section of data/rules.json.
+
+from itertools import repeat
+
+import numpy as np
+
+
+def to_float_array(values):
+    # Plot areas arrive from JSON or CSV; anything non-numeric becomes NaN
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        converted = []
+        for value in values:
+            try:
+                converted.append(float(value))
+            except (TypeError, ValueError):
+                converted.append(np.nan)
+        return np.asarray(converted, dtype=np.float64)
+
+
+def csv_field(value):
+    # RFC 4180 quoting for the free-text columns (plot id, error); numbers
+    # never need it
+    value = str(value)
+    if any(ch in value for ch in ',"\r\n'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+class DosageModel:
+    def __init__(self, table):
+        self.nutrients = tuple(table['nutrients'])
+        self.crops, self.crop_kg_ha = self._matrix(table['crop_kg_ha'])
+        self.stages, self.stage_share = self._matrix(table['stage_share'])
+        self.soils, self.soil_factor = self._matrix(table['soil_factor'])
+        self.area_units = dict(table['area_units'])
+
+        # Products are applied in order: each covers what remains of the
+        # nutrient it `supplies`, and also counts towards its other nutrients
+        self.products = tuple(product['name'] for product in table['products'])
+        self.product_supplies = np.array(
+            [self.nutrients.index(product['supplies']) for product in table['products']], dtype=np.intp
+        )
+        self.product_content = np.array(
+            [[product['content'].get(nutrient, 0.0) for nutrient in self.nutrients] for product in table['products']],
+            dtype=np.float64
+        )
+
+    def _matrix(self, rows):
+        names = {name: i for i, name in enumerate(rows)}
+        values = np.array([rows[name] for name in names], dtype=np.float64).reshape(len(names), len(self.nutrients))
+        # An extra all-NaN row at index -1 absorbs unknown names
+        return names, np.vstack([values, np.full((1, len(self.nutrients)), np.nan)])
+
+    @staticmethod
+    def _codes(index, values):
+        return np.fromiter(map(index.get, values, repeat(-1)), dtype=np.intp, count=len(values))
+
+    def compute(self, crops, soils, stages, areas, area_unit='ha'):
+        # Returns per-plot arrays plus a validity mask; invalid plots carry an
+        # error string and NaN quantities
+        count = len(crops)
+        crop_codes = self._codes(self.crops, crops)
+        soil_codes = self._codes(self.soils, soils)
+        stage_codes = self._codes(self.stages, stages)
+        area_ha = to_float_array(areas) * self.area_units[area_unit]
+
+        kg_ha = self.crop_kg_ha[crop_codes] * self.stage_share[stage_codes] * self.soil_factor[soil_codes]
+        valid = ~np.isnan(kg_ha).any(axis=1) & np.isfinite(area_ha) & (area_ha >= 0)
+        nutrients_kg = kg_ha * area_ha[:, None]
+
+        remaining = np.where(valid[:, None], nutrients_kg, 0.0)
+        products_kg = np.zeros((count, len(self.products)))
+        for i, (supplies, content) in enumerate(zip(self.product_supplies, self.product_content)):
+            quantity = remaining[:, supplies] / content[supplies]
+            products_kg[:, i] = quantity
+            remaining = np.maximum(remaining - quantity[:, None] * content, 0.0)
+        products_kg[~valid] = np.nan
+
+        # Only invalid plots are visited one by one
+        errors = {}
+        for i in np.flatnonzero(~valid).tolist():
+            if crop_codes[i] < 0:
+                errors[i] = 'Unknown crop'
+            elif soil_codes[i] < 0:
+                errors[i] = 'Unknown soil_type'
+            elif stage_codes[i] < 0:
+                errors[i] = 'Unknown growth_stage'
+            else:
+                errors[i] = 'Invalid area'
+
+        return {
+            'valid': valid,
+            'errors': errors,
+            'area_ha': area_ha,
+            'kg_ha': kg_ha,
+            'nutrients_kg': nutrients_kg,
+            'products_kg': products_kg,
+            'crop_codes': crop_codes
+        }
+
+    def schedule_text(self, crop, soil_type, growth_stage, note):
+        # The schedule line shown next to a dosage: product quantities per ha
+        # come from the model itself, the schedule table only adds the how
+        # and when, so the two can never disagree
+        result = self.compute([crop], [soil_type], [growth_stage], [1.0])
+        if not result['valid'][0]:
+            return note
+        amounts = [
+            f'{quantity:.1f} kg/ha {name}'
+            for name, quantity in zip(self.products, result['products_kg'][0].tolist())
+            if quantity >= 0.05
+        ]
+        return f"Apply {' + '.join(amounts)}. {note}" if amounts else note
+
+    def totals(self, result):
+        valid = result['valid']
+        codes = result['crop_codes'][valid]
+        area_ha = result['area_ha'][valid]
+        quantities = np.hstack([result['nutrients_kg'], result['products_kg']])[valid]
+
+        # Per-crop sums in one pass per column
+        size = len(self.crops)
+        plots = np.bincount(codes, minlength=size)
+        crop_area = np.bincount(codes, weights=area_ha, minlength=size)
+        crop_sums = np.stack([np.bincount(codes, weights=column, minlength=size) for column in quantities.T], axis=1)
+
+        summary = self._summary(len(area_ha), area_ha.sum(), quantities.sum(axis=0))
+        summary['invalid_plots'] = int((~valid).sum())
+        summary['by_crop'] = {
+            name: self._summary(plots[i], crop_area[i], crop_sums[i])
+            for name, i in self.crops.items() if plots[i]
+        }
+        return summary
+
+    def _summary(self, plots, area_ha, sums):
+        sums = np.round(sums, 1).tolist()
+        split = len(self.nutrients)
+        return {
+            'plots': int(plots),
+            'area_ha': round(float(area_ha), 2),
+            'nutrients_kg': dict(zip(self.nutrients, sums[:split])),
+            'products_kg': dict(zip(self.products, sums[split:]))
+        }
+
+    def column_names(self):
+        return [f'{name}_kg' for name in self.nutrients + self.products]
+
+    def columns(self, result, ids):
+        # Per-plot results as parallel columns (the CSV layout), which
+        # serializes several times faster than one object per plot
+        quantities = np.round(np.hstack([result['nutrients_kg'], result['products_kg']]), 2)
+        quantities[~result['valid']] = 0.0
+        table = {'id': list(ids), 'area_ha': np.round(np.nan_to_num(result['area_ha']), 4).tolist()}
+        for name, column in zip(self.column_names(), quantities.T):
+            table[name] = column.tolist()
+        table['error'] = [None] * len(ids)
+        for i, error in result['errors'].items():
+            table['error'][i] = error
+        return table
+
+    def csv_chunks(self, result, ids, chunk_rows=4096):
+        # One line per plot followed by a TOTAL line, yielded a few thousand
+        # lines at a time; invalid plots keep their row with the error filled in
+        # Every row is built from the full column list: id, area_ha, one
+        # column per nutrient and product, error
+        names = self.column_names()
+        yield ','.join(['id', 'area_ha'] + names + ['error']) + '\n'
+        line = ','.join(['%s', '%.4f'] + ['%.2f'] * len(names) + [''])
+        empty = [''] * (1 + len(names))
+        quantities = np.hstack([result['area_ha'][:, None], result['nutrients_kg'], result['products_kg']]).tolist()
+        errors = result['errors']
+        for start in range(0, len(ids), chunk_rows):
+            lines = []
+            for i in range(start, min(start + chunk_rows, len(ids))):
+                plot_id = csv_field(ids[i])
+                if i in errors:
+                    lines.append(','.join([plot_id] + empty + [csv_field(errors[i])]))
+                else:
+                    lines.append(line % (plot_id, *quantities[i]))
+            yield '\n'.join(lines) + '\n'
+        totals = self.totals(result)
+        values = [totals['area_ha']] + list(totals['nutrients_kg'].values()) + list(totals['products_kg'].values())
+        yield ','.join(['TOTAL'] + [str(value) for value in values] + ['']) + '\n'
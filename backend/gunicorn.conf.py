@@ -0,0 +1,21 @@
+# ==================== GUNICORN SETTINGS ====================
+# Read automatically when gunicorn is started from backend/:
+#   gunicorn --preload -w 4 -b 0.0.0.0:5000 'app:create_app()'
+#
+# With --preload the app is imported and prepared once in the master and
+# forked into the workers. Background threads and process pools do not survive
+# a fork, so each worker starts its own health monitor here, as soon as it is
+# up, instead of on its first request. Weather pre-warming needs a snapshot
+# path to be shared between workers, and stays off without one.
+
+
+def post_worker_init(worker):
+    from app import health, weather_service
+    prewarmer = weather_service.prewarmer
+    if worker.cfg.workers > 1 and prewarmer.enabled and not prewarmer.snapshot_path:
+        # Without a shared snapshot every worker would refresh the same
+        # cities, each spending its own daily budget of OpenWeather calls
+        prewarmer.disable('WEATHER_SNAPSHOT_PATH is required with more than one worker')
+        worker.log.warning('Weather pre-warming is off: set WEATHER_SNAPSHOT_PATH to use it with %d workers',
+                           worker.cfg.workers)
+    health.start()
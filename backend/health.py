@@ -0,0 +1,184 @@
+# ==================== SOILSYNC HEALTH ====================
+# Liveness, readiness and upstream health without delaying startup. The
+# server starts accepting connections straight away; a background thread per
+# process then runs the warm-up steps (process pools, compiled models) and
+# afterwards looks at each upstream every `interval` seconds. Probes never run
+# on a request path, so /readyz and /healthz answer from memory.
+#
+# Upstream status comes from real traffic first: an upstream answered (or
+# failed) by user requests within the interval is reported from that, and is
+# not probed. Only upstreams without recent calls are probed, and only by one
+# process per host: the one holding a non-blocking lock on `lock_path`. Probes
+# can count against an API quota (OpenWeather's free tier is 1000 calls a
+# day), so they must not scale with the number of workers.
+#
+# Readiness means this process has finished warming up. Upstream status is
+# reported but does not make a process unready: every upstream-backed route
+# has fallback data, and taking all workers out of rotation because
+# OpenWeather is slow would turn a degraded service into an outage.
+
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def response_status(response):
+    # (status, detail) for an upstream probe response
+    if response.status_code < 300:
+        return 'ok', None
+    if response.status_code in (401, 403):
+        return 'unauthorized', f'HTTP {response.status_code}: check the API key'
+    return 'degraded', f'HTTP {response.status_code}'
+
+
+class HealthMonitor:
+    def __init__(self, interval=900, lock_path=None):
+        self.interval = interval
+        self.lock_path = lock_path
+        self._lock_file = None
+        self._lock_pid = None
+        self.started_at = time.time()
+        self._checks = {}
+        self._warm_ups = []
+        self._lock = threading.Lock()
+        self._pid = None
+        self._ready = threading.Event()
+        self.warm_up_results = {}
+        self.results = {}
+
+    def check(self, name, observed=None):
+        # Registers fn() -> (status, detail) as a periodic upstream probe; an
+        # exception counts as 'down'. observed(since) -> (status, detail, at)
+        # or None reports the upstream from real calls made since an epoch
+        # time, which spares the probe. Usable as a decorator.
+        def register(fn):
+            self._checks[name] = (fn, observed)
+            return fn
+        return register
+
+    def warm_up(self, name):
+        # Registers fn() as a warm-up step, run once per process in order
+        def register(fn):
+            self._warm_ups.append((name, fn))
+            return fn
+        return register
+
+    def start(self):
+        # Once per process: after a fork (gunicorn --preload) the parent's
+        # thread is gone and the child starts its own
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self.started_at = time.time()
+            self._ready.clear()
+            self.warm_up_results = {}
+            self.results = {}
+            threading.Thread(target=self._run, name='health-monitor', daemon=True).start()
+
+    def _run(self):
+        for name, fn in self._warm_ups:
+            started = time.perf_counter()
+            try:
+                fn()
+                result = {'status': 'ok'}
+            except Exception as e:
+                # The resource is loaded on first use instead
+                result = {'status': 'failed', 'error': str(e)}
+            result['seconds'] = round(time.perf_counter() - started, 3)
+            self.warm_up_results[name] = result
+        self._ready.set()
+
+        while True:
+            self.run_checks()
+            time.sleep(self.interval)
+
+    def run_checks(self):
+        since = time.time() - self.interval
+        for name, (fn, observed) in self._checks.items():
+            if observed is not None and observed(since) is not None:
+                continue
+            if not self.prober():
+                return
+            started = time.perf_counter()
+            try:
+                status, detail = fn()
+            except Exception as e:
+                status, detail = 'down', str(e)
+            self.results[name] = {
+                'status': status,
+                'detail': detail,
+                'source': 'probe',
+                'latency_ms': round((time.perf_counter() - started) * 1000, 1),
+                'checked_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+            }
+
+    def prober(self):
+        # True while this process runs the probes for the host. The lock is
+        # kept for the life of the process; when it exits another worker
+        # takes over at its next check.
+        if self.lock_path is None or fcntl is None:
+            return True
+        if self._lock_pid == os.getpid():
+            return True
+        lock_file = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file, self._lock_pid = lock_file, os.getpid()
+        return True
+
+    def upstreams(self):
+        # Latest evidence per upstream: real calls within the interval, else
+        # the last probe this process ran
+        since = time.time() - self.interval
+        results = {}
+        for name, (fn, observed) in self._checks.items():
+            seen = observed(since) if observed is not None else None
+            if seen is not None:
+                status, detail, at = seen
+                results[name] = {
+                    'status': status,
+                    'detail': detail,
+                    'source': 'traffic',
+                    'checked_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(at))
+                }
+            elif name in self.results:
+                results[name] = self.results[name]
+        return results
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def liveness(self):
+        return {
+            'status': 'ok',
+            'pid': os.getpid(),
+            'uptime_seconds': round(time.time() - self.started_at, 1)
+        }
+
+    def readiness(self):
+        return {
+            'status': 'ready' if self.ready else 'starting',
+            'pid': os.getpid(),
+            'warm_up': dict(self.warm_up_results),
+            'upstreams': self.upstreams()
+        }
+
+    def collect(self):
+        # Metrics collector (see metrics.Registry.collector)
+        yield 'soilsync_ready', 'gauge', '1 once this process has finished warming up', [({}, int(self.ready))]
+        yield 'soilsync_upstream_healthy', 'gauge', '1 while the latest call or probe to an upstream succeeded', [
+            ({'upstream': name}, int(result['status'] == 'ok')) for name, result in sorted(self.upstreams().items())
+        ]
+
@@ -0,0 +1,316 @@
+# ==================== SOILSYNC WEATHER PRE-WARMING ====================
+# Keeps current weather and forecasts for popular cities fresh in the response
+# caches, so user requests for them are answered from memory instead of
+# waiting on OpenWeather after every expiry. Cities come from a configured hot
+# list plus the top-N cities learned from traffic.
+#
+# A background thread wakes every `tick` seconds (more often for short TTLs)
+# and refreshes each entry that has passed `refresh_at` of its TTL or is
+# missing. Upstream calls are spaced at most `max_rate` per second, and an
+# entry costs one call per TTL, so the daily quota used is
+# cities x (86400 / current TTL + 86400 / forecast TTL), capped at
+# `daily_budget` calls per UTC day; once that is spent entries simply expire
+# and are loaded on demand, as without pre-warming.
+#
+# The refreshed entries are written to a JSON snapshot, which a restarted
+# process loads before it reports ready. With several gunicorn workers and a
+# snapshot path, one worker at a time (a non-blocking file lock) calls the
+# upstream; the others pick the fresh entries up from the snapshot instead of
+# repeating the calls. The calls made today travel in the snapshot too, so the
+# budget is shared. Without a snapshot path each worker would refresh, and
+# spend a budget, on its own, so gunicorn.conf.py turns pre-warming off there.
+
+import atexit
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from metrics import registry
+
+PREWARM_REFRESHES = registry.counter(
+    'soilsync_weather_prewarm_total', 'Background weather cache refreshes by endpoint and outcome',
+    ('endpoint', 'outcome')
+)
+
+
+class WeatherPrewarmer:
+    def __init__(self, targets, hot_cities=(), top_n=0, max_rate=1.0, snapshot_path=None, daily_budget=None,
+                 tick=15.0, refresh_at=0.9, half_life=3600.0, max_tracked=1000):
+        # targets: {endpoint: (TTLCache, fetch(city))}. Cities are cache keys
+        # and are passed to fetch as they are. Caches with caching disabled
+        # are skipped.
+        self.targets = {name: target for name, target in targets.items() if target[0].ttl > 0}
+        self.hot_cities = list(dict.fromkeys(city for city in hot_cities if city))
+        self.top_n = top_n
+        self.max_rate = max_rate
+        self.snapshot_path = snapshot_path
+        self.daily_budget = daily_budget
+        self.refresh_at = refresh_at
+        # Every entry is looked at least twice between refresh_at and expiry
+        ttls = [cache.ttl for cache, _ in self.targets.values()]
+        self.tick = min([tick] + [ttl * (1 - refresh_at) / 2 for ttl in ttls])
+        self.half_life = half_life
+        self.max_tracked = max_tracked
+        self._popularity = Counter()
+        self._decayed_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._snapshot_mtime = None
+        self._last_call = 0.0
+        self._budget_day = None
+        self.calls_today = 0
+        self.disabled = None
+        self.refreshed = 0
+        self.errors = 0
+        self.cycles = 0
+        self.restored = 0
+        self.last_cycle_at = None
+
+    @property
+    def enabled(self):
+        return bool(self.targets) and bool(self.hot_cities or self.top_n > 0) and self.disabled is None
+
+    def disable(self, reason):
+        # Turns pre-warming off before start(); the reason shows in stats()
+        self.disabled = reason
+
+    # -------- popularity --------
+    def record(self, city):
+        # Called on every user lookup; a dict increment under a lock
+        if self.top_n <= 0 or not city:
+            return
+        with self._lock:
+            self._popularity[city] += 1
+            if len(self._popularity) > self.max_tracked:
+                # One-off typos and rare cities go first
+                self._popularity = Counter(dict(self._popularity.most_common(self.max_tracked // 2)))
+
+    def _decay(self):
+        # Counts halve every half_life, so the top-N follows recent traffic
+        now = time.monotonic()
+        halvings = int((now - self._decayed_at) / self.half_life)
+        if not halvings:
+            return
+        self._decayed_at += halvings * self.half_life
+        factor = 0.5 ** halvings
+        self._popularity = Counter({
+            city: count * factor for city, count in self._popularity.items() if count * factor >= 0.5
+        })
+
+    def forget(self, city):
+        with self._lock:
+            self._popularity.pop(city, None)
+
+    def cities(self):
+        # Hot list first, then the most requested other cities
+        with self._lock:
+            self._decay()
+            ranked = [city for city, _ in self._popularity.most_common(self.top_n + len(self.hot_cities))]
+        learned = [city for city in ranked if city not in self.hot_cities][:self.top_n]
+        return self.hot_cities + learned
+
+    # -------- refreshing --------
+    def due(self):
+        # (endpoint, city) pairs missing from their cache or close to expiry
+        pending = []
+        for city in self.cities():
+            for endpoint, (cache, _) in self.targets.items():
+                found = cache.peek(city)
+                if found is None or found[1] >= cache.ttl * self.refresh_at:
+                    pending.append((endpoint, city))
+        return pending
+
+    def _roll_day(self):
+        # The budget is per UTC day
+        day = time.strftime('%Y-%m-%d', time.gmtime())
+        if day != self._budget_day:
+            self._budget_day, self.calls_today = day, 0
+
+    def _take_call(self):
+        # Counts one upstream call against today's budget; False once it is spent
+        self._roll_day()
+        if self.daily_budget is not None and self.calls_today >= self.daily_budget:
+            return False
+        self.calls_today += 1
+        return True
+
+    def _wait_for_rate(self):
+        if self.max_rate > 0:
+            delay = self._last_call + 1 / self.max_rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        self._last_call = time.monotonic()
+
+    def refresh_once(self):
+        # One pass over the due entries; returns how many were refreshed
+        lock = self._acquire()
+        if lock is False:
+            # Another worker is refreshing; take its results from disk
+            self.load()
+            return 0
+        try:
+            self.load()
+            refreshed = calls = 0
+            for endpoint, city in self.due():
+                if not self._take_call():
+                    PREWARM_REFRESHES.inc(endpoint, 'over_budget')
+                    break
+                calls += 1
+                cache, fetch = self.targets[endpoint]
+                self._wait_for_rate()
+                try:
+                    cache.set(city, fetch(city))
+                except Exception:
+                    self.errors += 1
+                    PREWARM_REFRESHES.inc(endpoint, 'error')
+                    if city not in self.hot_cities:
+                        # Misspelt or unknown cities stop being refreshed
+                        # until users ask for them again
+                        self.forget(city)
+                    continue
+                refreshed += 1
+                PREWARM_REFRESHES.inc(endpoint, 'ok')
+            self.refreshed += refreshed
+            self.cycles += 1
+            self.last_cycle_at = time.time()
+            if calls:
+                self.save()
+            return refreshed
+        finally:
+            if lock:
+                lock.close()
+
+    def _acquire(self):
+        # Open lock file when this worker may refresh, False when another one
+        # holds it, None when there is nothing to coordinate
+        if not self.snapshot_path or fcntl is None:
+            return None
+        lock = open(f'{self.snapshot_path}.lock', 'a')
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            return False
+        return lock
+
+    def start(self):
+        # Restores the snapshot, then refreshes in the background. Once per
+        # process, like the other background workers, so forked workers each
+        # get their own thread.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        self.load()
+        atexit.register(self.save)
+        threading.Thread(target=self._run, name='weather-prewarm', daemon=True).start()
+
+    def _run(self):
+        # A random first delay keeps workers started together out of step
+        time.sleep(random.uniform(0, self.tick))
+        while True:
+            try:
+                self.refresh_once()
+            except Exception:
+                self.errors += 1
+            time.sleep(self.tick)
+
+    # -------- snapshot --------
+    def load(self):
+        # Entries from the snapshot that are newer than what the caches hold.
+        # Skipped when the file has not changed since the last load or save.
+        if not self.snapshot_path:
+            return 0
+        try:
+            mtime = os.stat(self.snapshot_path).st_mtime_ns
+            if mtime == self._snapshot_mtime:
+                return 0
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        self._snapshot_mtime = mtime
+
+        now = time.time()
+        restored = 0
+        for endpoint, entries in snapshot.get('entries', {}).items():
+            if endpoint not in self.targets:
+                continue
+            cache = self.targets[endpoint][0]
+            for city, entry in entries.items():
+                age = max(0.0, now - entry['fetched_at'])
+                if age >= cache.ttl + cache.stale_ttl:
+                    continue
+                current = cache.peek(city)
+                if current is None or current[1] > age:
+                    cache.set(city, entry['value'], age)
+                    restored += 1
+        with self._lock:
+            for city, count in snapshot.get('popularity', {}).items():
+                self._popularity[city] = max(self._popularity[city], count)
+        budget = snapshot.get('budget', {})
+        self._roll_day()
+        if budget.get('day') == self._budget_day:
+            self.calls_today = max(self.calls_today, budget.get('calls', 0))
+        self.restored += restored
+        return restored
+
+    def save(self):
+        if not self.snapshot_path:
+            return
+        # Another worker may have written since; keep its entries and calls
+        self.load()
+        now = time.time()
+        entries = {}
+        for endpoint, (cache, _) in self.targets.items():
+            entries[endpoint] = {}
+            for city in self.cities():
+                found = cache.peek(city)
+                if found is not None:
+                    entries[endpoint][city] = {'fetched_at': now - found[1], 'value': found[0]}
+        with self._lock:
+            popularity = dict(self._popularity.most_common(self.top_n * 4))
+        self._roll_day()
+        snapshot = {
+            'saved_at': now,
+            'entries': entries,
+            'popularity': popularity,
+            'budget': {'day': self._budget_day, 'calls': self.calls_today}
+        }
+        # Written beside the target and renamed, so readers never see half a file
+        tmp_path = f'{self.snapshot_path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.snapshot_path)
+            self._snapshot_mtime = os.stat(self.snapshot_path).st_mtime_ns
+        except OSError:
+            self.errors += 1
+
+    def stats(self):
+        cities = self.cities()
+        return {
+            'enabled': self.enabled and self._pid == os.getpid(),
+            'disabled': self.disabled,
+            'daily_budget': self.daily_budget,
+            'calls_today': self.calls_today,
+            'hot_cities': self.hot_cities,
+            'learned_cities': cities[len(self.hot_cities):],
+            'due': len(self.due()),
+            'refreshed': self.refreshed,
+            'errors': self.errors,
+            'cycles': self.cycles,
+            'restored_from_snapshot': self.restored,
+            'last_cycle_at': self.last_cycle_at,
+            'snapshot_path': self.snapshot_path
+        }
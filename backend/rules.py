@@ -0,0 +1,90 @@
+# ==================== SOILSYNC RULES STORE ====================
+# Agronomy knowledge bases (treatments, fertilizer schedules, crop options,
+# subsidies) live in data/rules.json. The file is parsed once into read-only
+# tables: strings are interned, dicts become FrozenDict and lists become
+# tuples, so a request does a lookup instead of rebuilding nested literals.
+# Editing the file swaps in new tables on the next lookup, without a restart.
+
+import json
+import os
+import sys
+import threading
+import time
+
+
+class FrozenDict(dict):
+    # A dict that refuses mutation. Still a dict, so jsonify serializes it
+    # without copying.
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('rule tables are read-only')
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+
+def freeze(value):
+    if isinstance(value, dict):
+        return FrozenDict((sys.intern(key), freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+
+class RulesStore:
+    def __init__(self, path, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._mtime = None
+        self.reloads = 0
+        self.reload_error = None
+        self.tables = self._load()
+
+    def _load(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        with open(self.path, encoding='utf-8') as f:
+            tables = freeze(json.load(f))
+        self._mtime = mtime
+        return tables
+
+    def current(self):
+        # Cheap when nothing changed: at most one stat() per check_interval
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            self._maybe_reload()
+        return self.tables
+
+    def __getitem__(self, section):
+        return self.current()[section]
+
+    def _maybe_reload(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            self.reload_error = str(e)
+            return
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            # A broken edit keeps the previous tables in service
+            try:
+                self.tables = self._load()
+                self.reloads += 1
+                self.reload_error = None
+            except (OSError, ValueError) as e:
+                self._mtime = mtime
+                self.reload_error = str(e)
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'version': self.tables.get('version'),
+            'reloads': self.reloads,
+            'reload_error': self.reload_error
+        }
@@ -0,0 +1,352 @@
+# ==================== SOILSYNC CHATBOT SESSIONS ====================
+# Server-side conversation history for the chatbot, so follow-up questions
+# reach the model with their context instead of the farmer restating it.
+#
+# Each session keeps its most recent messages in a ring buffer (a bounded
+# deque) within a token budget. Older messages are folded into a running
+# summary, which has its own token cap. The summary is extractive: the first
+# sentence of each folded message, so summarising costs no extra Groq call.
+# The prompt built from a session is therefore capped at
+# summary_tokens + history_tokens whatever the conversation length, and each
+# request does a fixed amount of work: one dict lookup, a deque append and at
+# most a few folds.
+#
+# Sessions idle for longer than idle_ttl are evicted, least recently used
+# first, and at most max_sessions are held per process. With a SQLite path
+# every change is also written to the database, which is shared by gunicorn
+# workers and survives restarts: a worker that does not hold a session, or
+# holds an older copy than another worker wrote, loads it from there. A copy
+# checked within the last sync_interval seconds is used as it is (a farmer's
+# next question is never that quick), so most requests make no query. SQLite
+# is only ever used outside the store's lock, so a slow or locked database
+# holds up the session being written and nothing else; under the ASGI entry
+# point these calls run off the event loop (GroqChatbot._acontext and
+# _aremember in app.py).
+
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+
+SESSION_ID = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+SENTENCE_END = re.compile(r'(?<=[.!?।])\s')
+# Bytes per held message beyond its text: the (role, text, tokens) tuple and
+# its deque slot
+MESSAGE_OVERHEAD = 64
+
+
+def estimate_tokens(text):
+    # About 4 bytes of UTF-8 per token: ~4 characters of English, and
+    # Devanagari (3 bytes a character) correspondingly more per character
+    return len(text.encode('utf-8')) // 4 + 1
+
+
+def first_sentence(text, limit=160):
+    text = ' '.join(text.split())
+    sentence = SENTENCE_END.split(text, 1)[0]
+    return sentence if len(sentence) <= limit else sentence[:limit - 1].rstrip() + '…'
+
+
+class Session:
+    __slots__ = ('messages', 'tokens', 'summary', 'summary_tokens', 'seq', 'last_used', 'synced', 'bytes')
+
+    def __init__(self, max_messages):
+        # messages: (role, text, tokens) tuples, oldest first
+        self.messages = deque(maxlen=max_messages)
+        self.tokens = 0
+        self.summary = deque()
+        self.summary_tokens = 0
+        self.seq = 0
+        self.last_used = time.monotonic()
+        # When this copy was last compared with the database
+        self.synced = self.last_used
+        self.bytes = 0
+
+    def state(self):
+        return {
+            'messages': list(self.messages),
+            'summary': list(self.summary),
+            'seq': self.seq
+        }
+
+
+class SessionStore:
+    def __init__(self, max_sessions=10000, idle_ttl=1800, max_messages=16, history_tokens=1200,
+                 summary_tokens=200, path=None, sync_interval=1.0):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_messages = max_messages
+        self.history_tokens = history_tokens
+        self.summary_tokens = summary_tokens
+        self.path = path
+        self.sync_interval = sync_interval
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db = None
+        self._db_pid = None
+        self._purged_at = time.monotonic()
+        self.bytes = 0
+        self.messages_added = 0
+        self.folded = 0
+        self.loaded = 0
+        self.evicted_idle = 0
+        self.evicted_capacity = 0
+        self.db_errors = 0
+        self.context_requests = 0
+        self.context_tokens = 0
+
+    @property
+    def enabled(self):
+        return self.max_sessions > 0 and self.max_messages > 0
+
+    @staticmethod
+    def valid_id(session_id):
+        return isinstance(session_id, str) and bool(SESSION_ID.match(session_id))
+
+    # -------- context --------
+    def context(self, session_id):
+        # (summary text or None, [(role, text)]) to send ahead of the new query
+        if not self.enabled:
+            return None, []
+        self._sync(session_id)
+        with self._lock:
+            session = self._get(session_id, create=False)
+            if session is None:
+                return None, []
+            summary = ' '.join(session.summary) if session.summary else None
+            history = [(role, text) for role, text, _ in session.messages]
+            self.context_requests += 1
+            self.context_tokens += session.tokens + session.summary_tokens
+            return summary, history
+
+    def add(self, session_id, query, answer=None):
+        # Records one exchange; answer is None when only fallback text was
+        # served, which is no use to the model as context
+        if not self.enabled:
+            return
+        self._sync(session_id)
+        with self._lock:
+            session = self._get(session_id, create=True)
+            self._append(session, 'user', query)
+            if answer:
+                self._append(session, 'assistant', answer)
+            session.seq += 1
+            row = self._row(session_id, session) if self.path else None
+        if row:
+            self._save(row)
+        self._purge()
+
+    def _append(self, session, role, text):
+        tokens = estimate_tokens(text)
+        if len(session.messages) == session.messages.maxlen:
+            self._fold(session)
+        session.messages.append((role, text, tokens))
+        session.tokens += tokens
+        self._resize(session, sys.getsizeof(text) + MESSAGE_OVERHEAD)
+        # A message larger than the whole budget ends up as its summary line
+        while session.tokens > self.history_tokens and session.messages:
+            self._fold(session)
+        self.messages_added += 1
+
+    def _fold(self, session):
+        # Moves the oldest message into the summary, dropping the oldest
+        # summary lines beyond its budget
+        role, text, tokens = session.messages.popleft()
+        session.tokens -= tokens
+        self._resize(session, -sys.getsizeof(text) - MESSAGE_OVERHEAD)
+        line = f"{'Farmer' if role == 'user' else 'Assistant'}: {first_sentence(text)}"
+        session.summary.append(line)
+        session.summary_tokens += estimate_tokens(line)
+        self._resize(session, sys.getsizeof(line))
+        while session.summary_tokens > self.summary_tokens and session.summary:
+            dropped = session.summary.popleft()
+            session.summary_tokens -= estimate_tokens(dropped)
+            self._resize(session, -sys.getsizeof(dropped))
+        self.folded += 1
+
+    def _resize(self, session, delta):
+        session.bytes += delta
+        self.bytes += delta
+
+    # -------- lookup and eviction --------
+    def _sync(self, session_id):
+        # Another worker may have answered this session since we last saw it.
+        # The query runs outside self._lock; the newer copy is swapped in after.
+        if not self.path:
+            return
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and now - session.synced < self.sync_interval:
+                return
+            seq = session.seq if session is not None else 0
+        stored = self._load(session_id, seq)
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if stored is not None and (session is None or stored['seq'] > session.seq):
+                if session is not None:
+                    self._discard(session_id)
+                session = self._restore(stored)
+                self._sessions[session_id] = session
+                self.loaded += 1
+            if session is not None:
+                session.synced = now
+
+    def _get(self, session_id, create):
+        # In-memory only, under self._lock; see _sync for the database
+        now = time.monotonic()
+        self._evict(now)
+        session = self._sessions.get(session_id)
+        if session is not None:
+            self._sessions.move_to_end(session_id)
+        else:
+            if not create:
+                return None
+            session = Session(self.max_messages)
+            self._sessions[session_id] = session
+        while len(self._sessions) > self.max_sessions:
+            self._discard(next(iter(self._sessions)))
+            self.evicted_capacity += 1
+        session.last_used = now
+        return session
+
+    def _evict(self, now):
+        # Least recently used first, so only expired sessions are looked at
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_used < self.idle_ttl:
+                break
+            self._discard(session_id)
+            self.evicted_idle += 1
+
+    def _purge(self):
+        # Expired rows leave the database at most every few minutes
+        now = time.monotonic()
+        if self.path and now - self._purged_at >= min(self.idle_ttl, 300):
+            self._purged_at = now
+            self._execute('DELETE FROM sessions WHERE updated < ?', (time.time() - self.idle_ttl,))
+
+    def _discard(self, session_id):
+        session = self._sessions.pop(session_id)
+        self.bytes -= session.bytes
+
+    def _restore(self, state):
+        session = Session(self.max_messages)
+        for role, text, tokens in state['messages'][-self.max_messages:]:
+            session.messages.append((role, text, tokens))
+            session.tokens += tokens
+            self._resize(session, sys.getsizeof(text) + MESSAGE_OVERHEAD)
+        for line in state['summary']:
+            session.summary.append(line)
+            session.summary_tokens += estimate_tokens(line)
+            self._resize(session, sys.getsizeof(line))
+        session.seq = state['seq']
+        return session
+
+    def drop(self, session_id):
+        with self._lock:
+            if session_id in self._sessions:
+                self._discard(session_id)
+        self._execute('DELETE FROM sessions WHERE id = ?', (session_id,))
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+            self.bytes = 0
+        self._execute('DELETE FROM sessions')
+
+    # -------- SQLite --------
+    def _connection(self):
+        # One connection per process (a forked worker must not reuse its
+        # parent's), used under self._db_lock
+        if self._db_pid != os.getpid():
+            self._db = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS sessions ('
+                'id TEXT PRIMARY KEY, seq INTEGER NOT NULL, updated REAL NOT NULL, state TEXT NOT NULL)'
+            )
+            self._db.execute('CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated)')
+            self._db_pid = os.getpid()
+        return self._db
+
+    def _execute(self, sql, params=()):
+        # Persistence is best effort: a locked or unwritable database leaves
+        # the in-memory sessions working
+        if not self.path:
+            return None
+        with self._db_lock:
+            try:
+                with self._connection() as db:
+                    return db.execute(sql, params).fetchone()
+            except sqlite3.Error:
+                self.db_errors += 1
+                return None
+
+    def _load(self, session_id, seq):
+        # The stored state, only when it is newer than `seq`
+        row = self._execute('SELECT state FROM sessions WHERE id = ? AND seq > ?', (session_id, seq))
+        if row is None:
+            return None
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return None
+
+    def _row(self, session_id, session):
+        # Taken under self._lock, written after it is released
+        return session_id, session.seq, time.time(), json.dumps(session.state(), ensure_ascii=False)
+
+    def _save(self, row):
+        # Writes that finish out of order never replace a newer state
+        self._execute(
+            'INSERT INTO sessions (id, seq, updated, state) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT(id) DO UPDATE SET seq = excluded.seq, updated = excluded.updated, state = excluded.state '
+            'WHERE excluded.seq > sessions.seq',
+            row
+        )
+
+    # -------- reporting --------
+    def stats(self):
+        stored = self._execute('SELECT COUNT(*) FROM sessions')
+        with self._lock:
+            self._evict(time.monotonic())
+            sessions = len(self._sessions)
+            messages = sum(len(session.messages) for session in self._sessions.values())
+            return {
+                'enabled': self.enabled,
+                'sessions': sessions,
+                'max_sessions': self.max_sessions,
+                'messages_held': messages,
+                'approx_bytes': self.bytes,
+                'avg_bytes_per_session': round(self.bytes / sessions) if sessions else 0,
+                'messages_added': self.messages_added,
+                'messages_summarised': self.folded,
+                'avg_context_tokens': round(self.context_tokens / self.context_requests, 1)
+                if self.context_requests else 0.0,
+                'max_context_tokens': self.history_tokens + self.summary_tokens,
+                'evicted_idle': self.evicted_idle,
+                'evicted_capacity': self.evicted_capacity,
+                'idle_ttl': self.idle_ttl,
+                'persistent': bool(self.path),
+                'stored_sessions': stored[0] if stored else None,
+                'loaded_from_db': self.loaded,
+                'db_errors': self.db_errors
+            }
+
+    def collect(self):
+        # Metrics collector (see metrics.Registry.collector)
+        with self._lock:
+            sessions, approx_bytes = len(self._sessions), self.bytes
+            evicted = [({'reason': 'idle'}, self.evicted_idle), ({'reason': 'capacity'}, self.evicted_capacity)]
+        yield 'soilsync_chatbot_sessions', 'gauge', 'Chatbot conversation sessions held in memory', [({}, sessions)]
+        yield 'soilsync_chatbot_session_bytes', 'gauge', 'Approximate memory held by session messages and summaries', [
+            ({}, approx_bytes)
+        ]
+        yield 'soilsync_chatbot_session_evictions_total', 'counter', 'Chatbot sessions evicted by reason', evicted
@@ -0,0 +1,184 @@
+# ==================== SOILSYNC STATIC ASSETS ====================
+# The frontend (index.html, pages/, css/, js/) is loaded into memory at startup
+# and served from there:
+#   - css/ and js/ files also get content-hashed URLs (css/style.1a2b3c4d5e.css)
+#     that are cached by browsers as immutable for a year;
+#   - pages are rewritten to reference those hashed URLs and are served with
+#     no-cache + ETag, so a revisit costs one 304 when nothing changed;
+#   - every file is precompressed once (gzip, and brotli when the optional
+#     `brotli` package is installed) instead of on each request.
+# Files are rescanned at most every `check_interval` seconds, so edits show up
+# without a restart (with new hashes).
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+import threading
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Preferred first; the client's Accept-Encoding picks among these
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+COMPRESSIBLE_TYPES = {
+    'application/json', 'application/javascript', 'text/javascript',
+    'text/css', 'text/html', 'text/plain', 'text/csv', 'image/svg+xml'
+}
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+
+def compress(data, encoding, static=False):
+    # Static files are compressed once, so they get the slowest, smallest
+    # settings; API responses use faster levels
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if static else 5)
+    return gzip.compress(data, compresslevel=9 if static else 6, mtime=0)
+
+
+class Asset:
+    def __init__(self, path, body, mimetype):
+        self.path = path
+        self.mimetype = mimetype
+        self.digest = hashlib.sha1(body).hexdigest()[:10]
+        self.bodies = {'identity': body}
+        if mimetype in COMPRESSIBLE_TYPES:
+            for encoding in ENCODINGS:
+                compressed = compress(body, encoding, static=True)
+                if len(compressed) < len(body):
+                    self.bodies[encoding] = compressed
+
+    def etag(self, encoding):
+        # One strong ETag per representation
+        return self.digest if encoding == 'identity' else f'{self.digest}-{encoding}'
+
+
+class StaticAssets:
+    HASHED_DIRS = ('css', 'js')
+    PAGE_DIRS = ('pages',)
+    PAGES = ('index.html',)
+
+    REFERENCE = re.compile(r'''(\b(?:href|src)\s*=\s*["'])([^"'?#:]+)(["'])''')
+
+    def __init__(self, root, check_interval=1.0):
+        self.root = os.path.abspath(root)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._mtimes = None
+        self.assets = {}
+        self.hashed_urls = {}
+        self.builds = 0
+        # Built on first use (or by create_app() before workers fork), so
+        # importing the app stays cheap even with brotli at full quality
+
+    def _scan(self):
+        files = {}
+        for directory in self.HASHED_DIRS + self.PAGE_DIRS:
+            base = os.path.join(self.root, directory)
+            if not os.path.isdir(base):
+                continue
+            for dirpath, _, filenames in os.walk(base):
+                for name in filenames:
+                    full = os.path.join(dirpath, name)
+                    files[os.path.relpath(full, self.root).replace(os.sep, '/')] = os.stat(full).st_mtime_ns
+        for name in self.PAGES:
+            full = os.path.join(self.root, name)
+            if os.path.isfile(full):
+                files[name] = os.stat(full).st_mtime_ns
+        return files
+
+    def _read(self, path):
+        with open(os.path.join(self.root, path), 'rb') as f:
+            return f.read()
+
+    @staticmethod
+    def _mimetype(path):
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        return 'text/javascript' if mimetype == 'application/javascript' else mimetype
+
+    def _build(self, mtimes):
+        assets = {}
+        hashed_urls = {}
+        pages = []
+        for path in sorted(mtimes):
+            if path.split('/', 1)[0] in self.HASHED_DIRS:
+                asset = Asset(path, self._read(path), self._mimetype(path))
+                stem, ext = posixpath.splitext(path)
+                hashed = f'{stem}.{asset.digest}{ext}'
+                # Reachable under both URLs; only the hashed one is immutable
+                assets[path] = (asset, REVALIDATE)
+                assets[hashed] = (asset, IMMUTABLE)
+                hashed_urls[path] = hashed
+            else:
+                pages.append(path)
+
+        for path in pages:
+            body = self._read(path)
+            mimetype = self._mimetype(path)
+            if mimetype == 'text/html':
+                body = self._rewrite(path, body.decode('utf-8'), hashed_urls).encode('utf-8')
+            assets[path] = (Asset(path, body, mimetype), REVALIDATE)
+        return assets, hashed_urls
+
+    def _rewrite(self, page, html, hashed_urls):
+        # Point local css/js references at their hashed URLs, keeping the
+        # page's own relative or absolute style
+        base = posixpath.dirname(page)
+
+        def replace(match):
+            reference = match.group(2)
+            if reference.startswith('/'):
+                target = reference.lstrip('/')
+            else:
+                target = posixpath.normpath(posixpath.join(base, reference))
+            hashed = hashed_urls.get(target)
+            if hashed is None:
+                return match.group(0)
+            return match.group(1) + posixpath.join(posixpath.dirname(reference), posixpath.basename(hashed)) + match.group(3)
+
+        return self.REFERENCE.sub(replace, html)
+
+    def _maybe_rebuild(self):
+        now = time.monotonic()
+        if self._mtimes is not None and now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            if self._mtimes is not None and now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+            try:
+                mtimes = self._scan()
+                if mtimes != self._mtimes:
+                    self.assets, self.hashed_urls = self._build(mtimes)
+                    self._mtimes = mtimes
+                    self.builds += 1
+            except OSError:
+                # A file vanished mid-deploy; keep serving the previous build
+                if self._mtimes is None:
+                    raise
+
+    def get(self, path):
+        # (Asset, Cache-Control value) or None
+        self._maybe_rebuild()
+        return self.assets.get(path)
+
+    def stats(self):
+        self._maybe_rebuild()
+        files = [asset for asset, cache_control in self.assets.values() if cache_control == REVALIDATE]
+        return {
+            'files': len(files),
+            'hashed_urls': len(self.hashed_urls),
+            'encodings': list(ENCODINGS),
+            'identity_bytes': sum(len(asset.bodies['identity']) for asset in files),
+            'compressed_bytes': sum(min(map(len, asset.bodies.values())) for asset in files),
+            'builds': self.builds
+        }
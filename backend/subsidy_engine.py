@@ -0,0 +1,115 @@
+# ==================== SOILSYNC SUBSIDY ELIGIBILITY ENGINE ====================
+# Schemes come from a catalogue (the "subsidies" section of data/rules.json),
+# each with optional crop, category and land-size criteria. At load time the
+# catalogue is turned into an eligibility index: one bitmask of schemes per
+# crop, per category and per land-size bracket (the brackets are cut at every
+# min/max boundary in the catalogue). A lookup ANDs three masks, and the
+# resulting scheme list is memoized per (crop, category, bracket), so a farmer
+# record costs a few dict lookups and a bisect. Output always follows
+# catalogue order, which keeps responses byte-for-byte stable for ETags.
+
+import hashlib
+import json
+import math
+from bisect import bisect_right
+
+
+class SchemeCatalogue:
+    def __init__(self, table):
+        self.schemes = tuple(table['schemes'])
+        self.ids = tuple(scheme['id'] for scheme in self.schemes)
+        self._names = tuple(scheme['name'] for scheme in self.schemes)
+        if len(set(self.ids)) != len(self.ids):
+            raise ValueError('Duplicate subsidy scheme id')
+        # Content hash of the catalogue, used in ETags and bulk job headers
+        self.version = hashlib.sha1(
+            json.dumps(self.schemes, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        ).hexdigest()[:16]
+
+        everyone = (1 << len(self.schemes)) - 1
+        self.crop_masks, self.any_crop = self._masks('crops', everyone)
+        self.category_masks, self.any_category = self._masks('categories', everyone)
+
+        # Land sizes are split into brackets at every boundary; bracket i covers
+        # [bounds[i-1], bounds[i]) and has one mask
+        bounds = set()
+        for scheme in self.schemes:
+            eligibility = scheme.get('eligibility', {})
+            for key in ('min_land_size', 'max_land_size'):
+                if eligibility.get(key) is not None:
+                    bounds.add(float(eligibility[key]))
+        self.bounds = sorted(bounds)
+        lows = [-math.inf] + self.bounds
+        self.bracket_masks = []
+        for low in lows:
+            mask = 0
+            for bit, scheme in enumerate(self.schemes):
+                eligibility = scheme.get('eligibility', {})
+                minimum = eligibility.get('min_land_size')
+                maximum = eligibility.get('max_land_size')
+                if (minimum is None or low >= minimum) and (maximum is None or low < maximum):
+                    mask |= 1 << bit
+            self.bracket_masks.append(mask)
+
+        self._memo = {}
+
+    def _masks(self, key, everyone):
+        # value -> mask of schemes open to it; schemes without the criterion
+        # are open to any value, including unknown ones
+        masks = {}
+        open_to_all = everyone
+        for bit, scheme in enumerate(self.schemes):
+            values = scheme.get('eligibility', {}).get(key)
+            if values is None:
+                continue
+            open_to_all &= ~(1 << bit)
+            for value in values:
+                masks[value] = masks.get(value, 0) | (1 << bit)
+        return {value: mask | open_to_all for value, mask in masks.items()}, open_to_all
+
+    def bracket(self, land_size):
+        land_size = float(land_size)
+        if not land_size >= 0:  # also rejects NaN
+            raise ValueError('land_size must be a non-negative number')
+        return bisect_right(self.bounds, land_size)
+
+    def eligible(self, crop, category, land_size):
+        # Indices of eligible schemes, in catalogue order. Unknown crops and
+        # categories share one key, so the memo is bounded by the catalogue
+        crop = str(crop or '').strip().lower()
+        category = str(category or '').strip().lower()
+        crop = crop if crop in self.crop_masks else None
+        category = category if category in self.category_masks else None
+        key = (crop, category, self.bracket(land_size))
+        found = self._memo.get(key)
+        if found is None:
+            mask = self.crop_masks.get(crop, self.any_crop) & \
+                self.category_masks.get(category, self.any_category) & \
+                self.bracket_masks[key[2]]
+            found = tuple(bit for bit in range(len(self.schemes)) if mask >> bit & 1)
+            self._memo[key] = found
+        return found
+
+    def names(self, indices):
+        names = self._names
+        return [names[i] for i in indices]
+
+    def stats(self):
+        return {
+            'version': self.version,
+            'schemes': len(self.schemes),
+            'crops': len(self.crop_masks),
+            'categories': len(self.category_masks),
+            'land_size_brackets': len(self.bracket_masks),
+            'memoized_profiles': len(self._memo)
+        }
+
+    def evaluate(self, records):
+        # (record_id, crop, category, land_size) tuples in, (record_id,
+        # indices, error) out; one bad record does not stop the stream
+        eligible = self.eligible
+        for record_id, crop, category, land_size in records:
+            try:
+                yield record_id, eligible(crop, category, land_size), None
+            except (TypeError, ValueError):
+                yield record_id, (), 'Invalid land_size'
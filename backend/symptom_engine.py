@@ -0,0 +1,94 @@
+# ==================== SOILSYNC SYMPTOM INDEX ====================
+# Disease symptom profiles live in a JSON data file and are turned into an
+# inverted index (symptom -> profiles, TF-IDF weighted) once at startup, so
+# scoring a symptom set only touches profiles that share a symptom with it.
+#
+# Profiles without a crop apply to every crop; crop-specific profiles are only
+# considered when a query names that crop.
+
+import heapq
+import json
+import math
+from collections import Counter, defaultdict
+
+
+class SymptomIndex:
+    def __init__(self, profiles):
+        # profiles: [{'disease': ..., 'crop': ... or None, 'symptoms': {name: weight}}]
+        df = Counter(symptom for profile in profiles for symptom in profile['symptoms'])
+        total = len(profiles)
+        self.idf = {symptom: math.log((1 + total) / (1 + count)) + 1.0 for symptom, count in df.items()}
+
+        self.profiles = []
+        self._norms = []
+        postings = defaultdict(lambda: defaultdict(list))
+        for pid, profile in enumerate(profiles):
+            crop = self._scope(profile.get('crop'))
+            weights = {symptom: float(weight) * self.idf[symptom] for symptom, weight in profile['symptoms'].items()}
+            self.profiles.append((profile['disease'], crop))
+            self._norms.append(math.sqrt(sum(w * w for w in weights.values())) or 1.0)
+            for symptom, weight in weights.items():
+                postings[crop][symptom].append((pid, weight))
+
+        # Plain dicts of tuples: read-only after startup and cheap to iterate
+        self._postings = {
+            crop: {symptom: tuple(entries) for symptom, entries in by_symptom.items()}
+            for crop, by_symptom in postings.items()
+        }
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f)['profiles'])
+
+    @staticmethod
+    def _scope(crop):
+        return crop.strip().lower() if crop else None
+
+    def crops(self):
+        return sorted(crop for crop in self._postings if crop)
+
+    def rank(self, symptoms, crop=None, k=3):
+        # Top-k profiles by cosine similarity between the query and profile
+        # TF-IDF vectors; unknown symptoms are ignored
+        query = {symptom: self.idf[symptom] for symptom in set(symptoms) if symptom in self.idf}
+        if not query or k <= 0:
+            return []
+        query_norm = math.sqrt(sum(w * w for w in query.values()))
+
+        scopes = [self._postings.get(None, {})]
+        crop = self._scope(crop)
+        if crop:
+            scopes.append(self._postings.get(crop, {}))
+
+        dots = defaultdict(float)
+        matched = defaultdict(list)
+        for postings in scopes:
+            for symptom, query_weight in query.items():
+                for pid, weight in postings.get(symptom, ()):
+                    dots[pid] += query_weight * weight
+                    matched[pid].append(symptom)
+
+        # Ties keep data-file order so results are deterministic
+        top = heapq.nlargest(
+            k, ((dot / (query_norm * self._norms[pid]), -pid) for pid, dot in dots.items())
+        )
+        ranked = []
+        for score, neg_pid in top:
+            disease, profile_crop = self.profiles[-neg_pid]
+            ranked.append({
+                'disease': disease,
+                'crop': profile_crop,
+                'score': round(score, 4),
+                'matched_symptoms': sorted(matched[-neg_pid])
+            })
+        return ranked
+
+    def stats(self):
+        postings = [len(entries) for by_symptom in self._postings.values() for entries in by_symptom.values()]
+        return {
+            'profiles': len(self.profiles),
+            'symptoms': len(self.idf),
+            'crops': len(self.crops()),
+            'mean_posting_length': round(sum(postings) / len(postings), 2) if postings else 0.0
+        }
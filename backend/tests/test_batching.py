@@ -0,0 +1,95 @@
+# Micro-batching: flush by size or deadline, backpressure, shared failures
+import os
+import sys
+import threading
+import time
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batching import MicroBatcher, QueueFull  # noqa: E402
+
+
+class Recorder:
+    # A batch function that records batch sizes and can be held mid-batch
+    def __init__(self):
+        self.batches = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        self.started.set()
+        self.release.wait(5)
+        return [item * 10 for item in items]
+
+
+def test_flushes_as_soon_as_the_batch_is_full():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder, max_batch=4, max_wait=30)
+    started = time.monotonic()
+    futures = batcher.submit_many([1, 2, 3, 4])
+    assert [future.result(5) for future in futures] == [10, 20, 30, 40]
+    assert time.monotonic() - started < 5
+    assert recorder.batches == [[1, 2, 3, 4]]
+
+
+def test_flushes_a_partial_batch_at_the_deadline():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder, max_batch=16, max_wait=0.05)
+    started = time.monotonic()
+    futures = [batcher.submit(1), batcher.submit(2)]
+    assert [future.result(5) for future in futures] == [10, 20]
+    assert time.monotonic() - started >= 0.05
+    assert recorder.batches == [[1, 2]]
+
+
+def test_full_queue_is_refused_with_a_retry_hint():
+    recorder = Recorder()
+    recorder.release.clear()
+    batcher = MicroBatcher(recorder, max_batch=1, max_wait=0, max_queue=2)
+    first = batcher.submit(1)
+    assert recorder.started.wait(5)
+    # The worker holds item 1; two more fill the queue
+    queued = batcher.submit_many([2, 3])
+    with pytest.raises(QueueFull) as refused:
+        batcher.submit(4)
+    assert refused.value.retry_after >= 1 and batcher.stats()['rejected'] == 1
+    recorder.release.set()
+    assert [future.result(5) for future in [first] + queued] == [10, 20, 30]
+
+
+def test_batch_failure_reaches_every_caller():
+    def broken(items):
+        raise RuntimeError('model unavailable')
+
+    batcher = MicroBatcher(broken, max_batch=3, max_wait=1)
+    futures = batcher.submit_many(['a', 'b', 'c'])
+    for future in futures:
+        with pytest.raises(RuntimeError, match='model unavailable'):
+            future.result(5)
+
+
+def test_item_failure_stays_with_its_item():
+    batcher = MicroBatcher(lambda items: [ValueError('bad') if item < 0 else item for item in items], max_batch=2)
+    good, bad = batcher.submit_many([1, -1])
+    assert good.result(5) == 1
+    with pytest.raises(ValueError):
+        bad.result(5)
+
+
+def test_image_route_answers_503_with_retry_after(monkeypatch):
+    import app
+
+    monkeypatch.setattr(app.disease_model, 'batcher', MicroBatcher(lambda items: items, max_queue=0))
+    buffer = BytesIO()
+    pixels = (np.random.default_rng().random((64, 64, 3)) * 255).astype(np.uint8)
+    Image.fromarray(pixels).save(buffer, 'PNG')
+    response = app.app.test_client().post('/api/disease/detect-image', data=buffer.getvalue(), content_type='image/png')
+    assert response.status_code == 503
+    assert int(response.headers['Retry-After']) >= 1
@@ -0,0 +1,32 @@
+# Oversized images are refused before decoding, as a per-image error
+import os
+import sys
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from disease_engine import ImageDecodeError, decode_image  # noqa: E402
+
+
+def encode(size, fmt, mode='RGB'):
+    buffer = BytesIO()
+    Image.new(mode, size).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def test_pixel_cap_applies_before_decoding():
+    with pytest.raises(ImageDecodeError, match='at most 1000000'):
+        decode_image(encode((2000, 1000), 'PNG'), 64, max_pixels=1000000)
+
+
+def test_jpeg_is_measured_after_draft_downscaling():
+    assert decode_image(encode((4000, 3000), 'JPEG'), 64, max_pixels=1000000).shape == (64, 64, 3)
+
+
+def test_decompression_bombs_are_decode_errors():
+    # A 1-bit PNG declaring 169 MP: over Pillow's warning threshold only
+    with pytest.raises(ImageDecodeError, match='too large'):
+        decode_image(encode((13000, 13000), 'PNG', mode='1'), 64)
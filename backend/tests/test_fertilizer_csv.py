@@ -0,0 +1,57 @@
+# Fertilizer dosage output: the bulk CSV must stay rectangular whatever the
+# plots contain, and schedule text must quote the computed dosage
+import csv
+import io
+import json
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from fertilizer_engine import DosageModel  # noqa: E402
+
+
+def model():
+    with open(os.path.join(BACKEND_DIR, 'data', 'rules.json'), encoding='utf-8') as f:
+        return DosageModel(json.load(f)['fertilizer']['dosage'])
+
+
+def test_every_row_has_as_many_fields_as_the_header():
+    dosage = model()
+    ids = [1, 2, 'plot, "north"', 'multi\nline', 5]
+    crops = ['wheat', 'Unknown crop', 'rice', 'maize', 'wheat']
+    soils = ['loamy', 'loamy', 'clay', 'sandy', 'nowhere']
+    stages = ['vegetative', 'vegetative', 'flowering', 'initial', 'initial']
+    areas = [1.5, 2, 'abc', 0.5, 1]
+    result = dosage.compute(crops, soils, stages, areas)
+
+    rows = list(csv.reader(io.StringIO(''.join(dosage.csv_chunks(result, ids, chunk_rows=2)))))
+    header = rows[0]
+    assert header[0] == 'id' and header[-1] == 'error'
+    assert [len(row) for row in rows] == [len(header)] * len(rows)
+
+    body = rows[1:-1]
+    assert [row[0] for row in body] == [str(plot_id) for plot_id in ids]
+    assert rows[-1][0] == 'TOTAL'
+    # Invalid plots keep their row, with the error in the last column only
+    invalid = [row for row in body if row[-1]]
+    assert len(invalid) == len(result['errors']) >= 3
+    assert all(field == '' for row in invalid for field in row[1:-1])
+
+
+def test_schedule_text_quotes_the_computed_dosage():
+    dosage = model()
+    text = dosage.schedule_text('wheat', 'loamy', 'vegetative', 'Top dress')
+    per_ha = dosage.compute(['wheat'], ['loamy'], ['vegetative'], [1.0])['products_kg'][0]
+    assert text == f'Apply {per_ha[2]:.1f} kg/ha Urea. Top dress'
+    assert dosage.schedule_text('wheat', 'loamy', 'maturity', 'No fertilizer') == 'No fertilizer'
+
+
+def test_schedule_notes_carry_no_product_quantities():
+    with open(os.path.join(BACKEND_DIR, 'data', 'rules.json'), encoding='utf-8') as f:
+        schedules = json.load(f)['fertilizer']['schedules']
+    products = {'Urea', 'DAP', 'MOP', 'Potash', 'NPK'}
+    for stages in schedules.values():
+        for note in stages.values():
+            assert not (products & set(note.replace(',', ' ').split())), note
@@ -0,0 +1,34 @@
+# Fuzzy chatbot cache matches must never answer a different question
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import QueryCache  # noqa: E402
+
+CACHED = 'Should I spray fungicide on my tomato crop today'
+
+
+def fuzzy_cache():
+    cache = QueryCache(3600, threshold=0.85, fuzzy=True, terms={'tomato', 'potato', 'blight'})
+    cache.put('en-IN', CACHED, 'answer')
+    cache.put('hi-IN', 'गेहूं में खाद कब डालें', 'उत्तर')
+    return cache
+
+
+def test_defaults_are_exact_only():
+    cache = QueryCache(3600)
+    assert not cache.fuzzy and cache.threshold >= 0.95
+
+
+def test_rephrasing_still_matches():
+    assert fuzzy_cache().get('en-IN', 'should i spray fungicide on my tomato crop today?') == 'answer'
+
+
+def test_content_tokens_must_match():
+    cache = fuzzy_cache()
+    assert cache.get('en-IN', 'Should I not spray fungicide on my tomato crop today') is None
+    assert cache.get('en-IN', "Shouldn't I spray fungicide on my tomato crop today") is None
+    assert cache.get('en-IN', 'Should I spray fungicide on my potato crop today') is None
+    assert cache.get('en-IN', 'Should I spray fungicide on my tomato crop today 2') is None
+    assert cache.get('hi-IN', 'गेहूं में खाद कब नहीं डालें') is None
@@ -0,0 +1,23 @@
+# Consistency checks between the data files in backend/data and backend/models
+import json
+import os
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load(*path):
+    with open(os.path.join(BACKEND_DIR, *path), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_every_diagnosable_disease_has_a_treatment():
+    treatments = load('data', 'rules.json')['treatments']['by_disease']
+    diseases = {profile['disease'] for profile in load('data', 'symptom_profiles.json')['profiles']}
+    diseases.update(load('models', 'disease_classifier.json')['classes'])
+    assert sorted(diseases - set(treatments)) == []
+
+
+def test_unknown_disease_is_not_given_healthy_advice():
+    treatments = load('data', 'rules.json')['treatments']
+    assert treatments['not_on_file'] != treatments['by_disease']['Healthy']
+    assert 'extension officer' in treatments['not_on_file']['advice']
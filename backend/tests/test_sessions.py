@@ -0,0 +1,64 @@
+# Chatbot sessions persisted to SQLite: reloads and out-of-order writes
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sessions import SessionStore  # noqa: E402
+
+SESSION = 'farmer-0001'
+
+
+def stored_seq(store):
+    return store._execute('SELECT seq FROM sessions WHERE id = ?', (SESSION,))[0]
+
+
+def test_reload_keeps_ring_buffer_and_summary(tmp_path):
+    path = str(tmp_path / 'sessions.db')
+    store = SessionStore(max_messages=4, summary_tokens=60, path=path)
+    for i in range(10):
+        store.add(SESSION, f'Question {i}. More detail follows here.', f'Answer {i}. With an explanation.')
+    summary, history = store.context(SESSION)
+    assert len(history) == 4 and history[-1] == ('assistant', 'Answer 9. With an explanation.')
+    assert summary and 'Question 0' not in summary
+
+    # A fresh process sees exactly the same conversation
+    reloaded = SessionStore(max_messages=4, summary_tokens=60, path=path)
+    assert reloaded.context(SESSION) == (summary, history)
+    assert reloaded.stats()['loaded_from_db'] == 1
+
+
+def test_stale_copy_never_overwrites_a_newer_write(tmp_path):
+    path = str(tmp_path / 'sessions.db')
+    first = SessionStore(path=path, sync_interval=3600)
+    second = SessionStore(path=path, sync_interval=3600)
+    first.add(SESSION, 'Which crop suits black soil?', 'Cotton.')
+    second.context(SESSION)
+    for _ in range(3):
+        first.add(SESSION, 'And for the rabi season?', 'Wheat or gram.')
+    # second still holds seq 1 and will not re-check for an hour
+    second.add(SESSION, 'What about water needs?', 'Moderate.')
+    assert stored_seq(first) == 4
+    assert SessionStore(path=path).context(SESSION) == first.context(SESSION)
+
+
+def test_concurrent_adds_leave_the_newest_state(tmp_path):
+    # Rows are written after the store lock is released, so saves can land
+    # out of order; the seq guard keeps the last one
+    path = str(tmp_path / 'sessions.db')
+    store = SessionStore(max_messages=8, path=path)
+
+    def remember(worker):
+        for i in range(25):
+            store.add(SESSION, f'Worker {worker} question {i}', f'Answer {i}')
+
+    threads = [threading.Thread(target=remember, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert stored_seq(store) == 200
+    assert SessionStore(max_messages=8, path=path).context(SESSION) == store.context(SESSION)
+    assert store.stats()['db_errors'] == 0
@@ -0,0 +1,154 @@
+# Subsidy eligibility index: same schemes, in catalogue order, as checking
+# every scheme per record; and the streaming bulk endpoint built on it
+import io
+import json
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from subsidy_engine import SchemeCatalogue  # noqa: E402
+
+
+def catalogue():
+    with open(os.path.join(BACKEND_DIR, 'data', 'rules.json'), encoding='utf-8') as f:
+        return SchemeCatalogue(json.load(f)['subsidies'])
+
+
+def scan(schemes, crop, category, land_size):
+    # One record against every scheme in turn, no index
+    crop = str(crop or '').strip().lower()
+    category = str(category or '').strip().lower()
+    found = []
+    for i, scheme in enumerate(schemes):
+        eligibility = scheme.get('eligibility', {})
+        if eligibility.get('crops') is not None and crop not in eligibility['crops']:
+            continue
+        if eligibility.get('categories') is not None and category not in eligibility['categories']:
+            continue
+        if eligibility.get('min_land_size') is not None and land_size < eligibility['min_land_size']:
+            continue
+        if eligibility.get('max_land_size') is not None and land_size >= eligibility['max_land_size']:
+            continue
+        found.append(i)
+    return tuple(found)
+
+
+def baseline(crop, category, land_size):
+    # The hard-coded rules the catalogue in rules.json replaced
+    subsidies = []
+    crop_subsidies = {
+        'wheat': ['50% subsidy on certified wheat seeds', 'Wheat procurement at MSP'],
+        'rice': ['Rice seed subsidy up to 75%', 'Paddy procurement guarantee'],
+        'maize': ['Hybrid maize seed subsidy', 'Maize processing unit support'],
+        'cotton': ['Cotton seed subsidy 50%', 'Cotton technology mission'],
+        'vegetables': ['Vegetable cluster development', 'Cold storage subsidy']
+    }
+    if category == 'small':
+        subsidies.extend(['PM-KISAN ₹6000/year', 'Small farmer credit scheme'])
+    elif category == 'marginal':
+        subsidies.extend(['Marginal farmer support', 'Free soil testing'])
+    elif category == 'large':
+        subsidies.extend(['Farm mechanization subsidy', 'Agri-infrastructure support'])
+    if float(land_size) >= 5:
+        subsidies.extend(['Machinery & equipment subsidy', 'Drip irrigation subsidy'])
+    if float(land_size) >= 10:
+        subsidies.extend(['Custom hiring center', 'Warehouse subsidy'])
+    if crop in crop_subsidies:
+        subsidies.extend(crop_subsidies[crop])
+    subsidies.extend(['Soil health card', 'Crop insurance scheme', 'Kisan credit card'])
+    return set(subsidies)
+
+
+def land_sizes(bounds):
+    # Zero, every bracket boundary and both sides of it, and a very large farm
+    sizes = {0.0, 1e6}
+    for bound in bounds:
+        sizes.update({bound - 1e-9, bound, bound + 1e-9})
+    return sorted(size for size in sizes if size >= 0)
+
+
+CROPS = ['wheat', 'rice', 'maize', 'cotton', 'vegetables', ' Wheat ', 'millet', '', None]
+CATEGORIES = ['small', 'marginal', 'large', 'SMALL', 'medium', None]
+
+
+def test_index_matches_a_scan_of_every_scheme():
+    index = catalogue()
+    for crop in CROPS:
+        for category in CATEGORIES:
+            for land_size in land_sizes(index.bounds):
+                assert index.eligible(crop, category, land_size) == scan(index.schemes, crop, category, land_size), \
+                    (crop, category, land_size)
+
+
+def test_index_matches_the_original_rules():
+    index = catalogue()
+    for crop in CROPS[:5]:
+        for category in CATEGORIES[:3]:
+            for land_size in land_sizes(index.bounds):
+                assert set(index.names(index.eligible(crop, category, land_size))) == baseline(crop, category, land_size)
+
+
+def test_land_size_ranges_are_half_open():
+    index = SchemeCatalogue({'schemes': [
+        {'id': 'small', 'name': 'Small', 'eligibility': {'max_land_size': 2}},
+        {'id': 'mid', 'name': 'Mid', 'eligibility': {'min_land_size': 2, 'max_land_size': 5}},
+        {'id': 'all', 'name': 'All'}
+    ]})
+    assert index.names(index.eligible(None, None, 1.99)) == ['Small', 'All']
+    assert index.names(index.eligible(None, None, 2)) == ['Mid', 'All']
+    assert index.names(index.eligible(None, None, 5)) == ['All']
+    with pytest.raises(ValueError):
+        index.eligible(None, None, 'nan')
+
+
+@pytest.fixture
+def client():
+    import app
+    return app.app.test_client()
+
+
+def test_bulk_csv_streams_one_line_per_record(client):
+    registry = '﻿land_size,Crop,category,id\n7,wheat,small,F1\n\n3,rice,large,F2\nlots,maize,small,F3\n12,cotton\n'
+    response = client.post('/api/subsidy/bulk?format=csv', data=registry, content_type='text/csv')
+    assert response.status_code == 200
+    rows = response.get_data(as_text=True).splitlines()
+    index = catalogue()
+    assert rows[0] == 'id,schemes,total,error'
+    assert rows[1].split(',')[1].split(';') == [index.ids[i] for i in index.eligible('wheat', 'small', 7)]
+    assert rows[2].startswith('F2,') and rows[3] == 'F3,,0,Invalid land_size'
+    # A short row is padded: no id, no category
+    assert rows[4].startswith(',') and int(rows[4].split(',')[2]) == len(index.eligible('cotton', '', 12))
+    assert response.headers['X-Subsidy-Catalogue'] == index.version
+
+
+def test_bulk_ndjson_keeps_going_past_bad_lines(client):
+    registry = '{"id": "F1", "crop": "rice", "category": "marginal", "land_size": 10}\nnot json\n{"crop": "wheat", "land_size": 1}\n'
+    response = client.post('/api/subsidy/bulk', data=registry, content_type='application/x-ndjson')
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    index = catalogue()
+    assert lines[0] == {'id': 'F1', 'schemes': [index.ids[i] for i in index.eligible('rice', 'marginal', 10)],
+                        'total': len(index.eligible('rice', 'marginal', 10))}
+    assert lines[1]['id'] == 2 and lines[1]['error'] == 'Invalid land_size'
+    assert lines[2]['id'] == 3 and 'error' not in lines[2]
+
+
+def test_bulk_csv_without_required_columns_is_refused(client):
+    response = client.post('/api/subsidy/bulk', data='id,crop\nF1,wheat\n', content_type='text/csv')
+    assert response.status_code == 400 and 'land_size' in response.get_json()['error']
+
+
+def test_bulk_body_ceiling(client, monkeypatch):
+    import app
+    monkeypatch.setitem(app.app.config, 'SUBSIDY_BULK_MAX_BODY_BYTES', 200)
+    registry = 'id,crop,category,land_size\n' + ''.join(f'F{i},wheat,small,3\n' for i in range(50))
+    assert client.post('/api/subsidy/bulk', data=registry, content_type='text/csv').status_code == 413
+
+    # Chunked: the ceiling is reached mid-stream and reported on the last line
+    response = client.post('/api/subsidy/bulk', input_stream=io.BytesIO(registry.encode()), content_type='text/csv',
+                           environ_overrides={'wsgi.input_terminated': True})
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert 0 < len(lines) < 50 and 'exceeds 200 bytes' in lines[-1]['error']
@@ -0,0 +1,50 @@
+# Symptom ranking: cosine order, crop scoping and the k limit
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from symptom_engine import SymptomIndex  # noqa: E402
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROFILES = [
+    {'disease': 'Rust', 'crop': None, 'symptoms': {'orange_pustules': 1.0, 'yellowing': 0.5}},
+    {'disease': 'Blight', 'crop': None, 'symptoms': {'brown_spots': 1.0, 'yellowing': 0.5}},
+    {'disease': 'Blast', 'crop': 'Rice', 'symptoms': {'brown_spots': 1.0, 'neck_rot': 1.0}},
+    {'disease': 'Spot', 'crop': None, 'symptoms': {'brown_spots': 1.0, 'yellowing': 0.5}}
+]
+
+
+def names(ranked):
+    return [match['disease'] for match in ranked]
+
+
+def test_best_match_first_and_k_limits():
+    index = SymptomIndex(PROFILES)
+    ranked = index.rank(['orange_pustules', 'yellowing'], k=3)
+    assert names(ranked)[0] == 'Rust' and ranked[0]['score'] > ranked[1]['score']
+    assert ranked[0]['matched_symptoms'] == ['orange_pustules', 'yellowing']
+    assert len(index.rank(['yellowing'], k=1)) == 1
+
+
+def test_crop_profiles_only_for_that_crop():
+    index = SymptomIndex(PROFILES)
+    assert 'Blast' not in names(index.rank(['brown_spots', 'neck_rot'], k=4))
+    assert names(index.rank(['brown_spots', 'neck_rot'], crop=' rice ', k=4))[0] == 'Blast'
+
+
+def test_ties_keep_file_order_and_unknown_symptoms_are_ignored():
+    index = SymptomIndex(PROFILES)
+    assert names(index.rank(['brown_spots', 'yellowing', 'not_a_symptom'], k=2)) == ['Blight', 'Spot']
+    assert index.rank(['not_a_symptom']) == []
+
+
+def test_each_profile_ranks_itself_within_the_top_three():
+    with open(os.path.join(BACKEND_DIR, 'data', 'symptom_profiles.json'), encoding='utf-8') as f:
+        profiles = json.load(f)['profiles']
+    index = SymptomIndex(profiles)
+    for profile in profiles:
+        ranked = index.rank(list(profile['symptoms']), profile['crop'], k=3)
+        assert profile['disease'] in names(ranked), profile['disease']
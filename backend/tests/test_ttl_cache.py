@@ -0,0 +1,110 @@
+# TTLCache: one load for concurrent misses, stale values served while a
+# refresh runs, least recently used entries evicted first
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import TTLCache  # noqa: E402
+
+
+class Loader:
+    # Counts calls and holds each one until released
+    def __init__(self, value='fresh'):
+        self.value = value
+        self.calls = 0
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.release.wait(5)
+        return self.value
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_concurrent_misses_share_one_load():
+    cache = TTLCache(ttl=60)
+    loader = Loader()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load('pune', loader))) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: cache.stats()['coalesced'] == 9)
+    loader.release.set()
+    for thread in threads:
+        thread.join()
+    assert loader.calls == 1 and results == ['fresh'] * 10
+    assert cache.get_or_load('pune', loader) == 'fresh' and loader.calls == 1
+
+
+def test_failed_load_is_raised_and_not_cached():
+    cache = TTLCache(ttl=60)
+
+    def failing():
+        raise RuntimeError('upstream down')
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_load('pune', failing)
+    assert cache.get_or_load('pune', lambda: 'fresh') == 'fresh'
+
+
+def test_stale_value_is_served_while_one_refresh_runs():
+    cache = TTLCache(ttl=1, stale_ttl=60)
+    cache.set('pune', 'stale', age=2)
+    loader = Loader()
+    # Returned at once, however many callers arrive during the refresh
+    assert [cache.get_or_load('pune', loader) for _ in range(5)] == ['stale'] * 5
+    wait_for(lambda: loader.calls == 1)
+    loader.release.set()
+    wait_for(lambda: cache.peek('pune')[0] == 'fresh')
+    assert cache.get_or_load('pune', loader) == 'fresh'
+    assert loader.calls == 1 and cache.stats()['stale_hits'] == 5
+
+
+def test_expired_past_the_stale_window_loads_in_line():
+    cache = TTLCache(ttl=1, stale_ttl=1)
+    cache.set('pune', 'old', age=5)
+    assert cache.get_or_load('pune', lambda: 'fresh') == 'fresh'
+
+
+def test_least_recently_used_is_evicted():
+    cache = TTLCache(ttl=60, maxsize=2)
+    cache.set('pune', 1)
+    cache.set('nashik', 2)
+    assert cache.get_or_load('pune', lambda: 0) == 1
+    cache.set('nagpur', 3)
+    assert cache.peek('nashik') is None
+    assert cache.peek('pune')[0] == 1 and cache.stats()['evictions'] == 1
+
+
+def test_async_misses_share_one_load_and_stale_is_served():
+    async def run():
+        cache = TTLCache(ttl=1, stale_ttl=60)
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return len(calls)
+
+        values = await asyncio.gather(*[cache.aget_or_load('pune', loader) for _ in range(10)])
+        assert values == [1] * 10 and len(calls) == 1
+
+        cache.set('pune', 'stale', age=2)
+        assert await cache.aget_or_load('pune', loader) == 'stale'
+        assert await cache.aget_or_load('pune', loader) == 'stale'
+        await asyncio.sleep(0.1)
+        assert await cache.aget_or_load('pune', loader) == 2 and len(calls) == 2
+
+    asyncio.run(run())
@@ -0,0 +1,140 @@
+# Circuit breaker states and which upstream calls are retried
+import asyncio
+import os
+import sys
+
+import httpx
+import pytest
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from upstream import AsyncUpstreamClient, CircuitBreaker, UpstreamClient, UpstreamUnavailable  # noqa: E402
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def close(self):
+        pass
+
+
+def client(outcomes, **options):
+    # An UpstreamClient whose session plays back `outcomes` (responses or
+    # exceptions), recording every attempt
+    upstream = UpstreamClient('test', 'http://upstream.invalid', retries=2, backoff=0, **options)
+    upstream.attempts = []
+
+    def send(method, url, **kwargs):
+        upstream.attempts.append(method)
+        outcome = outcomes[min(len(upstream.attempts), len(outcomes)) - 1]
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    upstream.session.request = send
+    return upstream
+
+
+def refused():
+    return requests.ConnectionError(MaxRetryError(None, '/', NewConnectionError(None, 'Connection refused')))
+
+
+def dropped():
+    return requests.ConnectionError(ProtocolError('Connection aborted.', ConnectionResetError(104, 'reset')))
+
+
+def test_breaker_opens_probes_and_closes():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'closed'
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    # reset_timeout=0: the next call is the half-open probe, and only it
+    assert breaker.allow() and breaker.state == 'half_open'
+    assert not breaker.allow()
+    breaker.record_success(200)
+    assert breaker.state == 'closed' and breaker.allow()
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+
+
+def test_abandoned_probe_frees_the_slot():
+    upstream = client([KeyboardInterrupt()], failure_threshold=1, reset_timeout=0)
+    upstream.breaker.record_failure()
+    with pytest.raises(KeyboardInterrupt):
+        upstream.get('/weather')
+    assert upstream.breaker.state == 'half_open' and upstream.breaker.allow()
+
+
+def test_cancelled_async_probe_frees_the_slot():
+    async def run():
+        async def cancelled(request):
+            raise asyncio.CancelledError()
+
+        upstream = AsyncUpstreamClient(UpstreamClient('test', 'http://upstream.invalid', failure_threshold=1, reset_timeout=0))
+        upstream.http = httpx.AsyncClient(base_url=upstream.base_url, transport=httpx.MockTransport(cancelled))
+        upstream.breaker.record_failure()
+        with pytest.raises(asyncio.CancelledError):
+            await upstream.post('/chat/completions', json={})
+        return upstream.breaker.allow()
+
+    assert asyncio.run(run())
+
+
+def test_get_is_retried_after_the_request_may_have_been_sent():
+    upstream = client([dropped(), FakeResponse(503), FakeResponse(200)])
+    assert upstream.get('/weather').status_code == 200
+    assert len(upstream.attempts) == 3
+
+
+def test_post_is_retried_only_when_it_never_connected():
+    upstream = client([refused(), requests.ConnectTimeout(), FakeResponse(200)])
+    assert upstream.post('/chat/completions').status_code == 200
+    assert len(upstream.attempts) == 3
+
+    for outcome in (dropped(), FakeResponse(503), requests.ReadTimeout()):
+        upstream = client([outcome, FakeResponse(200)])
+        with pytest.raises(UpstreamUnavailable):
+            upstream.post('/chat/completions')
+        assert len(upstream.attempts) == 1
+
+
+def test_rate_limits_wait_for_short_retry_after_only():
+    upstream = client([FakeResponse(429, {'Retry-After': '0'}), FakeResponse(200)])
+    assert upstream.post('/chat/completions').status_code == 200
+    assert len(upstream.attempts) == 2
+
+    for headers in ({}, {'Retry-After': '60'}, {'Retry-After': 'Wed, 21 Oct 2026 07:28:00 GMT'}):
+        upstream = client([FakeResponse(429, headers), FakeResponse(200)])
+        with pytest.raises(UpstreamUnavailable):
+            upstream.get('/weather')
+        assert len(upstream.attempts) == 1
+
+
+def test_async_post_is_not_resent_after_a_dropped_connection():
+    async def run():
+        attempts = []
+
+        async def dropped_connection(request):
+            attempts.append(request.method)
+            raise httpx.RemoteProtocolError('Server disconnected without sending a response.')
+
+        upstream = AsyncUpstreamClient(UpstreamClient('test', 'http://upstream.invalid', backoff=0))
+        upstream.http = httpx.AsyncClient(base_url=upstream.base_url, transport=httpx.MockTransport(dropped_connection))
+        for method in ('POST', 'GET'):
+            with pytest.raises(UpstreamUnavailable):
+                await upstream.request(method, '/chat/completions')
+        return attempts
+
+    assert asyncio.run(run()) == ['POST', 'GET', 'GET', 'GET']
@@ -0,0 +1,360 @@
+# ==================== SOILSYNC UPSTREAM HTTP CLIENT ====================
+
+import asyncio
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from metrics import registry
+
+# Statuses worth retrying; anything else is returned to the caller as-is.
+# 429 is handled on its own (see retry_after).
+RETRY_STATUSES = frozenset([500, 502, 503, 504])
+# Methods safe to send twice. Anything else (the Groq completion POST) is
+# retried only when it never reached the upstream, since a repeat could be
+# generated and billed twice.
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'])
+
+UPSTREAM_SECONDS = registry.histogram(
+    'soilsync_upstream_request_duration_seconds',
+    'Upstream call latency, retries included (time to headers for streams)',
+    ('upstream', 'method')
+)
+UPSTREAM_CALLS = registry.counter(
+    'soilsync_upstream_requests_total',
+    'Upstream calls by outcome: HTTP status class, error (retries exhausted) or circuit_open',
+    ('upstream', 'outcome')
+)
+UPSTREAM_RETRIES = registry.counter('soilsync_upstream_retries_total', 'Retried upstream attempts', ('upstream',))
+
+
+def record_call(name, method, started, outcome):
+    UPSTREAM_SECONDS.observe(name, method, value=time.perf_counter() - started)
+    UPSTREAM_CALLS.inc(name, outcome)
+
+
+def retry_after(response, limit):
+    # Seconds a 429 asks us to wait, when no longer than `limit`; None means
+    # fail fast (no header, an HTTP date, or too long), as retrying sooner
+    # than asked only deepens the rate limiting
+    try:
+        delay = float(response.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+    return delay if 0 <= delay <= limit else None
+
+
+def connect_failed(error):
+    # True when a requests error happened before anything was sent: a connect
+    # timeout or a refused/unresolvable connection, not a dropped response
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+class UpstreamUnavailable(Exception):
+    pass
+
+
+class CircuitBreaker:
+    # closed -> open after `failure_threshold` consecutive failures;
+    # open -> half_open after `reset_timeout` seconds, letting one probe through.
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        # Wall-clock times of the last answered and failed calls, and the
+        # status of the last answer, for health reporting (see observed)
+        self.last_success = 0.0
+        self.last_failure = 0.0
+        self.last_status = None
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+                self._probe_in_flight = False
+            if self.state == 'half_open' and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self, status=None):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._probe_in_flight = False
+            self.last_success = time.time()
+            self.last_status = status
+
+    def release_probe(self):
+        # A half-open probe that ended without an answer either way (the
+        # caller was cancelled, or an unexpected error escaped): let the next
+        # call probe instead of leaving the circuit stuck half-open
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+            self.last_failure = time.time()
+
+    def observed(self, since):
+        # (status, detail, at) from real calls that finished after `since`
+        # (epoch seconds), or None when there were none: the same answer a
+        # health probe would give, without spending a call on it
+        at = max(self.last_success, self.last_failure)
+        if not at or at < since:
+            return None
+        if self.state != 'closed':
+            return 'down', f'Circuit {self.state} after {self.failures} consecutive failures', at
+        if self.last_failure > self.last_success:
+            return 'degraded', f'{self.failures} consecutive failures', at
+        if self.last_status in (401, 403):
+            return 'unauthorized', f'HTTP {self.last_status}: check the API key', at
+        return 'ok', None, at
+
+
+class UpstreamClient:
+    def __init__(self, name, base_url, pool_size=20, connect_timeout=3.05, read_timeout=10,
+                 retries=2, backoff=0.2, failure_threshold=5, reset_timeout=30, max_retry_after=5):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_retry_after = max_retry_after
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        # One keep-alive pool per upstream host; retries are handled below
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def request(self, method, path, **kwargs):
+        if not self.breaker.allow():
+            UPSTREAM_CALLS.inc(self.name, 'circuit_open')
+            raise UpstreamUnavailable(f"{self.name}: circuit open")
+        try:
+            return self._request(method, path, **kwargs)
+        except UpstreamUnavailable:
+            raise
+        except BaseException:
+            # Anything else left the breaker unrecorded
+            self.breaker.release_probe()
+            raise
+
+    def _request(self, method, path, **kwargs):
+        # Every return or UpstreamUnavailable has been recorded on the breaker
+        kwargs.setdefault('timeout', self.timeout)
+        url = f"{self.base_url}{path}"
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        error = None
+        delay = None
+        started = time.perf_counter()
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                UPSTREAM_RETRIES.inc(self.name)
+                # Full jitter keeps concurrent retries from synchronising
+                time.sleep(delay if delay is not None else random.uniform(0, self.backoff * (2 ** (attempt - 1))))
+                delay = None
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.ConnectionError as e:
+                error = e
+                if idempotent or connect_failed(e):
+                    continue
+                break
+            except requests.RequestException as e:
+                # Read timeouts are not retried: the upstream already had its chance
+                error = e
+                break
+
+            if response.status_code == 429:
+                error = UpstreamUnavailable("HTTP 429")
+                response.close()
+                delay = retry_after(response, self.max_retry_after)
+                if delay is None:
+                    break
+                continue
+            if response.status_code in RETRY_STATUSES:
+                error = UpstreamUnavailable(f"HTTP {response.status_code}")
+                response.close()
+                if idempotent:
+                    continue
+                break
+
+            self.breaker.record_success(response.status_code)
+            record_call(self.name, method, started, f'{response.status_code // 100}xx')
+            return response
+
+        self.breaker.record_failure()
+        record_call(self.name, method, started, 'error')
+        raise UpstreamUnavailable(f"{self.name}: {error}") from error
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def status(self):
+        return {
+            'base_url': self.base_url,
+            'circuit': self.breaker.state,
+            'consecutive_failures': self.breaker.failures
+        }
+
+
+class AsyncUpstreamClient:
+    # Non-blocking twin of UpstreamClient for the ASGI entry point. It shares the
+    # sync client's circuit breaker and retry policy, so both modes see one
+    # health state per upstream.
+    def __init__(self, client, max_connections=1000):
+        import httpx
+
+        self._httpx = httpx
+        self.name = client.name
+        self.base_url = client.base_url
+        self.retries = client.retries
+        self.backoff = client.backoff
+        self.max_retry_after = client.max_retry_after
+        self.breaker = client.breaker
+        self.http = httpx.AsyncClient(
+            base_url=client.base_url,
+            timeout=httpx.Timeout(client.timeout[1], connect=client.timeout[0]),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=client.pool_size
+            )
+        )
+
+    async def request(self, method, path, stream=False, **kwargs):
+        # With stream=True the caller owns the response and must aclose() it
+        if not self.breaker.allow():
+            UPSTREAM_CALLS.inc(self.name, 'circuit_open')
+            raise UpstreamUnavailable(f"{self.name}: circuit open")
+        try:
+            return await self._request(method, path, stream, **kwargs)
+        except UpstreamUnavailable:
+            raise
+        except BaseException:
+            # Most often CancelledError, when the ASGI client disconnects
+            self.breaker.release_probe()
+            raise
+
+    async def _request(self, method, path, stream, **kwargs):
+        httpx = self._httpx
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        error = None
+        delay = None
+        started = time.perf_counter()
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                UPSTREAM_RETRIES.inc(self.name)
+                await asyncio.sleep(delay if delay is not None else random.uniform(0, self.backoff * (2 ** (attempt - 1))))
+                delay = None
+            try:
+                response = await self.http.send(self.http.build_request(method, path, **kwargs), stream=stream)
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                error = e
+                continue
+            except httpx.RemoteProtocolError as e:
+                # The request may have been sent before the connection dropped
+                error = e
+                if idempotent:
+                    continue
+                break
+            except httpx.HTTPError as e:
+                error = e
+                break
+
+            if response.status_code == 429:
+                error = UpstreamUnavailable("HTTP 429")
+                await response.aclose()
+                delay = retry_after(response, self.max_retry_after)
+                if delay is None:
+                    break
+                continue
+            if response.status_code in RETRY_STATUSES:
+                error = UpstreamUnavailable(f"HTTP {response.status_code}")
+                await response.aclose()
+                if idempotent:
+                    continue
+                break
+
+            self.breaker.record_success(response.status_code)
+            record_call(self.name, method, started, f'{response.status_code // 100}xx')
+            return response
+
+        self.breaker.record_failure()
+        record_call(self.name, method, started, 'error')
+        raise UpstreamUnavailable(f"{self.name}: {error}") from error
+
+    async def get(self, path, **kwargs):
+        return await self.request('GET', path, **kwargs)
+
+    async def post(self, path, **kwargs):
+        return await self.request('POST', path, **kwargs)
+
+    async def aclose(self):
+        await self.http.aclose()
+
+
+_clients = {}
+_async_clients = {}
+_clients_lock = threading.Lock()
+
+
+@registry.collector
+def circuit_metrics():
+    with _clients_lock:
+        clients = list(_clients.values())
+    yield 'soilsync_upstream_circuit_open', 'gauge', '1 while an upstream circuit breaker is open or half-open', [
+        ({'upstream': client.name}, int(client.breaker.state != 'closed')) for client in clients
+    ]
+
+
+def get_client(name, base_url, **options):
+    # Clients are shared per upstream name so every caller reuses one pool
+    with _clients_lock:
+        client = _clients.get(name)
+        if client is None:
+            client = _clients[name] = UpstreamClient(name, base_url, **options)
+        return client
+
+
+def get_async_client(name, max_connections=1000):
+    # Must be called from the event loop that will use the client
+    with _clients_lock:
+        client = _async_clients.get(name)
+        if client is None:
+            client = _async_clients[name] = AsyncUpstreamClient(_clients[name], max_connections)
+        return client
+
+
+async def close_async_clients():
+    with _clients_lock:
+        clients = list(_async_clients.values())
+        _async_clients.clear()
+    for client in clients:
+        await client.aclose()
@@ -6,6 +6,24 @@ let recognition = null;
 let isListening = false;
 let conversationHistory = [];
 
+// The backend keeps the conversation under this id, so follow-up questions
+// are answered in context. Kept per browser tab; "clear chat" starts anew.
+const SESSION_STORAGE_KEY = 'soilsync-chat-session';
+
+function newSessionId() {
+  if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+  return Date.now().toString(36) + Math.random().toString(36).slice(2, 12);
+}
+
+function getSessionId() {
+  let sessionId = sessionStorage.getItem(SESSION_STORAGE_KEY);
+  if (!sessionId) {
+    sessionId = newSessionId();
+    sessionStorage.setItem(SESSION_STORAGE_KEY, sessionId);
+  }
+  return sessionId;
+}
+
 // Enhanced farming knowledge with more comprehensive responses
 const farmingKnowledge = {
   "disease": {
@@ -73,25 +91,41 @@ async function sendMessage() {
       body: JSON.stringify({ 
         query: userText, 
         language: lang,
-        context: { history: conversationHistory.slice(-5) } // Last 5 messages for context
+        stream: true, // Tokens arrive as Server-Sent Events
+        session_id: getSessionId() // Earlier messages are kept server-side
       })
     });
     
-    if (!response.ok) {
+    if (!response.ok || !response.body) {
       throw new Error('Backend API error');
     }
     
-    const data = await response.json();
+    // Render tokens as they arrive instead of waiting for the full answer
+    let botResponse = '';
+    let messageDiv = null;
+    let meta = null;
+    
+    await readEventStream(response, (event) => {
+      if (event.delta) {
+        if (!messageDiv) {
+          removeTypingIndicator(typingId);
+          messageDiv = addMessageToChat('', 'bot');
+        }
+        botResponse += event.delta;
+        messageDiv.querySelector('.message-content').textContent = botResponse;
+        document.getElementById("chatBox").scrollTop = document.getElementById("chatBox").scrollHeight;
+      }
+      if (event.done) {
+        meta = event;
+      }
+    });
     
     removeTypingIndicator(typingId);
     
-    if (data.status === 'success') {
-      const botResponse = data.response.text;
-      addMessageToChat(botResponse, 'bot');
-      
+    if (meta && botResponse) {
       // Add suggestions if available
-      if (data.response.suggestions && data.response.suggestions.length > 0) {
-        addSuggestionsToChat(data.response.suggestions);
+      if (meta.suggestions && meta.suggestions.length > 0) {
+        addSuggestionsToChat(meta.suggestions);
       }
       
       // Speak response
@@ -100,7 +134,7 @@ async function sendMessage() {
       // Add to conversation history
       conversationHistory.push({ role: 'bot', message: botResponse, timestamp: new Date() });
     } else {
-      throw new Error(data.error || 'Unknown error');
+      throw new Error('Incomplete response stream');
     }
     
   } catch (error) {
@@ -139,6 +173,32 @@ function addMessageToChat(message, sender) {
   
   chatBox.appendChild(messageDiv);
   chatBox.scrollTop = chatBox.scrollHeight;
+  
+  return messageDiv;
+}
+
+// Parses a text/event-stream body, calling onEvent with each JSON payload
+async function readEventStream(response, onEvent) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    
+    buffer += decoder.decode(value, { stream: true });
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const frame = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      const data = frame.split('\n')
+        .filter(line => line.startsWith('data:'))
+        .map(line => line.slice(5).trim())
+        .join('\n');
+      if (data) onEvent(JSON.parse(data));
+    }
+  }
 }
 
 function addTypingIndicator() {
@@ -379,6 +439,14 @@ function clearChat() {
   const chatBox = document.getElementById("chatBox");
   chatBox.innerHTML = '<div class="bot-msg">Hello! 👋 I\'m your AI farming assistant. How can I help you today?</div>';
   conversationHistory = [];
+
+  // Forget the server-side conversation and start a new one
+  const sessionId = sessionStorage.getItem(SESSION_STORAGE_KEY);
+  sessionStorage.removeItem(SESSION_STORAGE_KEY);
+  if (sessionId) {
+    fetch(`${API_BASE_URL}/chatbot/session/${encodeURIComponent(sessionId)}`, { method: 'DELETE' })
+      .catch(() => {});
+  }
 }
 
 // ==================== KEYBOARD SHORTCUTS ====================
@@ -29,12 +29,14 @@ async function predictCrop() {
         <div class="crop-recommendation-result">
           <div class="primary-recommendation">
             <h3>🎆 Best Crop for Your Conditions</h3>
-            <div class="primary-crop">🌱 ${rec.primary_choice}</div>
+            <div class="primary-crop">🌱 ${rec.primary_choice}${rec.ranked && rec.ranked.length ? ` — ${rec.ranked[0].score}% match` : ''}</div>
           </div>
           
           <div class="alternative-crops">
             <h4>🌿 Alternative Options</h4>
-            <div class="crop-list">${rec.recommended_crops.slice(1).join(' • ')}</div>
+            <div class="crop-list">${(rec.ranked && rec.ranked.length
+              ? rec.ranked.slice(1).map(match => `${match.crop} (${match.score}%)`)
+              : rec.recommended_crops.slice(1)).join(' • ')}</div>
           </div>
           
           <div class="recommendation-details">
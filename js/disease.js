@@ -5,6 +5,11 @@ const API_BASE_URL = '/api';
 const imageUpload = document.getElementById("imageUpload");
 const previewImage = document.getElementById("previewImage");
 
+// Photos are downscaled in the browser before upload; the backend reports the
+// size its model actually uses via upload_hint
+let selectedFile = null;
+let uploadHint = { max_dimension: 512, format: 'image/jpeg', quality: 0.85 };
+
 // Quiz system variables
 let currentQuestionIndex = 0;
 let quizAnswers = [];
@@ -57,6 +62,7 @@ imageUpload.addEventListener("change", function () {
     return;
   }
 
+  selectedFile = file;
   const reader = new FileReader();
   reader.onload = function (e) {
     previewImage.src = e.target.result;
@@ -65,6 +71,24 @@ imageUpload.addEventListener("change", function () {
   reader.readAsDataURL(file);
 });
 
+async function prepareUpload(file) {
+  // Re-encode at the model's working resolution; fall back to the original file
+  // when the browser cannot decode it
+  try {
+    const bitmap = await createImageBitmap(file);
+    const scale = Math.min(1, uploadHint.max_dimension / Math.max(bitmap.width, bitmap.height));
+    const canvas = document.createElement('canvas');
+    canvas.width = Math.round(bitmap.width * scale);
+    canvas.height = Math.round(bitmap.height * scale);
+    canvas.getContext('2d').drawImage(bitmap, 0, 0, canvas.width, canvas.height);
+    bitmap.close();
+    const blob = await new Promise(resolve => canvas.toBlob(resolve, uploadHint.format, uploadHint.quality));
+    return blob && blob.size < file.size ? blob : file;
+  } catch (error) {
+    return file;
+  }
+}
+
 // ==================== METHOD SWITCHING ====================
 function showMethod(method) {
   const imageMethods = document.getElementById("imageMethod");
@@ -91,7 +115,7 @@ async function detectDisease() {
   const resultBox = document.getElementById("diseaseResult");
   const treatmentBox = document.getElementById("treatmentRecommendations");
   
-  if (!previewImage.src) {
+  if (!selectedFile) {
     showError('Please upload an image first');
     return;
   }
@@ -105,16 +129,14 @@ async function detectDisease() {
   `;
   
   try {
-    // Convert image to base64
-    const imageData = previewImage.src;
+    // Send the (downscaled) image as binary multipart instead of base64 JSON
+    const formData = new FormData();
+    formData.append('image', await prepareUpload(selectedFile), 'leaf.jpg');
     
     // Call backend API
     const response = await fetch(`${API_BASE_URL}/disease/detect-image`, {
       method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
-      body: JSON.stringify({ image: imageData })
+      body: formData
     });
     
     if (!response.ok) {
@@ -122,6 +144,9 @@ async function detectDisease() {
     }
     
     const data = await response.json();
+    if (data.upload_hint) {
+      uploadHint = data.upload_hint;
+    }
     
     if (data.status === 'success') {
       displayImageResults(data.prediction, data.treatment);
@@ -171,10 +196,6 @@ function displayImageResults(prediction, treatment) {
         <span class="label">⚡ Processing:</span>
         <span class="value">${prediction.processing_time || '1.2s'}</span>
       </div>
-      <div class="result-item simulation-note">
-        <span class="label">📝 Note:</span>
-        <span class="value">This is simulated AI for demo. Real AI would use TensorFlow CNN model.</span>
-      </div>
     </div>
   `;
   
@@ -332,7 +353,15 @@ function showTreatmentRecommendations(diseaseKey, treatment) {
   
   let content = "";
   
-  if (diseaseKey === "Healthy") {
+  if (treatment.status === "no_treatment_on_file") {
+    content = `
+      <div class="treatment-section prevention">
+        <h4><i class="fas fa-user-md"></i> Expert Advice Needed</h4>
+        <p>${treatment.advice}</p>
+        <p>• ${treatment.prevention}</p>
+      </div>
+    `;
+  } else if (diseaseKey === "Healthy") {
     content = `
       <div class="treatment-section healthy">
         <h4><i class="fas fa-leaf"></i> Maintenance Tips</h4>
@@ -394,7 +423,12 @@ function getTreatmentData(disease) {
     }
   };
   
-  return treatments[disease] || treatments['Healthy'];
+  // Never show the Healthy care tips for a disease we have no entry for
+  return treatments[disease] || {
+    status: 'no_treatment_on_file',
+    advice: 'No treatment is on file for this diagnosis. Consult your local agricultural extension officer or Krishi Vigyan Kendra before applying any chemical.',
+    prevention: 'Isolate affected plants and keep photos of the symptoms for the extension officer'
+  };
 }
 
 // ==================== UTILITY FUNCTIONS ====================
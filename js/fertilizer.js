@@ -30,12 +30,21 @@ form.addEventListener('submit', async function(e) {
         
         if (data.status === 'success') {
             const rec = data.recommendation;
+            const dosage = rec.dosage ? Object.entries(rec.dosage.products_kg)
+                .filter(([, kg]) => kg > 0)
+                .map(([product, kg]) => `${product}: ${kg} kg`)
+                .join(' • ') : '';
             recText.innerHTML = `
                 <div class="fertilizer-recommendation">
                     <div class="rec-section">
                         <h4>🌿 Fertilizer Application</h4>
                         <p class="rec-main">${rec.fertilizer}</p>
                     </div>
+                    ${dosage ? `
+                    <div class="rec-section">
+                        <h4>⚖️ Dosage for ${rec.dosage.area_ha} ha (${soil} soil)</h4>
+                        <p>${dosage}</p>
+                    </div>` : ''}
                     <div class="rec-section">
                         <h4>🕰️ Application Method</h4>
                         <p>${rec.application_method}</p>
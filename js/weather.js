@@ -59,28 +59,21 @@ class WeatherAdvisory {
         this.showLoading();
         
         try {
-            // Use real backend API
-            const weatherResponse = await fetch('/api/weather/current', {
+            // Current weather and forecast in a single round trip
+            const response = await fetch('/api/weather/bundle', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ city: city })
             });
             
-            const forecastResponse = await fetch('/api/weather/forecast', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ city: city })
-            });
-            
-            const weatherData = await weatherResponse.json();
-            const forecastData = await forecastResponse.json();
+            const bundle = await response.json();
             
-            if (weatherData.status === 'success' && forecastData.status === 'success') {
-                this.currentWeatherData = weatherData.weather;
-                this.displayCurrentWeather(weatherData.weather);
-                this.displayWeatherMetrics(weatherData.weather);
-                this.displayForecast(forecastData.forecast);
-                this.updateFarmingAdvice(weatherData.weather);
+            if (bundle.status === 'success') {
+                this.currentWeatherData = bundle.weather;
+                this.displayCurrentWeather(bundle.weather);
+                this.displayWeatherMetrics(bundle.weather);
+                this.displayForecast(bundle.forecast);
+                this.updateFarmingAdvice(bundle.weather);
             } else {
                 throw new Error('API Error');
             }